@@ -0,0 +1,82 @@
+"""
+Micro-benchmark for frame_encoder backends.
+
+Compares per-frame JPEG encode time and payload size (raw and as base64, which is
+what the old encode_frame_to_base64 path sent) across backends, qualities and scales.
+
+    python bench_encode.py --width 320 --height 240 --frames 200
+"""
+import argparse
+import base64
+import time
+import numpy as np
+import cv2
+
+from frame_encoder import FrameEncoder, available_backends
+
+
+def make_frames(width, height, count, seed=0):
+    # Textured synthetic scenes: noise alone compresses unrealistically badly, flat colour too well
+    rng = np.random.default_rng(seed)
+    frames = []
+    for i in range(count):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        frame[:, :, 0] = np.linspace(0, 255, width, dtype=np.uint8)[np.newaxis, :]
+        frame[:, :, 1] = np.linspace(0, 255, height, dtype=np.uint8)[:, np.newaxis]
+        cv2.circle(frame, (int(rng.integers(0, width)), int(rng.integers(0, height))),
+                   int(rng.integers(10, max(11, height // 3))), (0, 0, 255), -1)
+        cv2.rectangle(frame, (i % width, height // 2), ((i % width) + width // 5, height - 1), (200, 200, 200), -1)
+        frame = cv2.add(frame, rng.integers(0, 24, size=frame.shape, dtype=np.uint8)) # Saturating add
+        frames.append(frame)
+    return frames
+
+
+def legacy_encode(frame):
+    # The original gemini_utils path: cvtColor -> PIL -> BytesIO -> base64, default quality
+    import io
+    from PIL import Image
+    rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+    buffer = io.BytesIO()
+    Image.fromarray(rgb_frame).save(buffer, format="JPEG")
+    return base64.b64encode(buffer.getvalue())
+
+
+def bench(encode, frames, repeats):
+    encode(frames[0]) # Warm up buffers / lazy imports
+    sizes = []
+    started_at = time.perf_counter()
+    for _ in range(repeats):
+        for frame in frames:
+            sizes.append(len(encode(frame)))
+    elapsed = time.perf_counter() - started_at
+    return elapsed * 1000.0 / len(sizes), sum(sizes) / len(sizes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark JPEG encoder backends.")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--frames", type=int, default=50)
+    parser.add_argument("--repeats", type=int, default=4)
+    parser.add_argument("--qualities", type=int, nargs="+", default=[60, 85])
+    parser.add_argument("--scales", type=float, nargs="+", default=[1.0, 0.5])
+    args = parser.parse_args()
+
+    frames = make_frames(args.width, args.height, args.frames)
+    print(f"{args.frames} frames of {args.width}x{args.height}, {args.repeats} repeats\n")
+    print(f"{'backend':<22}{'quality':>8}{'scale':>7}{'ms/frame':>10}{'bytes':>9}{'b64 bytes':>11}")
+
+    ms, size = bench(legacy_encode, frames, args.repeats)
+    print(f"{'legacy PIL+base64':<22}{'75':>8}{1.0:>7.2f}{ms:>10.3f}{size * 3 / 4:>9.0f}{size:>11.0f}")
+
+    for backend in available_backends():
+        for quality in args.qualities:
+            for scale in args.scales:
+                encoder = FrameEncoder(backend=backend, quality=quality, scale=scale)
+                ms, size = bench(encoder.encode, frames, args.repeats)
+                b64_size = 4 * ((size + 2) // 3)
+                print(f"{backend:<22}{quality:>8}{scale:>7.2f}{ms:>10.3f}{size:>9.0f}{b64_size:>11.0f}")
+
+
+if __name__ == "__main__":
+    main()
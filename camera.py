@@ -1,12 +1,19 @@
+import importlib.util
 import time
+import threading
 import numpy as np
 import cv2
+import metrics
+
+CAMERA_FOV = 62.2 # Horizontal field of view of the Pi camera (v2), degrees
 
 class MockCamera:
-    def __init__(self, width, height, name="MockCamera"):
+    # With a `world` (world_sim.World) frames are rendered from the simulated robot's point of view
+    def __init__(self, width, height, name="MockCamera", world=None):
         self.width = width
         self.height = height
         self.name = name
+        self.world = world
         self.is_running = False
         print(f"[MOCK CAM] {self.name} initialized ({width}x{height}).") # Added print
 
@@ -20,6 +27,16 @@ class MockCamera:
             return np.zeros((self.height, self.width, 3), dtype=np.uint8)
 
         frame = np.zeros((self.height, self.width, 3), dtype=np.uint8)
+        self.capture_into(frame)
+        return frame
+
+    def capture_into(self, frame):
+        # Renders into a caller-owned buffer so BufferedCamera can reuse its ring slots
+        if self.world is not None:
+            self.world.render(frame)
+            time.sleep(0.05) # Simulate capture time
+            return frame
+        frame.fill(0)
         tick = int(time.time() * 10) % self.width
         cv2.line(frame, (tick, 0), (self.width - tick, self.height - 1), (0, 255, 0), 2)
         cv2.putText(frame, f"{time.strftime('%H:%M:%S')}", (10, self.height - 10), # Added timestamp
@@ -39,20 +56,196 @@ class MockCamera:
         self.stop()
 
 
-try:
-    from picamera2 import Picamera2
-    PICAMERA_AVAILABLE = True
-except ImportError:
-    PICAMERA_AVAILABLE = False
+class FrameRef:
+    """
+    A zero-copy view of one ring slot. The slot is not overwritten until release()
+    is called (or the `with` block ends), so keep references short-lived.
+    """
+
+    def __init__(self, ring, slot, array, timestamp, seq):
+        self._ring = ring
+        self._slot = slot
+        self.array = array
+        self.timestamp = timestamp
+        self.seq = seq
+
+    def release(self):
+        if self._ring is not None:
+            self._ring._release(self._slot)
+            self._ring = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+
+
+class BufferedCamera:
+    """
+    Wraps the object returned by setup_camera and grabs frames continuously on a
+    background thread into a fixed ring of preallocated arrays, each stamped with a
+    monotonic timestamp and sequence number.
+
+    latest() and frame_after() hand out FrameRefs without copying; capture_array()
+    keeps the old interface and returns a copy of the newest frame without waiting
+    for the sensor. The wrapped camera's own start/stop stays with its owner, so it
+    nests inside the existing `with setup_camera(...)` block.
+    """
+
+    def __init__(self, camera, slots=4, name="main"):
+        self.camera = camera
+        self.name = name
+        self._num_slots = max(2, slots)
+        self._slots = None # Allocated from the first frame's shape
+        self._timestamps = [0.0] * self._num_slots
+        self._seqs = [-1] * self._num_slots # -1: empty or being written
+        self._holds = [0] * self._num_slots
+        self._latest = None
+        self._next_seq = 0
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread = None
+        self.dropped_slots = 0 # Times the grabber found every slot held
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._grab_loop, name=f"camera-grab-{self.name}", daemon=True)
+        self._thread.start()
+        print(f"[INFO] Buffered capture started ({self._num_slots} slots).")
+
+    def stop(self):
+        if not self._running:
+            return
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(timeout=2)
+        print("[INFO] Buffered capture stopped.")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def _free_slot(self):
+        for offset in range(1, self._num_slots + 1):
+            slot = ((self._latest if self._latest is not None else -1) + offset) % self._num_slots
+            if self._holds[slot] == 0 and slot != self._latest:
+                return slot
+        return None
+
+    def _grab_into(self, slot):
+        buffer = self._slots[slot]
+        if hasattr(self.camera, "capture_into"):
+            self.camera.capture_into(buffer)
+            return True
+        frame = self.camera.capture_array(name=self.name)
+        if frame is None or frame.size == 0:
+            return False
+        if frame.shape != buffer.shape or frame.dtype != buffer.dtype:
+            self._allocate(frame)
+            buffer = self._slots[slot]
+        np.copyto(buffer, frame)
+        return True
+
+    def _allocate(self, frame):
+        with self._cond:
+            self._slots = [np.empty_like(frame) for _ in range(self._num_slots)]
+            self._seqs = [-1] * self._num_slots
+            self._latest = None
+
+    def _grab_loop(self):
+        while self._running:
+            try:
+                if self._slots is None:
+                    first = self.camera.capture_array(name=self.name)
+                    if first is None or first.size == 0:
+                        time.sleep(0.05)
+                        continue
+                    self._allocate(first)
+
+                with self._cond:
+                    slot = self._free_slot()
+                    if slot is None:
+                        self.dropped_slots += 1
+                        metrics.increment("camera.all_slots_held")
+                        self._cond.wait(0.01)
+                        continue
+                    self._seqs[slot] = -1 # Not readable while being written
+
+                with metrics.timed("camera.grab"):
+                    grabbed = self._grab_into(slot)
+                if not grabbed:
+                    continue
+
+                with self._cond:
+                    self._timestamps[slot] = time.monotonic()
+                    self._seqs[slot] = self._next_seq
+                    self._next_seq += 1
+                    self._latest = slot
+                    self._cond.notify_all()
+            except Exception as e:
+                metrics.increment("camera.errors")
+                print(f"[CAMERA] Capture error in background thread: {e}")
+                time.sleep(0.1)
+
+    def _hold(self, slot):
+        self._holds[slot] += 1
+        return FrameRef(self, slot, self._slots[slot], self._timestamps[slot], self._seqs[slot])
+
+    def _release(self, slot):
+        with self._cond:
+            self._holds[slot] -= 1
+            self._cond.notify_all()
+
+    def latest(self, timeout=1.0):
+        """Newest frame as a FrameRef (no copy). Only waits if nothing was captured yet."""
+        with self._cond:
+            if not self._cond.wait_for(lambda: self._latest is not None or not self._running, timeout):
+                return None
+            if self._latest is None:
+                return None
+            return self._hold(self._latest)
+
+    def frame_after(self, t: float, timeout=1.0):
+        """
+        First frame whose capture finished at or after monotonic time `t`, e.g. the
+        end of the last motor command. Blocks until it exists or `timeout` expires.
+        """
+        def candidate():
+            slots = [s for s in range(self._num_slots) if self._seqs[s] >= 0 and self._timestamps[s] >= t]
+            return min(slots, key=lambda s: self._timestamps[s]) if slots else None
+
+        with self._cond:
+            if not self._cond.wait_for(lambda: candidate() is not None or not self._running, timeout):
+                return None
+            slot = candidate()
+            return self._hold(slot) if slot is not None else None
+
+    def capture_array(self, name="main"):
+        # Drop-in for Picamera2/MockCamera.capture_array: a private copy of the newest frame
+        ref = self.latest()
+        if ref is None:
+            return None
+        with ref:
+            return ref.array.copy()
+
+
+# Picamera2 is imported by setup_camera, so importing this module stays cheap
+PICAMERA_AVAILABLE = importlib.util.find_spec("picamera2") is not None
+if not PICAMERA_AVAILABLE:
     print("WARNING: Picamera2 library not found. Camera functionality will be mocked.") # Added print
-except Exception as e: # Catch other potential import errors
-    PICAMERA_AVAILABLE = False
-    print(f"WARNING: Error importing Picamera2: {e}. Camera functionality will be mocked.") # Added print
 
 
 def setup_camera(width=320, height=240):
     if PICAMERA_AVAILABLE:
         try:
+            from picamera2 import Picamera2
             cam = Picamera2()
             config = cam.create_video_configuration(main={"size": (width, height), "format": "RGB888"})
             cam.configure(config)
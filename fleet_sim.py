@@ -0,0 +1,184 @@
+"""
+Headless fleet simulation for throughput and scaling tests.
+
+Runs many pursue_object sessions at once, each with its own MockCamera, mock motors
+(robot_controller.create_mock_motors) and a local stand-in model that answers like
+Gemini after an injected latency. All sessions in a process share one rate-limited
+GeminiClient, as a fleet sharing one API key would; with --processes the sessions
+are spread over worker processes and the quota is split evenly between them.
+
+    python fleet_sim.py --sessions 1 2 4 8 16 --pursuits 3 --processes 2
+
+For every session count it reports pursuits per minute, API calls per pursuit and
+latency percentiles.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import speech
+from camera import MockCamera
+from gemini_client import GeminiClient, FakeGenerativeModel, REQUESTS_PER_MINUTE
+from navigation import pursue_object, STEP_PAUSE, PIPELINE_SETTLE_TIME
+from payload_controller import PayloadController
+from robot_controller import create_mock_motors
+from session_recorder import SessionRecorder, advice_to_text, percentile
+
+STANDIN_LATENCY = 0.4 # Seconds per stand-in answer
+STANDIN_TAIL_LATENCY = 2.0
+STANDIN_TAIL_RATE = 0.05
+STANDIN_ERROR_RATE = 0.02
+STANDIN_SECONDS_PER_KB = 0.005 # Upload time per KB of image, so smaller frames answer sooner
+GOAL_OBJECT = "red ball"
+
+
+class StandInNavigator:
+    """
+    Scripted answers for one simulated robot, pursuit after pursuit: the goal is out of
+    sight for a few steps, then seen and approached until it is reachable. Multi-view
+    scan requests find it in a random view. Answers in JSON when the prompt asks for it.
+    """
+
+    APPROACH = ["far", "medium", "near", "reachable"]
+
+    def __init__(self, seed: int):
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock() # Hedged requests may call in concurrently
+        self._new_pursuit()
+
+    def _new_pursuit(self):
+        self._lost_steps = self._rng.randint(0, 4)
+        self._approach = list(self.APPROACH)
+
+    def __call__(self, contents) -> str:
+        with self._lock:
+            images = sum(1 for part in contents if isinstance(part, dict))
+            if images > 1:
+                self._lost_steps = 0
+                return (f"1. GOAL VIEW: {self._rng.randint(1, images)}\n"
+                        f"2. POSITION IN VIEW: Center\n3. GOAL PROXIMITY: Far")
+            if self._lost_steps > 0:
+                self._lost_steps -= 1
+                advice = {"goal_visible": False, "goal_direction": "not visible", "goal_proximity": "not visible",
+                          "path_status": "clear", "obstacle_info": "none"}
+            else:
+                proximity = self._approach.pop(0) if len(self._approach) > 1 else self._approach[0]
+                advice = {"goal_visible": True,
+                          "goal_direction": self._rng.choice(["center", "center", "slightly left", "slightly right"]),
+                          "goal_proximity": proximity, "path_status": "clear", "obstacle_info": "none"}
+                if proximity == "reachable":
+                    self._new_pursuit()
+        if "JSON" in str(contents[0]):
+            return json.dumps(advice)
+        return advice_to_text(advice)
+
+
+def _run_session(index: int, client, args) -> dict:
+    model = FakeGenerativeModel(respond=StandInNavigator(args.seed + index), latency=args.latency,
+                                tail_latency=args.tail_latency, tail_rate=args.tail_rate,
+                                error_rate=args.error_rate, seed=args.seed + index,
+                                seconds_per_kb=args.seconds_per_kb)
+    motors = create_mock_motors(time_scale=args.time_scale)
+    recorder = SessionRecorder(None)
+    payload_controller = PayloadController() if args.adaptive_payload else None
+    pursuits = []
+    with MockCamera(320, 240, name=f"sim-{index}") as camera:
+        for _ in range(args.pursuits):
+            stats = {}
+            pursue_object(client.bind(model), camera, GOAL_OBJECT, pipelined=args.pipelined, stats=stats,
+                          recorder=recorder, max_steps=args.max_steps, step_pause=STEP_PAUSE * args.time_scale,
+                          settle_time=PIPELINE_SETTLE_TIME * args.time_scale, streaming=args.streaming,
+                          scan_headings=args.scan_headings, motors=motors, payload_controller=payload_controller)
+            pursuits.append({"reached": stats.get("reached", False), "steps": stats.get("steps", 0),
+                             "elapsed_s": stats.get("elapsed_s", 0.0)})
+    return {"pursuits": pursuits, "model_calls": model.calls, "bytes_sent": model.bytes_sent,
+            "gemini_s": recorder.stage_timings.get("gemini", [])}
+
+
+def _run_group(first_index: int, sessions: int, requests_per_minute: float, args) -> list:
+    """Runs `sessions` sessions on threads of this process, sharing one GeminiClient."""
+    speech.set_speech_enabled(False)
+    client = GeminiClient(None, requests_per_minute=requests_per_minute, workers=max(4, 2 * sessions))
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull): # The loops print every step
+        with ThreadPoolExecutor(max_workers=sessions, thread_name_prefix="sim-session") as pool:
+            futures = [pool.submit(_run_session, first_index + i, client, args) for i in range(sessions)]
+            return [future.result() for future in futures]
+
+
+def run_fleet(sessions: int, args) -> dict:
+    processes = max(1, min(args.processes, sessions))
+    started_at = time.monotonic()
+    if processes == 1:
+        results = _run_group(0, sessions, args.rpm, args)
+    else:
+        per_process = [sessions // processes + (1 if i < sessions % processes else 0) for i in range(processes)]
+        firsts = [sum(per_process[:i]) for i in range(processes)]
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(_run_group, first, count, args.rpm / processes, args)
+                       for first, count in zip(firsts, per_process)]
+            results = [session for future in futures for session in future.result()]
+    elapsed = time.monotonic() - started_at
+
+    pursuits = [p for session in results for p in session["pursuits"]]
+    durations = [p["elapsed_s"] for p in pursuits]
+    gemini = [seconds for session in results for seconds in session["gemini_s"]]
+    calls = sum(session["model_calls"] for session in results)
+    bytes_sent = sum(session["bytes_sent"] for session in results)
+    return {"sessions": sessions, "processes": processes, "elapsed_s": elapsed, "pursuits": len(pursuits),
+            "reached": sum(1 for p in pursuits if p["reached"]),
+            "pursuits_per_minute": len(pursuits) * 60.0 / elapsed if elapsed > 0 else 0.0,
+            "api_calls_per_pursuit": calls / len(pursuits) if pursuits else 0.0,
+            "steps_per_pursuit": sum(p["steps"] for p in pursuits) / len(pursuits) if pursuits else 0.0,
+            "kb_per_call": bytes_sent / 1024 / calls if calls else 0.0,
+            "pursuit_p50_s": percentile(durations, 50), "pursuit_p95_s": percentile(durations, 95),
+            "gemini_p50_s": percentile(gemini, 50), "gemini_p95_s": percentile(gemini, 95),
+            "gemini_p99_s": percentile(gemini, 99)}
+
+
+def print_row(row: dict):
+    print(f"{row['sessions']:>8}{row['processes']:>6}{row['pursuits']:>9}{row['reached']:>8}"
+          f"{row['pursuits_per_minute']:>10.1f}{row['api_calls_per_pursuit']:>11.1f}{row['steps_per_pursuit']:>8.1f}"
+          f"{row['kb_per_call']:>9.1f}"
+          f"{row['pursuit_p50_s']:>9.2f}{row['pursuit_p95_s']:>9.2f}"
+          f"{row['gemini_p50_s']:>9.2f}{row['gemini_p95_s']:>9.2f}{row['gemini_p99_s']:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many simulated pursuits concurrently and report scaling.")
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--pursuits", type=int, default=2, help="Pursuits per session")
+    parser.add_argument("--processes", type=int, default=1, help="Worker processes (quota is split between them)")
+    parser.add_argument("--rpm", type=float, default=REQUESTS_PER_MINUTE, help="Shared Gemini quota")
+    parser.add_argument("--max-steps", type=int, default=25)
+    parser.add_argument("--time-scale", type=float, default=0.1, help="Mock motor and pause time scale")
+    parser.add_argument("--latency", type=float, default=STANDIN_LATENCY)
+    parser.add_argument("--tail-latency", type=float, default=STANDIN_TAIL_LATENCY)
+    parser.add_argument("--tail-rate", type=float, default=STANDIN_TAIL_RATE)
+    parser.add_argument("--error-rate", type=float, default=STANDIN_ERROR_RATE)
+    parser.add_argument("--seconds-per-kb", type=float, default=STANDIN_SECONDS_PER_KB)
+    parser.add_argument("--scan-headings", type=int, default=0)
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--adaptive-payload", action="store_true", help="Size and crop frames with a PayloadController")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--jsonl", default="", help="Append one JSON row per session count to this file")
+    args = parser.parse_args()
+
+    print(f"Fleet simulation: {args.pursuits} pursuits per session, quota {args.rpm:.0f} requests/min, "
+          f"stand-in latency {args.latency:.2f}s, {os.cpu_count()} cores\n")
+    print(f"{'sessions':>8}{'procs':>6}{'pursuits':>9}{'reached':>8}{'per min':>10}{'calls/pur':>11}{'steps':>8}"
+          f"{'KB/call':>9}{'pur p50':>9}{'pur p95':>9}{'api p50':>9}{'api p95':>9}{'api p99':>9}")
+    for sessions in args.sessions:
+        row = run_fleet(sessions, args)
+        print_row(row)
+        if args.jsonl:
+            with open(args.jsonl, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+import io
+import os
+import threading
+import numpy as np
+import cv2
+
+try:
+    import simplejpeg
+    SIMPLEJPEG_AVAILABLE = True
+except ImportError:
+    SIMPLEJPEG_AVAILABLE = False
+
+DEFAULT_JPEG_QUALITY = int(os.getenv("ROBOGO_JPEG_QUALITY", "85"))
+DEFAULT_JPEG_SCALE = float(os.getenv("ROBOGO_JPEG_SCALE", "1.0"))
+DEFAULT_JPEG_BACKEND = os.getenv("ROBOGO_JPEG_BACKEND", "auto") # auto, simplejpeg, cv2 or pil
+BACKENDS = ["simplejpeg", "cv2", "pil"]
+
+
+def available_backends() -> list:
+    return [b for b in BACKENDS if b != "simplejpeg" or SIMPLEJPEG_AVAILABLE]
+
+
+class FrameEncoder:
+    """
+    Encodes camera frames (BGR, as produced by Picamera2 "RGB888" and MockCamera) to JPEG bytes.
+    Channel order is handed to the JPEG backend instead of converting the frame first,
+    downscaling writes into a reused per-thread buffer, and the PIL backend reuses its BytesIO.
+    """
+
+    def __init__(self, backend=DEFAULT_JPEG_BACKEND, quality=DEFAULT_JPEG_QUALITY, scale=DEFAULT_JPEG_SCALE):
+        if backend == "auto":
+            backend = "simplejpeg" if SIMPLEJPEG_AVAILABLE else "cv2"
+        if backend not in available_backends():
+            raise ValueError(f"JPEG backend '{backend}' is not available (have: {available_backends()}).")
+        self.backend = backend
+        self.quality = quality
+        self.scale = scale
+        self._local = threading.local() # Buffers are per thread so one encoder can be shared
+
+    def encode(self, frame, quality=None, scale=None) -> bytes:
+        quality = self.quality if quality is None else quality
+        scale = self.scale if scale is None else scale
+        if frame.ndim == 3 and frame.shape[2] == 4:
+            frame = frame[:, :, :3] # XBGR8888 from Picamera2: drop the padding channel (a view, no copy)
+        if scale != 1.0:
+            frame = self._resize(frame, scale)
+        if self.backend == "simplejpeg":
+            return self._encode_simplejpeg(frame, quality)
+        if self.backend == "cv2":
+            return self._encode_cv2(frame, quality)
+        return self._encode_pil(frame, quality)
+
+    def _resize(self, frame, scale):
+        height = max(1, int(round(frame.shape[0] * scale)))
+        width = max(1, int(round(frame.shape[1] * scale)))
+        shape = (height, width) + frame.shape[2:]
+        buffers = getattr(self._local, "resize_buffers", None)
+        if buffers is None:
+            buffers = self._local.resize_buffers = {}
+        dst = buffers.get((shape, frame.dtype.str))
+        if dst is None:
+            dst = buffers[(shape, frame.dtype.str)] = np.empty(shape, dtype=frame.dtype)
+        cv2.resize(frame, (width, height), dst=dst, interpolation=cv2.INTER_AREA)
+        return dst
+
+    def _encode_simplejpeg(self, frame, quality):
+        frame = np.ascontiguousarray(frame) # No-op unless the frame is a strided view
+        if frame.ndim == 2:
+            return simplejpeg.encode_jpeg(frame[:, :, np.newaxis], quality=quality, colorspace="GRAY")
+        return simplejpeg.encode_jpeg(frame, quality=quality, colorspace="BGR")
+
+    def _encode_cv2(self, frame, quality):
+        ok, encoded = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])
+        if not ok:
+            raise ValueError("cv2.imencode failed to encode the frame.")
+        return encoded.tobytes()
+
+    def _encode_pil(self, frame, quality):
+        # Legacy path kept for comparison: needs an RGB copy because PIL has no BGR input mode
+        from PIL import Image
+        try:
+            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        except cv2.error:
+            rgb_frame = frame
+        buffer = getattr(self._local, "pil_buffer", None)
+        if buffer is None:
+            buffer = self._local.pil_buffer = io.BytesIO()
+        buffer.seek(0)
+        buffer.truncate()
+        Image.fromarray(rgb_frame).save(buffer, format="JPEG", quality=int(quality))
+        return buffer.getvalue()
+
+
+_default_encoder = None
+
+
+def get_default_encoder() -> FrameEncoder:
+    global _default_encoder
+    if _default_encoder is None:
+        _default_encoder = FrameEncoder()
+        print(f"[INFO] Frame encoder: {_default_encoder.backend}, quality {_default_encoder.quality}, "
+              f"scale {_default_encoder.scale}.")
+    return _default_encoder
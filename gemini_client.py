@@ -0,0 +1,438 @@
+"""
+Access layer between the navigation code and the Gemini model.
+
+GeminiClient wraps one configured GenerativeModel (see gemini_utils.configure_gemini)
+and adds a token-bucket rate limiter, per-request deadlines, retries with jittered
+backoff, optional hedging (a second request once the first is slower than a
+percentile of recent latencies) and a circuit breaker that makes calls fail fast
+during an outage so the caller can fall back to a local decision or stop.
+
+FakeGenerativeModel stands in for the real model with injected latency and errors:
+
+    python gemini_client.py --latency 1.0 --tail 4.0 --error-rate 0.1 --hedge
+"""
+import argparse
+import copy
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from speech import speak, PRIORITY_URGENT, PRIORITY_STATUS
+import metrics
+
+REQUESTS_PER_MINUTE = float(os.getenv("ROBOGO_GEMINI_RPM", "60")) # Quota the rate limiter keeps to
+BURST = 3 # Requests that may go out back to back before the limiter spaces them
+REQUEST_DEADLINE = float(os.getenv("ROBOGO_GEMINI_DEADLINE", "8.0")) # Seconds per request, retries included
+MAX_RETRIES = 3
+BACKOFF_BASE = 0.5 # Seconds; doubled per retry, full jitter
+BACKOFF_CAP = 4.0
+HEDGE_ENABLED = os.getenv("ROBOGO_GEMINI_HEDGE", "0") == "1"
+HEDGE_PERCENTILE = 0.9 # Hedge once the first request is slower than this share of recent requests
+HEDGE_MIN_SAMPLES = 10 # No hedging until this many latencies were observed
+LATENCY_WINDOW = 100
+BREAKER_FAILURES = 3 # Consecutive failed requests that open the circuit
+BREAKER_RESET = 15.0 # Seconds the circuit stays open before one trial request is let through
+CLIENT_WORKERS = 4 # Requests (hedges included) in flight at once
+SLOW_UPSTREAM_SHARE = 0.5 # A deadline hit counts against the service if a request was out this share of the deadline
+
+# Fixed phrases spoken from this module, pre-rendered by speech.warm_up_speech at startup
+CLIENT_PHRASES = [
+    "I'll retry analyzing the scene.",
+    "I'm having trouble analyzing the scene after multiple retries.",
+    "My vision service is not responding. I will rely on local decisions.",
+    "My connection to the vision system failed due to an authentication error. Please check the API key.",
+]
+
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1.0:
+                self._tokens -= 1.0
+                return True
+            return False
+
+    def acquire(self, deadline_at: float) -> bool:
+        """Blocks until a token is free; False if that would be after `deadline_at` (time.monotonic())."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1.0:
+                    self._tokens -= 1.0
+                    return True
+                wait_for = (1.0 - self._tokens) / self.rate
+            if now + wait_for > deadline_at:
+                return False
+            time.sleep(wait_for)
+
+
+class CircuitBreaker:
+    """
+    Closed: requests go through. After `failures` consecutive failed requests it opens
+    and allow() is False for `reset_after` seconds, then one trial request is let
+    through (half-open): success closes the circuit, failure opens it again. A trial
+    that never reports back is replaced by another one after `reset_after`.
+    """
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET):
+        self.failures = failures
+        self.reset_after = reset_after
+        self.state = "closed"
+        self._consecutive = 0
+        self._opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "closed":
+                return True
+            now = time.monotonic()
+            if now - self._opened_at >= self.reset_after:
+                self.state = "half_open"
+                self._opened_at = now
+                return True # The single trial request
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._consecutive = 0
+            if self.state != "closed":
+                print("[GEMINI] Circuit closed, vision service is back.")
+            self.state = "closed"
+
+    def record_failure(self) -> bool:
+        """Returns True if this failure opened the circuit."""
+        with self._lock:
+            self._consecutive += 1
+            if self.state == "half_open" or (self.state == "closed" and self._consecutive >= self.failures):
+                opened = self.state == "closed"
+                self.state = "open"
+                self._opened_at = time.monotonic()
+                return opened
+            return False
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self.state != "closed" and time.monotonic() - self._opened_at < self.reset_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    A request ran past its deadline. `upstream` is True if the service was slow to answer,
+    False if the time went locally (waiting for a worker or for quota).
+    """
+
+    def __init__(self, message: str, upstream: bool):
+        super().__init__(message)
+        self.upstream = upstream
+
+
+class _CallCounter:
+    """Calls in flight on a client and the clients bound to it, so close() can wait for them."""
+
+    def __init__(self):
+        self._active = 0
+        self.closed = False
+        self._cond = threading.Condition()
+
+    def enter(self) -> bool:
+        """False once the client is closed; the call must not start."""
+        with self._cond:
+            if self.closed:
+                return False
+            self._active += 1
+            return True
+
+    def leave(self):
+        with self._cond:
+            self._active -= 1
+            self._cond.notify_all()
+
+    def close(self):
+        """Refuses new calls and waits for those in flight."""
+        with self._cond:
+            self.closed = True
+            self._cond.wait_for(lambda: self._active == 0)
+
+
+def _is_auth_error(e) -> bool:
+    return "API key not valid" in str(e) or "permission" in str(e).lower()
+
+
+class GeminiClient:
+    """
+    Shared wrapper around one model. generate() returns the response text, or "" when
+    the request failed, ran past its deadline, or the circuit is open. Requests run on
+    a small thread pool so deadlines and hedges do not depend on the SDK's own timeouts;
+    a request abandoned at its deadline finishes in the background and is ignored.
+    Only failures of the service itself count toward the circuit breaker.
+    """
+
+    def __init__(self, model, requests_per_minute: float = REQUESTS_PER_MINUTE, burst: int = BURST,
+                 deadline: float = REQUEST_DEADLINE, hedge: bool = HEDGE_ENABLED,
+                 hedge_percentile: float = HEDGE_PERCENTILE, max_retries: int = MAX_RETRIES,
+                 workers: int = CLIENT_WORKERS):
+        self.model = model
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.max_retries = max_retries
+        self.limiter = TokenBucket(requests_per_minute / 60.0, burst)
+        self.breaker = CircuitBreaker()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="gemini")
+        self.calls = _CallCounter() # Shared with bound clients, like the pool
+
+    def bind(self, model) -> "GeminiClient":
+        """
+        A client for another model that shares this one's quota, circuit breaker, latency
+        history and thread pool, e.g. one stand-in model per simulated robot.
+        """
+        bound = copy.copy(self)
+        bound.model = model
+        return bound
+
+    def close(self):
+        """
+        Waits for calls in flight on this client and bound ones to return, then shuts their
+        shared thread pool down, waiting for abandoned requests too. May block for a
+        deadline or longer, so call it off the hot path.
+        """
+        self.calls.close()
+        self._pool.shutdown(wait=True)
+
+    @property
+    def available(self) -> bool:
+        """False while the circuit is open: callers should decide locally instead of waiting."""
+        return not self.breaker.is_open
+
+    def hedge_delay(self):
+        if not self.hedge or len(self._latencies) < HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(self.hedge_percentile * len(ordered)))]
+
+    def before_request(self, deadline_at: float) -> bool:
+        """Circuit and rate-limit gate; False means do not send (already counted in metrics)."""
+        if not self.breaker.allow():
+            metrics.increment("gemini.circuit_rejected")
+            return False
+        if not self.limiter.acquire(deadline_at):
+            metrics.increment("gemini.rate_limited")
+            print("[GEMINI] Rate limit: no request slot before the deadline.")
+            return False
+        return True
+
+    def record_success(self, latency: float):
+        self._latencies.append(latency)
+        self.breaker.record_success()
+
+    def record_failure(self):
+        metrics.increment("gemini.failures")
+        if self.breaker.record_failure():
+            print("[GEMINI] Circuit open, failing fast for the next requests.")
+            speak("My vision service is not responding. I will rely on local decisions.", priority=PRIORITY_URGENT)
+
+    def record_give_up(self, upstream: bool):
+        """
+        After a request got no answer: counts toward the circuit breaker only if the service
+        failed (`upstream`), not if quota or the deadline ran out on our side.
+        """
+        if not upstream:
+            metrics.increment("gemini.local_failures")
+            print("[GEMINI] No answer: out of quota or time locally; not counted against the service.")
+            return
+        self.record_failure()
+        if self.available: # Opening the circuit already said so
+            speak("I'm having trouble analyzing the scene after multiple retries.", priority=PRIORITY_URGENT)
+
+    def retry_after(self, e, attempt: int, deadline_at: float) -> bool:
+        """
+        Error policy shared with the streaming path: auth errors re-raise, otherwise
+        sleeps a jittered backoff and returns True if another attempt fits the deadline.
+        """
+        metrics.increment("gemini.errors")
+        print(f"Error calling Gemini API (attempt {attempt + 1}/{self.max_retries}): {e}")
+        if _is_auth_error(e):
+            speak("My connection to the vision system failed due to an authentication error. Please check the API key.",
+                  priority=PRIORITY_URGENT)
+            raise e
+        backoff = random.uniform(0.0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+        if attempt + 1 >= self.max_retries or time.monotonic() + backoff >= deadline_at:
+            return False
+        metrics.increment("gemini.retries")
+        if attempt == 0: # One notice per request; later retries stay quiet
+            speak("I'll retry analyzing the scene.", priority=PRIORITY_STATUS, coalesce_key="gemini-retry")
+        time.sleep(backoff)
+        return True
+
+    def _call(self, contents, generation_config, sent_at=None):
+        if sent_at is not None:
+            sent_at.append(time.monotonic()) # A worker picked the request up
+        with metrics.timed("gemini.request"):
+            response = self.model.generate_content(contents=contents, generation_config=generation_config,
+                                                   stream=False)
+            response.resolve()
+        return response.text.strip()
+
+    def _attempt(self, contents, generation_config, deadline_at: float) -> str:
+        # One logical attempt: the request plus, if it runs slow, a hedge; first success wins
+        started_at = time.monotonic()
+        sent_at = []
+        first = self._pool.submit(self._call, contents, generation_config, sent_at)
+        pending = {first}
+        hedge_after = self.hedge_delay()
+        error = None
+        while pending:
+            remaining = deadline_at - time.monotonic()
+            if remaining <= 0:
+                metrics.increment("gemini.deadline_exceeded")
+                for future in pending:
+                    future.cancel() # Only stops requests still waiting for a worker
+                slow = bool(sent_at) and deadline_at - min(sent_at) >= SLOW_UPSTREAM_SHARE * self.deadline
+                raise DeadlineExceeded(f"Gemini request exceeded its {self.deadline:.1f}s deadline", upstream=slow)
+            timeout = remaining
+            if hedge_after is not None:
+                timeout = min(timeout, max(0.0, started_at + hedge_after - time.monotonic()))
+            done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not first:
+                        metrics.increment("gemini.hedge_wins")
+                    self.record_success(time.monotonic() - started_at)
+                    return future.result()
+                error = future.exception()
+            if hedge_after is not None and pending and time.monotonic() - started_at >= hedge_after:
+                hedge_after = None # At most one hedge per attempt
+                if self.limiter.try_acquire(): # Hedges never wait for quota
+                    metrics.increment("gemini.hedges")
+                    pending.add(self._pool.submit(self._call, contents, generation_config, sent_at))
+        raise error
+
+    def generate(self, contents: list, generation_config: dict, deadline: float = None) -> str:
+        if not self.calls.enter():
+            print("[GEMINI] Client already closed; request not sent.")
+            return ""
+        try:
+            return self._generate(contents, generation_config, deadline)
+        finally:
+            self.calls.leave()
+
+    def _generate(self, contents, generation_config, deadline) -> str:
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+        upstream = False # Whether the service itself failed an attempt
+        for attempt in range(self.max_retries):
+            if not self.before_request(deadline_at):
+                if attempt == 0:
+                    return "" # Circuit open or out of quota; the service itself did not fail
+                break
+            try:
+                return self._attempt(contents, generation_config, deadline_at)
+            except Exception as e:
+                upstream = upstream or getattr(e, "upstream", True)
+                if not self.retry_after(e, attempt, deadline_at):
+                    break
+        self.record_give_up(upstream)
+        return ""
+
+
+class _FakeResponse:
+    def __init__(self, text: str, chunk_chars: int = 32):
+        self.text = text
+        self._chunk_chars = chunk_chars
+
+    def resolve(self):
+        pass
+
+    def __iter__(self):
+        for start in range(0, len(self.text), self._chunk_chars):
+            yield _FakeResponse(self.text[start:start + self._chunk_chars])
+
+
+class FakeGenerativeModel:
+    """
+    Local stand-in for genai.GenerativeModel with injected latency and errors.
+    Each call sleeps `latency` seconds (or `tail_latency` with probability `tail_rate`),
+    plus `seconds_per_kb` for every KB of image data sent, and then raises with
+    probability `error_rate`; `outage=True` fails every call.
+    `respond(contents)` returns the answer text. Deterministic for a given seed.
+    """
+
+    def __init__(self, respond=None, latency: float = 0.5, tail_latency: float = 0.0, tail_rate: float = 0.0,
+                 error_rate: float = 0.0, seed: int = 0, seconds_per_kb: float = 0.0):
+        self.respond = respond or (lambda contents: "OK")
+        self.latency = latency
+        self.tail_latency = tail_latency
+        self.tail_rate = tail_rate
+        self.error_rate = error_rate
+        self.seconds_per_kb = seconds_per_kb
+        self.outage = False
+        self.calls = 0
+        self.bytes_sent = 0 # Image bytes over all calls
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        image_bytes = sum(len(part["data"]) for part in contents if isinstance(part, dict))
+        with self._lock:
+            self.calls += 1
+            self.bytes_sent += image_bytes
+            slow = self._rng.random() < self.tail_rate
+            fail = self.outage or self._rng.random() < self.error_rate
+        time.sleep((self.tail_latency if slow else self.latency) + self.seconds_per_kb * image_bytes / 1024)
+        if fail:
+            raise RuntimeError("503 Service Unavailable (injected)")
+        return _FakeResponse(self.respond(contents))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Exercise GeminiClient against a fake model.")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--tail", type=float, default=2.0, help="Latency of slow responses")
+    parser.add_argument("--tail-rate", type=float, default=0.1)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--deadline", type=float, default=REQUEST_DEADLINE)
+    parser.add_argument("--rpm", type=float, default=600)
+    parser.add_argument("--hedge", action="store_true")
+    args = parser.parse_args()
+
+    metrics.enable()
+    model = FakeGenerativeModel(latency=args.latency, tail_latency=args.tail, tail_rate=args.tail_rate,
+                                error_rate=args.error_rate)
+    client = GeminiClient(model, requests_per_minute=args.rpm, burst=BURST, deadline=args.deadline,
+                          hedge=args.hedge)
+    latencies = []
+    failures = 0
+    for _ in range(args.requests):
+        started_at = time.monotonic()
+        if not client.generate(["ping"], {}):
+            failures += 1
+        latencies.append(time.monotonic() - started_at)
+    ordered = sorted(latencies)
+    print(f"\n{args.requests} requests, hedging {'on' if args.hedge else 'off'}: "
+          f"p50 {ordered[len(ordered) // 2]:.2f}s, p95 {ordered[int(0.95 * (len(ordered) - 1))]:.2f}s, "
+          f"max {ordered[-1]:.2f}s, {failures} failed, {model.calls} model calls")
+    print(f"counters: {metrics.snapshot()['counters']}")
+
+
+if __name__ == "__main__":
+    main()
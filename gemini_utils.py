@@ -1,12 +1,12 @@
 import os
+import re
 import base64
-import io
-from PIL import Image
+import threading
 import time
-import google.generativeai as genai
-# Removed unused imports: datetime, json (not needed for this refactor)
 from speech import speak
-import cv2
+from frame_encoder import get_default_encoder
+from gemini_client import GeminiClient, CLIENT_PHRASES
+import metrics
 
 GEMINI_SCENE_PROMPT = """
 You are the vision system of a robot. Describe the scene in front of you.
@@ -23,13 +23,90 @@ Analyze the current view and provide the following information, each on a new li
 3. GOAL PROXIMITY: [Not Visible/Reachable/Very Close/Near/Medium/Far]
 4. PATH STATUS: [Clear/Minor Obstacle/Major Obstacle/Blocked]
 5. OBSTACLE INFO: [Describe briefly if Minor or Major Obstacle, otherwise "None"]
+6. GOAL BOX: [ymin, xmin, ymax, xmax] of the GOAL OBJECT scaled 0-1000, or None
 
 Prioritize reaching the GOAL OBJECT safely. Be very concise and follow the format precisely.
 Only consider obstacles directly in the robot's 25cm path.
 GOAL OBJECT: {goal}
 """
 
+# Streaming variant: schema-constrained JSON with the deciding fields first, so the
+# robot can act before the rest of the answer arrives (see ask_gemini_streaming)
+GEMINI_NAVIGATION_JSON_PROMPT_TEMPLATE = """
+You are the navigation AI for a robot that is 25cm wide. Your task is to guide it to the GOAL OBJECT.
+Analyze the current view and answer with a JSON object with exactly these keys, in this order:
+goal_visible, goal_direction, goal_proximity, path_status, obstacle_info, goal_box.
+obstacle_info describes the obstacle briefly if the path has a Minor or Major Obstacle, otherwise "None".
+goal_box is [ymin, xmin, ymax, xmax] of the GOAL OBJECT scaled 0-1000, or [] if it is not visible.
+
+Prioritize reaching the GOAL OBJECT safely. Be very concise.
+Only consider obstacles directly in the robot's 25cm path.
+GOAL OBJECT: {goal}
+"""
+
+GEMINI_NAVIGATION_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "goal_visible": {"type": "BOOLEAN"},
+        "goal_direction": {"type": "STRING",
+                           "enum": ["Not Visible", "Center", "Slightly Left", "Slightly Right", "Far Left", "Far Right"]},
+        "goal_proximity": {"type": "STRING",
+                           "enum": ["Not Visible", "Reachable", "Very Close", "Near", "Medium", "Far"]},
+        "path_status": {"type": "STRING", "enum": ["Clear", "Minor Obstacle", "Major Obstacle", "Blocked"]},
+        "obstacle_info": {"type": "STRING"},
+        "goal_box": {"type": "ARRAY", "items": {"type": "INTEGER"}},
+    },
+    "required": ["goal_visible", "goal_direction", "goal_proximity", "path_status", "obstacle_info"],
+}
+
+# Multi-view search: one request with a frame per heading of an in-place rotation
+GEMINI_SCAN_PROMPT_TEMPLATE = """
+You are the navigation AI for a robot searching for the GOAL OBJECT. The robot turned in place and took
+{views} pictures, labelled View 1 to View {views}. Their headings, in degrees to the right (clockwise) of
+View 1, are: {headings}.
+Respond in this exact format:
+1. GOAL VIEW: [Number of the view that shows the GOAL OBJECT most clearly, or None]
+2. POSITION IN VIEW: [Left, Center, Right, or None]
+3. GOAL PROXIMITY: [Very Close, Near, Medium, Far, or None]
+
+Be very concise. Only answer with a view number if the GOAL OBJECT is really in it.
+GOAL OBJECT: {goal}
+"""
+
+# Line prefixes of the numbered free-text format, per advice field
+_ADVICE_LINE_PREFIXES = (
+    ("goal_visible", ("1. goal visible:", "goal visible:")),
+    ("goal_direction", ("2. goal direction:", "goal direction:")),
+    ("goal_proximity", ("3. goal proximity:", "goal proximity:")),
+    ("path_status", ("4. path status:", "path status:")),
+    ("obstacle_info", ("5. obstacle info:", "obstacle info:")),
+    ("goal_box", ("6. goal box:", "goal box:")),
+)
+
+# A JSON field only matches once its value is complete (closing quote / full literal)
+_JSON_FIELD_PATTERNS = {
+    "goal_visible": re.compile(r'"goal_visible"\s*:\s*(true|false)'),
+    "goal_direction": re.compile(r'"goal_direction"\s*:\s*"([^"]*)"'),
+    "goal_proximity": re.compile(r'"goal_proximity"\s*:\s*"([^"]*)"'),
+    "path_status": re.compile(r'"path_status"\s*:\s*"([^"]*)"'),
+    "obstacle_info": re.compile(r'"obstacle_info"\s*:\s*"([^"]*)"'),
+    "goal_box": re.compile(r'"goal_box"\s*:\s*\[([^\]]*)\]'),
+}
+
+# Fixed phrases spoken from this module, pre-rendered by speech.warm_up_speech at startup
+GEMINI_PHRASES = CLIENT_PHRASES + [
+    "I had trouble understanding the scene analysis.",
+    "My analysis about goal visibility was incomplete. Assuming not visible.",
+]
+
+_model = None # The one configured model; every GeminiClient call goes through it
+_client = None # GeminiClient around the raw model last passed in (normally _model)
+_client_lock = threading.Lock()
+
 def configure_gemini():
+    global _model
+    if _model is not None:
+        return _model
     api_key = os.getenv("GEMINI_API_KEY")
     if not api_key:
         # Try to load from a .env file if it exists, for convenience
@@ -42,43 +119,95 @@ def configure_gemini():
 
         if not api_key:  # Still not found
             raise ValueError("GEMINI_API_KEY environment variable not set and not found in .env file.")
+    import google.generativeai as genai # ~1s to import on a Pi; deferred until the model is needed
     genai.configure(api_key=api_key)
-    return genai.GenerativeModel("models/gemini-1.5-flash")
+    _model = genai.GenerativeModel("models/gemini-1.5-flash")
+    return _model
 
-def encode_frame_to_base64(frame_bgr) -> str:
-    # Ensure robust conversion, similar to original code
+def warm_up_gemini(model) -> bool:
+    """
+    Opens the connection to the API ahead of the first real request with a free
+    count_tokens call. Returns False if that failed; the first request then pays for it.
+    """
+    if not hasattr(model, "count_tokens"):
+        return True # Local stand-in models
     try:
-        rgb_frame = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
-    except cv2.error as e:
-        rgb_frame = frame_bgr
-    pil_image = Image.fromarray(rgb_frame)
-    buffer = io.BytesIO()
-    pil_image.save(buffer, format="JPEG")
-    return base64.b64encode(buffer.getvalue()).decode('utf-8')
-
-def ask_gemini(model, b64_img: str, prompt: str) -> str:
-    image_part = {"mime_type": "image/jpeg", "data": b64_img}
-    max_retries = 3
-    for attempt in range(max_retries):
-        try:
-            response = model.generate_content(
-                contents=[prompt, image_part],
-                generation_config={"temperature": 0.2, "max_output_tokens": 200},
-                stream=False
-            )
-            response.resolve()
-            return response.text.strip()
-        except Exception as e:
-            print(f"Error calling Gemini API (attempt {attempt + 1}/{max_retries}): {e}")
-            if "API key not valid" in str(e) or "permission" in str(e).lower():
-                speak("My connection to the vision system failed due to an authentication error. Please check the API key.")
-                raise
-            if attempt < max_retries - 1:
-                speak(f"I'll retry analyzing the scene, attempt {attempt + 2}.")
-                time.sleep(2 ** attempt)
-            else:
-                speak("I'm having trouble analyzing the scene after multiple retries.")
-                return ""
+        with metrics.timed("gemini.warm_up"):
+            model.count_tokens("ping")
+        return True
+    except Exception as e:
+        print(f"[GEMINI] Connection warm-up failed: {e}")
+        return False
+
+def get_client(model) -> GeminiClient:
+    """The shared GeminiClient (rate limit, deadline, hedging, circuit breaker) for `model`."""
+    global _client
+    if isinstance(model, GeminiClient):
+        return model
+    with _client_lock:
+        if _client is not None and _client.model is model:
+            return _client
+        replaced, _client = _client, GeminiClient(model)
+        client = _client
+    if replaced is not None: # Its pool would otherwise outlive it; close() waits for calls still using it
+        threading.Thread(target=replaced.close, name="gemini-close", daemon=True).start()
+    return client
+
+def gemini_available(model) -> bool:
+    """False while the circuit breaker is open; decide locally instead of asking."""
+    return get_client(model).available
+
+def encode_frame(frame_bgr, quality=None, scale=None) -> bytes:
+    # JPEG bytes via the configured backend (see frame_encoder.py); colour order is handled by the encoder
+    with metrics.timed("gemini.encode"):
+        return get_default_encoder().encode(frame_bgr, quality=quality, scale=scale)
+
+def encode_frame_to_base64(frame_bgr) -> str:
+    # Kept for callers that need text; ask_gemini takes the raw bytes from encode_frame directly
+    return base64.b64encode(encode_frame(frame_bgr)).decode('utf-8')
+
+def _generate_text(model, contents: list) -> str:
+    # One non-streaming request through the shared client; "" if it failed or the circuit is open
+    return get_client(model).generate(contents, {"temperature": 0.2, "max_output_tokens": 200})
+
+def ask_gemini(model, image, prompt: str) -> str:
+    # `image` is JPEG bytes (preferred, sent as-is) or a base64 string (decoded by the SDK)
+    return _generate_text(model, [prompt, {"mime_type": "image/jpeg", "data": image}])
+
+def ask_gemini_scan(model, images: list, prompt: str) -> str:
+    # Several JPEG views in one request, each preceded by its "View N:" label
+    contents = [prompt]
+    for number, image in enumerate(images, start=1):
+        contents.append(f"View {number}:")
+        contents.append({"mime_type": "image/jpeg", "data": image})
+    return _generate_text(model, contents)
+
+def _parse_advice_line(line: str):
+    # One line of the numbered format -> (field, value), or None
+    lowered = line.strip().lower()
+    for field, prefixes in _ADVICE_LINE_PREFIXES:
+        if lowered.startswith(prefixes):
+            value = lowered.split(":", 1)[1].strip()
+            return field, ("yes" in value if field == "goal_visible" else value)
+    return None
+
+def parse_goal_box(value):
+    """
+    "[ymin, xmin, ymax, xmax]" scaled 0-1000, as Gemini boxes objects, to (x0, y0, x1, y1)
+    as fractions of the frame; None if the value is not a usable box.
+    """
+    if not isinstance(value, str):
+        return value
+    numbers = [min(max(float(n) / 1000.0, 0.0), 1.0) for n in re.findall(r"\d+(?:\.\d+)?", value)]
+    if len(numbers) != 4 or numbers[3] <= numbers[1] or numbers[2] <= numbers[0]:
+        return None
+    ymin, xmin, ymax, xmax = numbers
+    return xmin, ymin, xmax, ymax
+
+def format_goal_box(box) -> str:
+    # Inverse of parse_goal_box
+    x0, y0, x1, y1 = box
+    return f"[{round(y0 * 1000)}, {round(x0 * 1000)}, {round(y1 * 1000)}, {round(x1 * 1000)}]"
 
 def parse_navigation_advice(advice_text: str) -> dict:
     parsed = {
@@ -86,30 +215,155 @@ def parse_navigation_advice(advice_text: str) -> dict:
         "goal_direction": "Not Visible",
         "goal_proximity": "Not Visible",
         "path_status": "Blocked",  # Default to cautious
-        "obstacle_info": "None"
+        "obstacle_info": "None",
+        "goal_box": None
     }
     if not advice_text: # Added check for empty advice_text
         speak("I had trouble understanding the scene analysis.")
         return parsed
 
-    lines = advice_text.split('\n')
-    for line in lines:
-        line = line.strip()
-        if line.lower().startswith("1. goal visible:") or line.lower().startswith("goal visible:"):
-            value_str = line.split(":", 1)[1].strip().lower()
-            parsed["goal_visible"] = "yes" in value_str
-        elif line.lower().startswith("2. goal direction:") or line.lower().startswith("goal direction:"):
-            parsed["goal_direction"] = line.split(":", 1)[1].strip().lower()
-        elif line.lower().startswith("3. goal proximity:") or line.lower().startswith("goal proximity:"):
-            parsed["goal_proximity"] = line.split(":", 1)[1].strip().lower()
-        elif line.lower().startswith("4. path status:") or line.lower().startswith("path status:"):
-            parsed["path_status"] = line.split(":", 1)[1].strip().lower()
-        elif line.lower().startswith("5. obstacle info:") or line.lower().startswith("obstacle info:"):
-            parsed["obstacle_info"] = line.split(":", 1)[1].strip().lower()
+    for line in advice_text.split('\n'):
+        field = _parse_advice_line(line)
+        if field is not None:
+            parsed[field[0]] = field[1]
 
     if parsed["goal_visible"] is None:  # If visibility wasn't explicitly parsed
+        metrics.increment("gemini.parse_incomplete")
         speak("My analysis about goal visibility was incomplete. Assuming not visible.")
         print(f"Problematic Gemini response for visibility: \n{advice_text}") # Added print for debugging
         parsed["goal_visible"] = False
+        parsed["incomplete"] = True # Lets the payload controller count unparsable answers
+    parsed["goal_box"] = parse_goal_box(parsed["goal_box"])
+
+    return parsed
+
+def parse_scan_advice(advice_text: str, views: int) -> dict:
+    """
+    Parses a GEMINI_SCAN_PROMPT_TEMPLATE answer. "goal_view" is the 0-based index of the
+    view showing the goal, or None; "position" and "goal_proximity" are lowercase strings.
+    """
+    parsed = {"goal_view": None, "position": "none", "goal_proximity": "none"}
+    for line in advice_text.split('\n'):
+        lowered = line.strip().lower()
+        if lowered.startswith(("1. goal view:", "goal view:")):
+            match = re.search(r"\d+", lowered.split(":", 1)[1])
+            if match and 1 <= int(match.group()) <= views:
+                parsed["goal_view"] = int(match.group()) - 1
+        elif lowered.startswith(("2. position in view:", "position in view:")):
+            parsed["position"] = lowered.split(":", 1)[1].strip()
+        elif lowered.startswith(("3. goal proximity:", "goal proximity:")):
+            parsed["goal_proximity"] = lowered.split(":", 1)[1].strip()
+    return parsed
+
+def decision_ready(fields: dict) -> bool:
+    """True once the fields that pick this step's first action are known."""
+    if "goal_visible" not in fields:
+        return False
+    return "goal_direction" in fields if fields["goal_visible"] else "path_status" in fields
 
-    return parsed
\ No newline at end of file
+class NavigationStreamParser:
+    """
+    Incremental parser for streamed navigation answers. feed() takes each chunk and
+    returns the fields that became complete; it understands the JSON format requested
+    by GEMINI_NAVIGATION_JSON_PROMPT_TEMPLATE and, line by line, the numbered free text.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self.fields = {}
+        self._line_start = 0
+
+    def feed(self, chunk: str) -> dict:
+        self.text += chunk
+        new = {}
+        for field, pattern in _JSON_FIELD_PATTERNS.items():
+            if field not in self.fields:
+                match = pattern.search(self.text)
+                if match:
+                    value = match.group(1)
+                    new[field] = value == "true" if field == "goal_visible" else value.strip().lower()
+        while True: # Free-text fallback: parse every completed line once
+            end = self.text.find("\n", self._line_start)
+            if end < 0:
+                break
+            field = _parse_advice_line(self.text[self._line_start:end])
+            self._line_start = end + 1
+            if field is not None and field[0] not in self.fields and field[0] not in new:
+                new[field[0]] = field[1]
+        self.fields.update(new)
+        return new
+
+    def finish(self) -> dict:
+        """Full advice once the stream ended; malformed answers go through parse_navigation_advice."""
+        self.feed("\n") # Flush a trailing line without newline
+        if "goal_visible" not in self.fields:
+            return parse_navigation_advice(self.text.strip())
+        parsed = {"goal_direction": "not visible", "goal_proximity": "not visible",
+                  "path_status": "blocked", "obstacle_info": "none"}
+        parsed.update(self.fields)
+        parsed["goal_box"] = parse_goal_box(parsed.get("goal_box"))
+        return parsed
+
+def ask_gemini_streaming(model, image, prompt: str, on_fields=None):
+    """
+    Streams a schema-constrained navigation answer and parses it as chunks arrive.
+    `on_fields(fields)` is called with all fields known so far whenever new ones
+    complete, so the caller can commit to an action early. Returns (text, parser,
+    timings) where timings has first_chunk, first_decision and total in seconds;
+    text is "" if every attempt failed. Rate limit, circuit breaker and retry policy are
+    the shared client's; its deadline bounds waiting and retries, not a running stream.
+    """
+    client = get_client(model)
+    if not client.calls.enter():
+        print("[GEMINI] Client already closed; request not sent.")
+        return "", NavigationStreamParser(), {"total": 0.0}
+    try:
+        return _stream_navigation(client, image, prompt, on_fields)
+    finally:
+        client.calls.leave()
+
+def _stream_navigation(client, image, prompt: str, on_fields):
+    image_part = {"mime_type": "image/jpeg", "data": image}
+    deadline_at = time.monotonic() + client.deadline
+    upstream = False # Whether the service itself failed an attempt
+    for attempt in range(client.max_retries):
+        parser = NavigationStreamParser()
+        timings = {}
+        started_at = time.monotonic()
+        if not client.before_request(deadline_at):
+            if attempt == 0:
+                return "", parser, {"total": 0.0}
+            break
+        try:
+            response = client.model.generate_content(
+                contents=[prompt, image_part],
+                generation_config={"temperature": 0.2, "max_output_tokens": 200,
+                                   "response_mime_type": "application/json",
+                                   "response_schema": GEMINI_NAVIGATION_SCHEMA},
+                stream=True
+            )
+            for chunk in response:
+                if "first_chunk" not in timings:
+                    timings["first_chunk"] = time.monotonic() - started_at
+                if parser.feed(chunk.text):
+                    if "first_decision" not in timings and decision_ready(parser.fields):
+                        timings["first_decision"] = time.monotonic() - started_at
+                    if on_fields is not None:
+                        on_fields(dict(parser.fields))
+            timings["total"] = time.monotonic() - started_at
+            timings.setdefault("first_decision", timings["total"])
+            client.record_success(timings["total"])
+            metrics.observe("gemini.stream_total", timings["total"])
+            metrics.observe("gemini.first_decision", timings["first_decision"])
+            return parser.text.strip(), parser, timings
+        except Exception as e:
+            if parser.fields: # Keep what already arrived rather than asking again
+                print(f"Gemini stream broke after {len(parser.fields)} fields: {e}")
+                timings["total"] = time.monotonic() - started_at
+                timings.setdefault("first_decision", timings["total"])
+                return parser.text.strip(), parser, timings
+            upstream = True
+            if not client.retry_after(e, attempt, deadline_at):
+                break
+    client.record_give_up(upstream)
+    return "", parser, {"total": time.monotonic() - started_at}
@@ -0,0 +1,133 @@
+"""
+Visual tracking of the goal between Gemini requests.
+
+After an answer that boxes the goal, GoalTracker keeps a template of that region and
+finds it again in each following step's frame with OpenCV template matching over a
+few scales. The match gives the goal's direction and, from how much the box has grown
+or shrunk, its proximity, so the robot can keep steering without a round-trip.
+update() answers a whole step in place of Gemini; follow() matches a single frame, and
+is what the navigation loop calls on buffered camera frames while a drive is running,
+to trim or re-aim the drive at camera rate. Tracking ends, and the loop asks Gemini
+again, when the match score drops, after a set number of tracked steps, or when the
+path was not clear at the last answer.
+"""
+import cv2
+import metrics
+from payload_controller import direction_from_x
+
+TRACK_REFRESH_STEPS = 4 # Tracked steps in a row before Gemini is consulted again
+TRACK_MIN_SCORE = 0.6 # Normalised correlation below which the goal counts as lost
+TEMPLATE_UPDATE_SCORE = 0.85 # Matches at least this good replace the template (follows size and lighting)
+TRACK_SCALES = (0.9, 1.0, 1.12) # Template sizes tried per frame, relative to the last match
+MIN_TEMPLATE_SIZE = 6 # Pixels; smaller boxes are not tracked
+TEMPLATE_MARGIN = 0.5 # Context kept around the box, per side, as a fraction of its size (plain objects match poorly)
+
+# Rough distances (metres) behind each proximity answer, to turn box growth into proximity
+PROXIMITY_DISTANCES = [("very close", 0.3), ("reachable", 0.5), ("near", 0.9), ("medium", 1.7), ("far", 3.0)]
+
+
+def _proximity_for_distance(distance: float) -> str:
+    # Nearest label, comparing on a log scale since the bands widen with distance
+    for (label, nominal), (_, further) in zip(PROXIMITY_DISTANCES, PROXIMITY_DISTANCES[1:]):
+        if distance <= (nominal * further) ** 0.5:
+            return label
+    return PROXIMITY_DISTANCES[-1][0]
+
+
+class GoalTracker:
+    """
+    start() locks onto a goal box from an answer; update() follows it in a new step's frame
+    and returns advice in the same form as a Gemini answer, or None when Gemini should be
+    asked. follow() does the same for any frame without counting a tracked step.
+    Boxes are (x0, y0, x1, y1) as fractions of the frame size.
+    """
+
+    def __init__(self, refresh_steps: int = TRACK_REFRESH_STEPS, min_score: float = TRACK_MIN_SCORE):
+        self.refresh_steps = refresh_steps
+        self.min_score = min_score
+        self._template = None # Goal box plus context
+        self._inner = None # The goal box inside the template: x, y, width, height as fractions of it
+        self._distance = None # Metres estimated at the last answer
+        self._width_at_answer = None
+        self._path = None
+        self._steps = 0
+        self.tracked_steps = 0
+        self.lost = 0
+
+    @property
+    def active(self) -> bool:
+        return self._template is not None
+
+    def start(self, frame, box, advice) -> bool:
+        """Locks onto `box` in `frame`, the frame `advice` answered. Returns True if tracking started."""
+        self.stop()
+        if box is None or advice.get("path_status") != "clear":
+            return False # Only steer blind while the path was last seen clear
+        height, width = frame.shape[:2]
+        x, y = int(box[0] * width), int(box[1] * height)
+        w, h = int((box[2] - box[0]) * width), int((box[3] - box[1]) * height)
+        if w < MIN_TEMPLATE_SIZE or h < MIN_TEMPLATE_SIZE:
+            return False
+        pad_x, pad_y = int(w * TEMPLATE_MARGIN), int(h * TEMPLATE_MARGIN)
+        tx0, ty0 = max(0, x - pad_x), max(0, y - pad_y)
+        tx1, ty1 = min(width, x + w + pad_x), min(height, y + h + pad_y)
+        self._template = frame[ty0:ty1, tx0:tx1, :3].copy()
+        self._inner = ((x - tx0) / (tx1 - tx0), (y - ty0) / (ty1 - ty0), w / (tx1 - tx0), h / (ty1 - ty0))
+        self._width_at_answer = w
+        self._distance = dict(PROXIMITY_DISTANCES).get(advice.get("goal_proximity"), PROXIMITY_DISTANCES[-1][1])
+        self._path = (advice["path_status"], advice.get("obstacle_info", "none"))
+        self._steps = 0
+        return True
+
+    def stop(self):
+        self._template = None
+
+    def update(self, frame):
+        if not self.active:
+            return None
+        if self._steps >= self.refresh_steps:
+            self.stop() # Time for a fresh look at the path and the goal
+            return None
+        advice = self.follow(frame)
+        if advice is not None:
+            self._steps += 1
+            self.tracked_steps += 1
+        return advice
+
+    def follow(self, frame):
+        """Advice for the goal in `frame`, e.g. one taken mid-move; None (and tracking stops) if lost."""
+        if not self.active:
+            return None
+        image = frame[:, :, :3]
+        best = None
+        for scale in TRACK_SCALES:
+            w = int(round(self._template.shape[1] * scale))
+            h = int(round(self._template.shape[0] * scale))
+            if w < MIN_TEMPLATE_SIZE or h < MIN_TEMPLATE_SIZE or w > image.shape[1] or h > image.shape[0]:
+                continue
+            template = self._template if scale == 1.0 else cv2.resize(self._template, (w, h))
+            _, score, _, (x, y) = cv2.minMaxLoc(cv2.matchTemplate(image, template, cv2.TM_CCOEFF_NORMED))
+            if best is None or score > best[0]:
+                best = (score, (x, y, w, h))
+        if best is None or best[0] < self.min_score:
+            print(f"[TRACK] Lost the goal (match {best[0] if best else 0.0:.2f}), asking Gemini.")
+            metrics.increment("track.lost")
+            self.lost += 1
+            self.stop()
+            return None
+
+        score, (tx, ty, tw, th) = best
+        if score >= TEMPLATE_UPDATE_SCORE:
+            self._template = image[ty:ty + th, tx:tx + tw].copy()
+        x, y = tx + self._inner[0] * tw, ty + self._inner[1] * th
+        w, h = self._inner[2] * tw, self._inner[3] * th
+        height, width = frame.shape[:2]
+        return {
+            "goal_visible": True,
+            "goal_direction": direction_from_x((x + w / 2) / width),
+            "goal_proximity": _proximity_for_distance(self._distance * self._width_at_answer / w),
+            "path_status": self._path[0],
+            "obstacle_info": self._path[1],
+            "confidence": score,
+            "goal_box": (x / width, y / height, (x + w) / width, (y + h) / height),
+        }
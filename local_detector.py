@@ -0,0 +1,161 @@
+import importlib.util
+import os
+
+# Backends are only looked up here; importing them (torch, tensorflow) takes seconds on a Pi
+# and happens when a LocalDetector is created
+ULTRALYTICS_AVAILABLE = importlib.util.find_spec("ultralytics") is not None
+CVLIB_AVAILABLE = importlib.util.find_spec("cvlib") is not None
+
+DETECTOR_MODEL = os.getenv("ROBOGO_DETECTOR_MODEL", "yolov8n.pt")
+DETECTOR_IMGSZ = 320
+MIN_GOAL_CONFIDENCE = 0.55 # Below this the step is escalated to Gemini
+MIN_OBSTACLE_CONFIDENCE = 0.35
+CORRIDOR_HALF_WIDTH = 0.2 # Fraction of the frame width either side of centre the robot drives through
+CORRIDOR_TOP = 0.55 # Obstacles are only considered in the lower part of the frame
+
+# Goal words that name a COCO class differently
+GOAL_SYNONYMS = {
+    "ball": "sports ball",
+    "football": "sports ball",
+    "soccer ball": "sports ball",
+    "tennis ball": "sports ball",
+    "mug": "cup",
+    "sofa": "couch",
+    "table": "dining table",
+    "plant": "potted plant",
+    "phone": "cell phone",
+    "mobile": "cell phone",
+    "tv": "tv",
+    "television": "tv",
+    "monitor": "tv",
+    "man": "person",
+    "woman": "person",
+    "human": "person",
+    "kid": "person",
+    "child": "person",
+    "bike": "bicycle",
+    "bag": "backpack",
+    "computer": "laptop",
+}
+
+
+def available() -> bool:
+    return ULTRALYTICS_AVAILABLE or CVLIB_AVAILABLE
+
+
+def _direction_from_center(center_x: float) -> str:
+    offset = center_x - 0.5
+    if abs(offset) < 0.1:
+        return "center"
+    side = "left" if offset < 0 else "right"
+    return f"slightly {side}" if abs(offset) < 0.3 else f"far {side}"
+
+
+def _proximity_from_area(area_fraction: float) -> str:
+    if area_fraction > 0.35:
+        return "very close"
+    if area_fraction > 0.2:
+        return "reachable"
+    if area_fraction > 0.08:
+        return "near"
+    if area_fraction > 0.02:
+        return "medium"
+    return "far"
+
+
+class LocalDetector:
+    """
+    CPU-only object detector (ultralytics YOLO, or cvlib as a fallback) that answers
+    the navigation question locally when it can. advise() returns a dict with the same
+    fields as parse_navigation_advice, or None when the answer should come from Gemini.
+    """
+
+    def __init__(self, backend="auto", model_path=DETECTOR_MODEL, min_confidence=MIN_GOAL_CONFIDENCE):
+        if backend == "auto":
+            backend = "ultralytics" if ULTRALYTICS_AVAILABLE else "cvlib"
+        if (backend == "ultralytics" and not ULTRALYTICS_AVAILABLE) or (backend == "cvlib" and not CVLIB_AVAILABLE) \
+                or backend not in ("ultralytics", "cvlib"):
+            raise ValueError(f"Local detector backend '{backend}' is not available.")
+        self.backend = backend
+        self.min_confidence = min_confidence
+        if backend == "ultralytics":
+            from ultralytics import YOLO
+            self._model = YOLO(model_path)
+        else:
+            import cvlib
+            self._cvlib = cvlib
+            self._model = None
+        print(f"[INFO] Local detector ready ({backend}).")
+
+    def detect(self, frame):
+        """Returns a list of (label, confidence, (x1, y1, x2, y2)) in pixels."""
+        if self.backend == "ultralytics":
+            result = self._model(frame, imgsz=DETECTOR_IMGSZ, device="cpu", verbose=False)[0]
+            boxes = result.boxes
+            return [(result.names[int(cls)], float(conf), tuple(float(v) for v in xyxy))
+                    for xyxy, conf, cls in zip(boxes.xyxy.tolist(), boxes.conf.tolist(), boxes.cls.tolist())]
+        bboxes, labels, confidences = self._cvlib.detect_common_objects(frame, confidence=MIN_OBSTACLE_CONFIDENCE,
+                                                                        model="yolov4-tiny")
+        return [(label, float(conf), tuple(float(v) for v in box))
+                for box, label, conf in zip(bboxes, labels, confidences)]
+
+    @staticmethod
+    def goal_label(goal_object: str):
+        """Maps a free-text goal such as 'red ball' to a detector class name, if any."""
+        goal = goal_object.lower().strip()
+        for phrase, label in GOAL_SYNONYMS.items():
+            if phrase in goal.split() or phrase == goal:
+                return label
+        return goal.split()[-1] if goal else None
+
+    def advise(self, frame, goal_object: str):
+        label = self.goal_label(goal_object)
+        if not label:
+            return None
+        height, width = frame.shape[:2]
+        detections = self.detect(frame)
+        goal = f" {' '.join(goal_object.lower().split())} "
+        # Whole words only, so "car" does not match a "scarf"; multi-word classes ("cell phone") still match
+        goals = [d for d in detections if d[0] == label or f" {d[0]} " in goal]
+        if not goals:
+            return None # Absence in a small detector is not evidence; let Gemini look
+        name, confidence, (x1, y1, x2, y2) = max(goals, key=lambda d: d[1])
+        if confidence < self.min_confidence:
+            return None
+
+        center_x = (x1 + x2) / 2 / width
+        area_fraction = (x2 - x1) * (y2 - y1) / float(width * height)
+        proximity = _proximity_from_area(area_fraction)
+
+        # Anything else detected in the lower-centre corridor is in the robot's way
+        obstacles = [d for d in detections if d[0] != name and d[1] >= MIN_OBSTACLE_CONFIDENCE
+                     and d[2][2] / width > 0.5 - CORRIDOR_HALF_WIDTH and d[2][0] / width < 0.5 + CORRIDOR_HALF_WIDTH
+                     and d[2][3] / height > CORRIDOR_TOP]
+        if obstacles:
+            return None # Path status is uncertain; escalate
+
+        return {
+            "goal_visible": True,
+            "goal_direction": _direction_from_center(center_x),
+            "goal_proximity": proximity,
+            "path_status": "unknown", # COCO classes miss walls and clutter; the obstacle check above is not a clear path
+            "obstacle_info": "none",
+            "confidence": confidence,
+            "goal_box": (x1 / width, y1 / height, x2 / width, y2 / height),
+        }
+
+
+def create_local_detector():
+    """LocalDetector if a backend is installed and loads, else None."""
+    if not available():
+        print("[INFO] No local detector backend installed (ultralytics/cvlib); using Gemini only.")
+        return None
+    for backend, installed in (("ultralytics", ULTRALYTICS_AVAILABLE), ("cvlib", CVLIB_AVAILABLE)):
+        if not installed:
+            continue
+        try:
+            return LocalDetector(backend=backend)
+        except Exception as e: # Torch/TensorFlow import problems on the Pi show up as all sorts of errors
+            print(f"WARNING: Could not load local detector ({backend}): {e}.")
+    print("[INFO] Using Gemini only.")
+    return None
@@ -1,46 +1,144 @@
-import os
 import time
+_STARTED_AT = time.monotonic() # Process start, for the startup phase timings
+import os
 import cv2
 import traceback # Import traceback for detailed error logging
+from concurrent.futures import ThreadPoolExecutor
+
+from gemini_utils import (configure_gemini, warm_up_gemini, ask_gemini, encode_frame, GEMINI_SCENE_PROMPT,
+                          GEMINI_PHRASES)
+from camera import setup_camera, BufferedCamera, MockCamera
+from navigation import pursue_object, navigation_phrases, NAVIGATION_PHRASES
+from scene_cache import AdviceCache
+from payload_controller import PayloadController
+from goal_tracker import GoalTracker
+from spatial_memory import SpatialMemory
+from speech import speak, flush_speech, warm_up_speech, speech_cache_stats, PRIORITY_URGENT
+from local_detector import create_local_detector
+from robot_controller import stop, ON_ROBOT, DEFAULT_MOTORS # Import stop, ON_ROBOT and the motors to track
+from session_recorder import SessionRecorder
+import metrics
+_IMPORTS_DONE_AT = time.monotonic()
+
+MAIN_PHRASES = [
+    "Hello! I'm ready. Let me take a look around.",
+    "I had trouble describing the initial scene.",
+    "I couldn't get an initial image from the camera.",
+    "Please tell me what to look for.",
+    "I found it! Task complete.",
+    "I tried my best but couldn't complete the task this time.",
+    "Okay, stopping now.",
+    "Oh dear, something went very wrong.",
+]
+
+
+def _timed_phase(timings: dict, name: str, phase, *args):
+    started_at = time.monotonic()
+    try:
+        return phase(*args)
+    finally:
+        timings[name] = time.monotonic() - started_at
+        metrics.observe(f"startup.{name}", timings[name])
+
+
+def _bring_up_camera(width: int, height: int):
+    camera = setup_camera(width, height)
+    if not isinstance(camera, MockCamera): # Picamera2 needs an explicit start; MockCamera is started by 'with'
+        camera.start()
+        print("[INFO] Picamera2 started.")
+    return camera
 
-from gemini_utils import configure_gemini, ask_gemini, encode_frame_to_base64, GEMINI_SCENE_PROMPT
-from camera import setup_camera
-from navigation import pursue_object
-from speech import speak
-from robot_controller import stop, ON_ROBOT # Import stop and ON_ROBOT
+
+def _bring_up_gemini():
+    model = configure_gemini()
+    warm_up_gemini(model) # Connection set up while the camera starts, not on the first real request
+    return model
+
+
+def startup(width: int, height: int, concurrent: bool = True):
+    """
+    Brings up the camera and the Gemini model (with a connection warm-up) at the same
+    time, while the speech phrase bank renders in the background. Returns
+    (camera, model, gemini_error, timings); the camera is returned even if Gemini failed.
+    """
+    timings = {"imports": _IMPORTS_DONE_AT - _STARTED_AT}
+    metrics.observe("startup.imports", timings["imports"])
+    warm_up_speech(MAIN_PHRASES + GEMINI_PHRASES + NAVIGATION_PHRASES) # Background, fills the phrase cache
+
+    phases = {"camera": (_bring_up_camera, (width, height)), "gemini": (_bring_up_gemini, ())}
+    results, errors = {}, {}
+    if concurrent:
+        with ThreadPoolExecutor(max_workers=len(phases), thread_name_prefix="startup") as pool:
+            futures = {name: pool.submit(_timed_phase, timings, name, phase, *args)
+                       for name, (phase, args) in phases.items()}
+            for name, future in futures.items():
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    errors[name] = e
+    else:
+        for name, (phase, args) in phases.items():
+            try:
+                results[name] = _timed_phase(timings, name, phase, *args)
+            except Exception as e:
+                errors[name] = e
+    if "camera" in errors: # setup_camera already falls back to the mock, so this is unexpected
+        raise errors["camera"]
+    timings["ready"] = time.monotonic() - _STARTED_AT
+    metrics.observe("startup.ready", timings["ready"])
+    return results["camera"], results.get("gemini"), errors.get("gemini"), timings
+
+
+def _print_startup(timings: dict, concurrent: bool):
+    phases = " | ".join(f"{name} {seconds:.2f}s" for name, seconds in timings.items())
+    print(f"[STARTUP] {phases} ({'concurrent' if concurrent else 'sequential'} bring-up)")
 
 
 def main():
     CAMERA_WIDTH = 320
     CAMERA_HEIGHT = 240
+    PIPELINED_NAVIGATION = os.getenv("ROBOGO_PIPELINED", "0") == "1" # Opt-in overlapped perceive/act loop
+    STREAMING_NAVIGATION = os.getenv("ROBOGO_STREAMING", "0") == "1" # Act on partial (streamed) Gemini answers
+    SCAN_HEADINGS = int(os.getenv("ROBOGO_SCAN_HEADINGS", "6")) # Views per multi-view search scan (0 disables)
+    SCAN_SCALE = float(os.getenv("ROBOGO_SCAN_SCALE", "0.5")) # Resolution factor of scan views
+    ADAPTIVE_PAYLOAD = os.getenv("ROBOGO_ADAPTIVE_PAYLOAD", "1") == "1" # Size/crop frames by latency and goal
+    TRACK_REFRESH_STEPS = int(os.getenv("ROBOGO_TRACK_REFRESH_STEPS", "4")) # Tracked steps between answers (0: off)
+    SPATIAL_MEMORY = os.getenv("ROBOGO_SPATIAL_MEMORY", "1") == "1" # Plan search turns from a dead-reckoned map
+    SCENE_CACHE = os.getenv("ROBOGO_SCENE_CACHE", "1") == "1" # Reuse advice when the view has not changed
+    LOCAL_DETECTOR = os.getenv("ROBOGO_LOCAL_DETECTOR", "1") == "1" # Answer from a CPU detector when confident
+    BUFFERED_CAMERA = os.getenv("ROBOGO_BUFFERED_CAMERA", "1") == "1" # Grab frames on a background thread
+    RECORD_DIR = os.getenv("ROBOGO_RECORD", "") # Record the session for offline replay (session_recorder.py)
+    CONCURRENT_STARTUP = os.getenv("ROBOGO_CONCURRENT_STARTUP", "1") == "1" # Camera and Gemini set up in parallel
     # TFLITE_MODEL_PATH = "Sample_TFLite_model/detect.tflite" # Path to your TFLite model
     # LABEL_MAP_PATH = "/home/pi/robotics/project/labelmap.txt" # Path to your labelmap
 
-    try:
-        model_gemini = configure_gemini()
-    except ValueError as e:
-        print(f"FATAL ERROR: {e}")
-        speak("There was a critical error setting up my vision system. I cannot proceed.")
-        return
-    except Exception as e:
-        print(f"FATAL ERROR during Gemini configuration: {e}")
-        speak("An unexpected error occurred while setting up my vision system.")
-        return
-
-    # Using context manager for camera if Picamera2, or if MockCamera implements it
-    # Use 'with' statement for robustness, as defined in camera.py's MockCamera __enter__/__exit__
-    with setup_camera(CAMERA_WIDTH, CAMERA_HEIGHT) as camera_resource: # Use 'with' statement
-        # Manual start for Picamera2, as it might not be in context manager yet if not the actual type
-        # Or if Picamera2 needs a separate start call outside the __enter__ for some reason.
-        # The 'with' statement will call .start() for MockCamera.
-        # This explicit check makes it identical to the original logic.
-        try:
-            from picamera2 import Picamera2 # Re-import to check type
-            if isinstance(camera_resource, Picamera2):
-                camera_resource.start()
-                print("[INFO] Picamera2 started.")
-        except ImportError:
-            pass # Picamera2 not available, so it's a MockCamera, already started by 'with'
+    camera_resource, model_gemini, gemini_error, startup_timings = startup(CAMERA_WIDTH, CAMERA_HEIGHT,
+                                                                           concurrent=CONCURRENT_STARTUP)
+
+    # Use 'with' statement for robustness: closes Picamera2 / stops MockCamera on the way out,
+    # also when Gemini could not be set up (the camera was brought up concurrently).
+    # The 'with' statement will call .start() for MockCamera; Picamera2 was started by startup().
+    with camera_resource:
+        if isinstance(gemini_error, ValueError):
+            print(f"FATAL ERROR: {gemini_error}")
+            speak("There was a critical error setting up my vision system. I cannot proceed.",
+                  priority=PRIORITY_URGENT, wait=True)
+            return
+        if gemini_error is not None:
+            print(f"FATAL ERROR during Gemini configuration: {gemini_error}")
+            speak("An unexpected error occurred while setting up my vision system.",
+                  priority=PRIORITY_URGENT, wait=True)
+            return
+
+        recorder = None
+        if RECORD_DIR:
+            recorder = SessionRecorder(os.path.join(RECORD_DIR, time.strftime("%Y-%m-%d_%H%M%S")))
+
+        buffered_camera = None
+        if BUFFERED_CAMERA: # Stopped in the finally below, before the 'with' closes the camera itself
+            buffered_camera = BufferedCamera(camera_resource)
+            buffered_camera.start()
+            camera_resource = buffered_camera
 
         try:
             speak("Hello! I'm ready. Let me take a look around.")
@@ -48,15 +146,25 @@ def main():
             initial_frame_rgb = camera_resource.capture_array(name="main")
 
             if initial_frame_rgb is not None and initial_frame_rgb.size > 0:
-                b64_initial_img = encode_frame_to_base64(initial_frame_rgb)
-                scene_description = ask_gemini(model_gemini, b64_initial_img, GEMINI_SCENE_PROMPT)
+                initial_jpeg = encode_frame(initial_frame_rgb)
+                scene_started_at = time.perf_counter()
+                scene_description = ask_gemini(model_gemini, initial_jpeg, GEMINI_SCENE_PROMPT)
+                if recorder is not None:
+                    recorder.record_step({"kind": "scene", "prompt": GEMINI_SCENE_PROMPT,
+                                          "advice_text": scene_description,
+                                          "timings": {"gemini": time.perf_counter() - scene_started_at}},
+                                         initial_frame_rgb)
                 if scene_description:
                     speak(scene_description)
+                    startup_timings["first_action"] = time.monotonic() - _STARTED_AT # Time to first description
+                    metrics.observe("startup.first_action", startup_timings["first_action"])
                 else:
                     speak("I had trouble describing the initial scene.")
             else:
                 speak("I couldn't get an initial image from the camera.")
 
+            _print_startup(startup_timings, CONCURRENT_STARTUP)
+
             goal_object_input = ""
             while not goal_object_input:
                 goal_object_input = input(
@@ -64,7 +172,21 @@ def main():
                 if not goal_object_input:
                     speak("Please tell me what to look for.")
 
-            pursuit_successful = pursue_object(model_gemini, camera_resource, goal_object_input)
+            warm_up_speech(navigation_phrases(goal_object_input)) # Goal-specific templates
+            if recorder is not None:
+                recorder.set_goal(goal_object_input)
+
+            tracker = GoalTracker(TRACK_REFRESH_STEPS) if TRACK_REFRESH_STEPS > 0 else None
+            memory = SpatialMemory().attach(DEFAULT_MOTORS) if SPATIAL_MEMORY else None
+            pursuit_successful = pursue_object(model_gemini, camera_resource, goal_object_input,
+                                               pipelined=PIPELINED_NAVIGATION,
+                                               streaming=STREAMING_NAVIGATION,
+                                               scan_headings=SCAN_HEADINGS, scan_scale=SCAN_SCALE,
+                                               advice_cache=AdviceCache() if SCENE_CACHE else None,
+                                               detector=create_local_detector() if LOCAL_DETECTOR else None,
+                                               recorder=recorder,
+                                               payload_controller=PayloadController() if ADAPTIVE_PAYLOAD else None,
+                                               tracker=tracker, memory=memory)
 
             if pursuit_successful:
                 speak("I found it! Task complete.")
@@ -73,17 +195,23 @@ def main():
 
         except KeyboardInterrupt:
             print("\n[INFO] Program interrupted by user.")
-            speak("Okay, stopping now.")
+            speak("Okay, stopping now.", priority=PRIORITY_URGENT)
         except Exception as e:
             print(f"[FATAL ERROR] An unexpected error occurred in main loop: {e}")
-            speak("Oh dear, something went very wrong.")
+            speak("Oh dear, something went very wrong.", priority=PRIORITY_URGENT)
             traceback.print_exc() # Print full traceback for debugging
         finally:
             print("[INFO] Program shutting down.")
             # Camera resource is stopped by the 'with' statement's __exit__
+            if buffered_camera is not None:
+                buffered_camera.stop()
+            if recorder is not None:
+                recorder.close()
             if ON_ROBOT:
                 stop() # Ensure motors are stopped
             cv2.destroyAllWindows() # Close any OpenCV windows if used
+            flush_speech(timeout=15) # Let queued messages finish before the process exits
+            print(f"[INFO] Speech cache: {speech_cache_stats()}")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,164 @@
+"""
+Lightweight in-process metrics for the control loop.
+
+Stage timings (monotonic seconds) go into histograms with p50/p95/p99 over a
+sliding window of recent samples; retries and failures go into counters.
+Snapshots export as JSON lines or Prometheus text. When disabled (the default,
+enable with ROBOGO_METRICS=1) timed() hands out a shared no-op context manager,
+so instrumented code pays one function call.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+ENABLED = os.getenv("ROBOGO_METRICS", "0") == "1"
+METRICS_JSONL = os.getenv("ROBOGO_METRICS_JSONL", "") # Append a snapshot per pursuit to this file
+METRICS_PROM = os.getenv("ROBOGO_METRICS_PROM", "") # Rewrite a Prometheus text snapshot to this file
+SAMPLE_WINDOW = 2048 # Recent samples kept per histogram for percentiles
+QUANTILES = (0.5, 0.95, 0.99)
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = {}
+
+
+class _Histogram:
+    __slots__ = ("count", "total", "samples")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.samples = deque(maxlen=SAMPLE_WINDOW)
+
+    def quantile(self, q: float) -> float:
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def enable(on: bool = True):
+    global ENABLED
+    ENABLED = on
+
+
+def observe(name: str, seconds: float):
+    if not ENABLED:
+        return
+    with _lock:
+        histogram = _histograms.get(name)
+        if histogram is None:
+            histogram = _histograms[name] = _Histogram()
+        histogram.count += 1
+        histogram.total += seconds
+        histogram.samples.append(seconds)
+
+
+def increment(name: str, amount: int = 1):
+    if not ENABLED:
+        return
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+class _Timer:
+    __slots__ = ("name", "started_at")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started_at = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        observe(self.name, time.monotonic() - self.started_at)
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timed(name: str):
+    """with metrics.timed("gemini.request"): ... records the block's duration."""
+    return _Timer(name) if ENABLED else _NULL_TIMER
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def snapshot() -> dict:
+    with _lock:
+        histograms = {name: {"count": h.count, "sum": h.total,
+                             **{f"p{int(q * 100)}": h.quantile(q) for q in QUANTILES}}
+                      for name, h in _histograms.items()}
+        return {"timestamp": time.time(), "histograms": histograms, "counters": dict(_counters)}
+
+
+def export_jsonl(path: str, **labels):
+    record = snapshot()
+    record.update(labels)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+
+def _prom_name(name: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in name)
+
+
+def prometheus_text() -> str:
+    snap = snapshot()
+    lines = ["# TYPE robogo_stage_seconds summary"]
+    for name, h in sorted(snap["histograms"].items()):
+        for q in QUANTILES:
+            lines.append(f'robogo_stage_seconds{{stage="{name}",quantile="{q}"}} {h[f"p{int(q * 100)}"]:.6f}')
+        lines.append(f'robogo_stage_seconds_sum{{stage="{name}"}} {h["sum"]:.6f}')
+        lines.append(f'robogo_stage_seconds_count{{stage="{name}"}} {h["count"]}')
+    lines.append("# TYPE robogo_events_total counter")
+    for name, value in sorted(snap["counters"].items()):
+        lines.append(f'robogo_events_total{{event="{_prom_name(name)}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def export_prometheus(path: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path) # Scrapers never see a half-written file
+
+
+def print_step_summary(prefix: str = "step."):
+    """
+    Where the time per step went: mean per step and share of the total, by stage.
+    Covers every step this process recorded (the "steps" counter), across pursuits.
+    """
+    if not ENABLED:
+        return
+    snap = snapshot()
+    steps = snap["counters"].get("steps", 0)
+    if steps <= 0:
+        return
+    stages = {name[len(prefix):]: h for name, h in snap["histograms"].items() if name.startswith(prefix)}
+    total = sum(h["sum"] for h in stages.values()) or 1.0
+    print(f"\n[METRICS] Time per step over {steps} steps:")
+    print(f"  {'stage':<10}{'ms/step':>9}{'share':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}")
+    for name, h in sorted(stages.items(), key=lambda item: -item[1]["sum"]):
+        print(f"  {name:<10}{h['sum'] * 1000 / steps:>9.1f}{h['sum'] / total:>8.0%}"
+              f"{h['p50'] * 1000:>9.1f}{h['p95'] * 1000:>9.1f}{h['p99'] * 1000:>9.1f}")
+    if snap["counters"]:
+        print(f"  counters: {snap['counters']}")
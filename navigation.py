@@ -1,137 +1,911 @@
 import random
 import time
-from speech import speak
-from robot_controller import forward, backward, left, right, stop, execute_move, ON_ROBOT # Import ON_ROBOT
-from gemini_utils import encode_frame_to_base64, ask_gemini, parse_navigation_advice, GEMINI_NAVIGATION_PROMPT_TEMPLATE
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from speech import speak, PRIORITY_STATUS
+from robot_controller import forward, backward, left, right, ON_ROBOT, FULL_TURN_DURATION, DEFAULT_MOTORS
+from gemini_utils import (encode_frame, ask_gemini, ask_gemini_streaming, ask_gemini_scan, gemini_available,
+                          parse_navigation_advice,
+                          parse_scan_advice, GEMINI_NAVIGATION_PROMPT_TEMPLATE, GEMINI_NAVIGATION_JSON_PROMPT_TEMPLATE,
+                          GEMINI_SCAN_PROMPT_TEMPLATE)
+from scene_cache import frame_signature
+from payload_controller import describe as describe_payload
+import metrics
+
+MAX_STEPS = 40
+REACHED_PROXIMITY = ["reachable", "very close"]
+LOST_GOAL_COUNT_THRESHOLD = 3
+MAX_CORRECTIONS = 2
+STEP_PAUSE = 0.6 # Pause between steps in the sequential loop
+PIPELINE_SETTLE_TIME = 0.2 # Pause after a move before the pipelined loop captures a new frame
+ANSWER_TIME_ALPHA = 0.3 # Weight of the newest step in the pipelined loop's smoothed frame-to-answer time
+MIN_DRIVE = 0.1 # Seconds; a forward move shortened below this is dropped
+OUTAGE_PAUSE = 2.0 # Wait after a step without advice while the Gemini circuit breaker is open
+SCAN_HEADINGS = 0 # Views per multi-view scan; off unless the caller asks (main.py turns it on)
+SCAN_SCALE = 0.5 # Scan views are downscaled by this factor before encoding
+SCAN_QUALITY = 70 # JPEG quality of scan views
+SCAN_POSITION_TURN = {"left": -0.15, "right": 0.15} # Extra right-turn seconds for the goal's position in its view
+TRACK_MAX_MOVE = 0.8 # Longest forward move on a tracked step, so steering is revisited often
+LOCAL_MAX_MOVE = 0.5 # Longest forward move on a path no answer has checked (local detector)
+
+PROXIMITY_DURATIONS = {
+    "very close": 1.2,
+    "reachable": 1.6,
+    "near": 2.0,
+    "medium": 2.2,
+    "far": 2.4
+}
+
+# Fixed phrases spoken by the pursuit loop, pre-rendered by speech.warm_up_speech at startup
+NAVIGATION_PHRASES = [
+    "I couldn't get an image from the camera for this step.",
+    "I could not get navigation advice for this view. I will try turning.",
+    "Minor obstacle detected. Adjusting to avoid while staying aligned.",
+    "Goal is close. Trying to push forward gently.",
+    "Path blocked. Reorienting.",
+    "Path is clear. Moving toward the object.",
+    "Edging toward the object.",
+    "Goal lost. Scanning.",
+    "Blocked. Turning.",
+    "Minor obstacle ahead. Avoiding.",
+    "Path clear but goal not visible. Exploring.",
+    "Uncertain. Making a small turn.",
+    "Goal lost. Scanning around.",
+    "Vision service unavailable. Stopping until it recovers.",
+]
+
+
+def navigation_phrases(goal_object: str) -> list:
+    """Every phrase the pursuit loop can say for this goal, for speech warm-up."""
+    return [
+        f"Okay, I will look for the {goal_object}.",
+        f"Adjusting left toward {goal_object}.",
+        f"Adjusting right toward {goal_object}.",
+        f"I have reached the {goal_object}! Pursuit successful.",
+        f"I don't see the {goal_object}.",
+        f"Maximum steps reached. I could not definitively reach the {goal_object}.",
+        f"I spotted the {goal_object}. Turning toward it.",
+        f"I could not spot the {goal_object} anywhere around me.",
+        f"Turning back to where I last saw the {goal_object}.",
+    ] + NAVIGATION_PHRASES
+
+
+def _print_advice(advice):
+    print(f"🧠 Gemini Advice:\n"
+          f"  Goal Visible: {advice['goal_visible']}\n"
+          f"  Direction: {advice['goal_direction']}\n"
+          f"  Proximity: {advice['goal_proximity']}\n"
+          f"  Path: {advice['path_status']}\n"
+          f"  Obstacle: {advice['obstacle_info']}")
+
+
+def _summarize_advice(advice) -> str:
+    summary = f"Goal is {'' if advice['goal_visible'] else 'not '}visible. "
+    if advice['goal_visible']:
+        summary += f"It's {advice['goal_direction']} and {advice['goal_proximity']}. "
+    summary += f"Path is {advice['path_status']}"
+    if "obstacle" in advice['path_status'].lower() and advice['obstacle_info'] not in ["none", ""]:
+        summary += f" with {advice['obstacle_info']}."
+    return summary
+
+
+def _correction_actions(advice, goal_object: str, state: dict) -> list:
+    # Turn toward a goal seen off-centre, within the per-pursuit correction budget.
+    # Corrections from the tracker cost no Gemini round-trip and are not budgeted.
+    tracked = advice.get("source") == "track"
+    if not tracked and state["correction_count"] >= MAX_CORRECTIONS:
+        return []
+    direction = advice.get("goal_direction", "")
+    if direction in ["slightly left", "far left"]:
+        actions = [("say", f"Adjusting left toward {goal_object}."),
+                   ("move", left, 0.15 if "slightly" in direction else 0.45)]
+    elif direction in ["slightly right", "far right"]:
+        actions = [("say", f"Adjusting right toward {goal_object}."),
+                   ("move", right, 0.15 if "slightly" in direction else 0.45)]
+    else:
+        return []
+    if not tracked:
+        state["correction_count"] += 1
+    return actions
+
+
+def _recovery_actions(memory, reason: str, duration: float, queued=()) -> list:
+    # Planned by the spatial memory when there is one, a random turn otherwise.
+    # `queued` are the actions planned before these, whose turns the memory has not seen yet.
+    if memory is None:
+        return [("move", random.choice([left, right]), duration)]
+    return memory.plan(reason, duration, queued)
+
+
+def _plan_step(advice, goal_object: str, state: dict, step: int, scan: bool = False, memory=None, pose=None):
+    """
+    Turns parsed advice into an ordered list of actions for this step.
+    Actions are ("say", text), ("status", text), ("move", move_function, duration), ("scan",) or ("stop",).
+    "status" messages are spoken at low priority and replace any older pending status.
+    With `scan` a lost goal triggers a multi-view scan (first miss, then every
+    LOST_GOAL_COUNT_THRESHOLD misses) instead of a random turn, unless the robot has not
+    driven since the last scan.
+    With a `memory` (spatial_memory.SpatialMemory) the advice is recorded against the
+    robot's estimated pose when the frame was taken (`pose`, from memory.pose(); the
+    current one by default), and recovery turns are planned from it instead of random,
+    after the turns planned before them in the same step;
+    the scan then runs whenever some heading from the current spot is still unchecked.
+    Returns (actions, reached_goal). `state` carries the counters between steps.
+    If the correction turn already ran while the answer streamed in (advice["early_correction"]),
+    it is not planned again.
+    """
+    actions = [("status", _summarize_advice(advice))]
+    action_taken_this_step = False
+    if memory is not None:
+        memory.observe(advice, *(pose or ()))
+
+    if advice["goal_visible"]:
+        state["lost_goal_counter"] = 0
+
+        if not advice.get("early_correction"):
+            actions.extend(_correction_actions(advice, goal_object, state))
+
+        move_duration = PROXIMITY_DURATIONS.get(advice["goal_proximity"], 0.9)
+        if advice.get("source") == "track":
+            move_duration = min(move_duration, TRACK_MAX_MOVE)
+
+        if advice["path_status"] == "minor obstacle":
+            actions.append(("say", "Minor obstacle detected. Adjusting to avoid while staying aligned."))
+            actions.extend(_recovery_actions(memory, "sidestep", 0.15, actions))
+            action_taken_this_step = True
+
+        elif advice["path_status"] in ["major obstacle", "blocked"]:
+            if advice["goal_proximity"] in REACHED_PROXIMITY:
+                actions.append(("say", "Goal is close. Trying to push forward gently."))
+                actions.append(("move", forward, move_duration))
+            else:
+                state["consecutive_blocked_counter"] += 1
+                actions.append(("say", "Path blocked. Reorienting."))
+                actions.extend(_recovery_actions(memory, "detour", 0.6, actions))
+            action_taken_this_step = True
+
+        elif advice["path_status"] == "clear":
+            actions.append(("say", "Path is clear. Moving toward the object."))
+            actions.append(("move", forward, move_duration))
+            action_taken_this_step = True
+
+        elif advice["path_status"] == "unknown": # The local detector sees the goal but not walls or clutter
+            actions.append(("say", "Edging toward the object."))
+            actions.append(("move", forward, min(move_duration, LOCAL_MAX_MOVE)))
+            action_taken_this_step = True
+
+        if advice["goal_proximity"] in REACHED_PROXIMITY:
+            actions.append(("say", f"I have reached the {goal_object}! Pursuit successful."))
+            actions.append(("stop",))
+            return actions, True
+
+    else:
+        state["lost_goal_counter"] += 1
+        actions.append(("say", f"I don't see the {goal_object}."))
+        if memory is not None and memory.goal_recent(): # Seen a few steps ago: turn back rather than scan
+            actions.append(("say", f"Turning back to where I last saw the {goal_object}."))
+            actions.extend(_recovery_actions(memory, "search", 0.6, actions))
+        elif scan and (memory.unchecked_headings() > 0 if memory is not None # Once per spot with a memory
+                       else state["lost_goal_counter"] in (1, LOST_GOAL_COUNT_THRESHOLD)
+                       and not state["scanned_here"]):
+            actions.append(("say", "Goal lost. Scanning around."))
+            actions.append(("scan",))
+            state["scanned_here"] = True
+            if state["lost_goal_counter"] >= LOST_GOAL_COUNT_THRESHOLD:
+                state["lost_goal_counter"] = 0
+        elif state["lost_goal_counter"] >= LOST_GOAL_COUNT_THRESHOLD:
+            actions.append(("say", "Goal lost. Scanning."))
+            actions.extend(_recovery_actions(memory, "search", 0.6, actions))
+            state["lost_goal_counter"] = 0
+        elif advice["path_status"] in ["major obstacle", "blocked"]:
+            state["consecutive_blocked_counter"] += 1
+            actions.append(("say", "Blocked. Turning."))
+            actions.extend(_recovery_actions(memory, "blocked", 0.5, actions))
+        elif advice["path_status"] == "minor obstacle":
+            actions.append(("say", "Minor obstacle ahead. Avoiding."))
+            actions.extend(_recovery_actions(memory, "blocked", 0.35, actions))
+        else:
+            actions.append(("say", "Path clear but goal not visible. Exploring."))
+            actions.extend(_recovery_actions(memory, "search", 0.5, actions))
+        action_taken_this_step = True
+
+    if not action_taken_this_step and step > 0:
+        actions.append(("say", "Uncertain. Making a small turn."))
+        actions.extend(_recovery_actions(memory, "sidestep", 0.2, actions))
+
+    if any(action[0] == "move" and action[1] in (forward, backward) for action in actions):
+        state["scanned_here"] = False # A new spot: a scan from here could show something new
+    return actions, False
+
+
+def _run_actions(actions, motors, scan=None, steer=None):
+    # `scan` runs ("scan",) actions; without it they are skipped. `steer(seconds)`, if given, drives forward moves
+    for action in actions:
+        if action[0] == "say":
+            speak(action[1])
+        elif action[0] == "status":
+            speak(action[1], priority=PRIORITY_STATUS, coalesce_key="situation")
+        elif action[0] == "move" and action[1] is forward and steer is not None:
+            steer(action[2])
+        elif action[0] == "move":
+            motors.execute_move(action[1], action[2])
+        elif action[0] == "scan" and scan is not None:
+            scan()
+        elif action[0] == "stop":
+            motors.stop()
+
+
+def _can_steer(camera, tracker) -> bool:
+    # Camera-rate steering needs buffered frames and a goal to follow in them
+    return tracker is not None and tracker.active and hasattr(camera, "frame_after")
+
+
+def _steered_drive(camera, tracker, motors, seconds: float):
+    """
+    Drives forward for `seconds` while the tracker follows the goal in every buffered frame
+    captured during the drive. If the goal drifts off-centre the rest of the drive is
+    preempted by a correction turn and then resumed, if it is lost or looks close the drive
+    is cut short. Returns the last forward MotionHandle once the drive has ended.
+    """
+    handle = motors.execute_move(forward, seconds, wait=False)
+    seen_after = time.monotonic()
+    while handle is not None and not handle.done():
+        ref = camera.frame_after(seen_after, timeout=0.5)
+        if ref is None:
+            break
+        with ref:
+            seen_after = ref.timestamp + 1e-6
+            view = tracker.follow(ref.array)
+        if view is None or view["goal_proximity"] in REACHED_PROXIMITY:
+            print("[TRACK] Lost the goal during the drive, stopping it." if view is None
+                  else "[TRACK] Goal looks close, stopping the drive.")
+            handle.cancel()
+            break
+        direction = view["goal_direction"]
+        if direction == "center":
+            continue
+        rest = handle.remaining()
+        turn = motors.execute_move(left if "left" in direction else right,
+                                   0.15 if "slightly" in direction else 0.45, wait=False, preempt=True)
+        metrics.increment("track.steered")
+        turn.wait()
+        seen_after = time.monotonic() # Frames from before the turn show the old heading
+        handle = motors.execute_move(forward, rest, wait=False) if rest >= MIN_DRIVE else None
+    if handle is not None:
+        handle.wait()
+    return handle
+
+
+def _grab_frame(camera, not_before=None):
+    """
+    A frame captured no earlier than `not_before` (time.monotonic()). With a BufferedCamera
+    that is the first ring frame after that point, copied out; otherwise a direct capture.
+    """
+    if hasattr(camera, "frame_after"):
+        ref = camera.frame_after(not_before if not_before is not None else time.monotonic())
+        if ref is None:
+            return None
+        with ref:
+            return ref.array.copy() # Kept beyond this step, so it must not pin a ring slot
+    if not_before is not None:
+        time.sleep(max(0.0, not_before - time.monotonic()))
+    return camera.capture_array(name="main")
+
+
+def _scan_for_goal(model, camera, goal_object: str, opts: dict, trace: dict) -> bool:
+    """
+    Rotates right through opts["scan_headings"] evenly spaced headings, capturing a
+    downscaled frame at each, and asks Gemini about all views in one request. If a view
+    shows the goal, turns to face it (shortest way round). Returns True if the goal was found.
+    Every view is recorded in opts["memory"], if there is one, at the heading it was taken.
+    """
+    headings = opts["scan_headings"]
+    turn = FULL_TURN_DURATION / headings
+    images = []
+    memory = opts["memory"]
+    view_headings = {}
+    t0 = time.perf_counter()
+    for index in range(headings):
+        if index:
+            opts["motors"].execute_move(right, turn)
+        frame = _grab_frame(camera, time.monotonic() + (opts["settle_time"] if index else 0.0))
+        if frame is None or frame.size == 0:
+            continue # The view is skipped; its heading is simply not offered to Gemini
+        if memory is not None:
+            view_headings[index] = memory.heading
+        images.append((index, encode_frame(frame, quality=SCAN_QUALITY, scale=opts["scan_scale"])))
+    t1 = time.perf_counter()
+    metrics.observe("scan.capture", t1 - t0)
+    metrics.increment("scan.requests")
+
+    found = advice_text = None
+    if images:
+        # Each view's own heading, so the spacing stays right when a view was skipped
+        degrees = [round((index - images[0][0]) * 360 / headings) for index, _ in images]
+        prompt = GEMINI_SCAN_PROMPT_TEMPLATE.format(
+            views=len(images), goal=goal_object,
+            headings=", ".join(f"View {view + 1} at {angle}" for view, angle in enumerate(degrees)))
+        advice_text = ask_gemini_scan(model, [image for _, image in images], prompt)
+        metrics.observe("scan.gemini", time.perf_counter() - t1)
+        if advice_text:
+            found = parse_scan_advice(advice_text, len(images))
+            if found["goal_view"] is None:
+                found = None
+    if memory is not None and advice_text:
+        for view, (index, _) in enumerate(images):
+            seen = found is not None and found["goal_view"] == view
+            memory.observe_scan_view(view_headings[index], found["position"] if seen else None,
+                                     found["goal_proximity"] if seen else None)
+    trace["scan"] = {"views": len(images), "capture_s": t1 - t0, "total_s": time.perf_counter() - t0,
+                     "goal_heading": None if found is None else images[found["goal_view"]][0],
+                     "position": None if found is None else found["position"]}
+
+    if found is None:
+        print(f"[SCAN] {goal_object} not found in {len(images)} views.")
+        speak(f"I could not spot the {goal_object} anywhere around me.")
+        return False
+
+    # Right-turn seconds from the current heading (the last view) to the goal, taken the short way round
+    heading = images[found["goal_view"]][0]
+    delta = (heading - (headings - 1)) * turn + SCAN_POSITION_TURN.get(found["position"], 0.0)
+    delta = (delta + FULL_TURN_DURATION / 2) % FULL_TURN_DURATION - FULL_TURN_DURATION / 2
+    print(f"[SCAN] {goal_object} in view {heading + 1}/{headings} ({found['position']}), turning {delta:+.2f}s.")
+    metrics.increment("scan.found")
+    speak(f"I spotted the {goal_object}. Turning toward it.")
+    if abs(delta) >= 0.05:
+        opts["motors"].execute_move(right if delta > 0 else left, abs(delta))
+    opts["state"]["lost_goal_counter"] = 0
+    return True
+
+
+def _no_advice_actions(model, memory=None) -> list:
+    # Gemini gave nothing: turn and try again, or hold still if its circuit breaker is open
+    if not gemini_available(model):
+        return [("say", "Vision service unavailable. Stopping until it recovers."), ("stop",)]
+    return [("say", "I could not get navigation advice for this view. I will try turning.")] + \
+        _recovery_actions(memory, "search", 0.5)
+
+
+def _new_state():
+    return {"lost_goal_counter": 0, "consecutive_blocked_counter": 0, "correction_count": 0, "scanned_here": False}
+
+
+def _report_performance(mode: str, steps: int, started_at: float, opts: dict, **extra):
+    elapsed = time.monotonic() - started_at
+    steps_per_second = steps / elapsed if elapsed > 0 else 0.0
+    print(f"[PERF] {mode} loop: {steps} steps in {elapsed:.2f}s ({steps_per_second:.3f} steps/s)")
+    opts["stats"].update({"mode": mode, "steps": steps, "elapsed_s": elapsed,
+                          "steps_per_second": steps_per_second, **extra})
 
-def pursue_object(model, camera, goal_object: str):
-    print(f"\n[INFO] Starting pursuit of: {goal_object.upper()}") # Added print
-    speak(f"Okay, I will look for the {goal_object}.")
 
-    MAX_STEPS = 40
-    REACHED_PROXIMITY = ["reachable", "very close"]
-    LOST_GOAL_COUNT_THRESHOLD = 3
-    MAX_CORRECTIONS = 2 # Added MAX_CORRECTIONS
+def _serializable_actions(actions) -> list:
+    return [[a[0], getattr(a[1], "__name__", a[1]), a[2]] if a[0] == "move" else list(a) for a in actions]
 
-    lost_goal_counter = 0
-    consecutive_blocked_counter = 0 # Added consecutive_blocked_counter
-    correction_count = 0 # Added correction_count
 
-    nav_prompt_formatted = GEMINI_NAVIGATION_PROMPT_TEMPLATE.format(goal=goal_object) # Changed variable name to match original
+def _finish_step(opts: dict, trace: dict, frame_rgb, advice, actions):
+    # Feeds the step's stage timings to metrics and hands the trace to the SessionRecorder, if any
+    if metrics.ENABLED:
+        for stage, seconds in trace["timings"].items():
+            metrics.observe(f"step.{stage}", seconds)
+        metrics.increment(f"tier.{advice['source'] if advice else 'gemini_failed'}")
+        metrics.increment("steps")
+    if opts["recorder"] is None:
+        return
+    trace["advice"] = advice
+    trace["actions"] = _serializable_actions(actions)
+    opts["recorder"].record_step(trace, frame_rgb)
 
-    for step in range(MAX_STEPS):
-        print(f"\n🔄 Step {step + 1}/{MAX_STEPS} | Goal: {goal_object.upper()}") # Added print
+
+def _encode_payload(frame_rgb, controller):
+    # JPEG for Gemini and the settings used; sized and cropped by the PayloadController if there is one
+    if controller is None:
+        jpeg_img = encode_frame(frame_rgb)
+        return jpeg_img, {"bytes": len(jpeg_img)}
+    return controller.encode(frame_rgb)
+
+
+def _observe_payload(opts: dict, advice, actions):
+    # Tells the PayloadController where the goal should be in the next frame
+    controller = opts["payload"]
+    if controller is None:
+        return
+    turned = any(a[0] == "move" and a[1] in (left, right) for a in actions) or \
+        bool(advice and advice.get("early_correction"))
+    controller.observe(advice, turned=turned)
+
+
+def _ask_streaming(model, jpeg_img, nav_prompt_formatted: str, goal_object: str, opts: dict, trace: dict,
+                   early_dispatch, payload=None):
+    """
+    Streams the Gemini answer and, as soon as it says the goal is visible off-centre,
+    hands the correction turn to `early_dispatch` while the rest is still generating.
+    Returns (advice_text, advice or None, whether the correction already ran).
+    Directions in a cropped frame (`payload` settings) are mapped back to the full frame.
+    """
+    state = opts["state"]
+    controller = opts["payload"]
+    early_actions = []
+
+    def on_fields(fields):
+        if early_actions or early_dispatch is None or not fields.get("goal_visible") \
+                or "goal_direction" not in fields:
+            return
+        if controller is not None:
+            controller.remap(fields, payload)
+        actions = _correction_actions(fields, goal_object, state)
+        if actions:
+            print(f"[STREAM] Goal {fields['goal_direction']}, correcting before the answer completes.")
+            early_actions.extend(actions)
+            early_dispatch(actions)
+
+    advice_text, parser, stream_timings = ask_gemini_streaming(model, jpeg_img, nav_prompt_formatted,
+                                                               on_fields=on_fields)
+    trace["first_decision"] = stream_timings.get("first_decision")
+    if not advice_text:
+        return advice_text, None, False
+    if early_actions:
+        trace["early_actions"] = _serializable_actions(early_actions)
+    return advice_text, parser.finish(), bool(early_actions)
+
+
+def _get_advice(model, nav_prompt_formatted: str, goal_object: str, frame_rgb, opts: dict, trace: dict,
+                signature=None, early_dispatch=None):
+    """
+    Parsed navigation advice for a frame, or None if Gemini gave no answer.
+    Tiers are tried cheapest first and the one that answered is stored in advice["source"]:
+    "track" (GoalTracker following the goal boxed by an earlier answer), "cache" (AdviceCache
+    hit for an unchanged scene), "local" (LocalDetector confident about the goal; its path
+    status is "unknown") and finally "gemini", whose boxed goal the tracker then locks onto.
+    Only Gemini declares the goal reached: a close goal from the other tiers is escalated.
+    Stage timings go into trace["timings"].
+    In streaming mode a correction turn may already have been handed to `early_dispatch`;
+    advice["early_correction"] is then True. The frame is encoded only when Gemini is asked,
+    with the payload settings of that moment; the PayloadController learns from each answer.
+    """
+    advice_cache = opts["advice_cache"]
+    detector = opts["detector"]
+    tracker = opts["tracker"]
+    timings = trace["timings"]
+
+    if tracker is not None and tracker.active:
+        t0 = time.perf_counter()
+        advice = tracker.update(frame_rgb)
+        timings["track"] = time.perf_counter() - t0
+        if advice is not None and advice["goal_proximity"] not in REACHED_PROXIMITY:
+            print(f"[TRACK] Goal {advice['goal_direction']}, {advice['goal_proximity']} "
+                  f"(match {advice['confidence']:.2f}).")
+            advice["source"] = "track"
+            return advice
+        if advice is not None:
+            print("[TRACK] Goal looks close, confirming with Gemini.")
+            tracker.stop()
+
+    if advice_cache is not None:
+        t0 = time.perf_counter()
+        if signature is None:
+            signature = frame_signature(frame_rgb)
+        advice = advice_cache.lookup(signature, goal_object)
+        timings["cache"] = time.perf_counter() - t0
+        if advice is not None:
+            print("[CACHE] Scene unchanged, reusing previous advice.")
+            advice["source"] = "cache"
+            return advice
+
+    if detector is not None:
+        t0 = time.perf_counter()
+        try:
+            advice = detector.advise(frame_rgb, goal_object)
+        except Exception as e:
+            print(f"[LOCAL] Detector failed, escalating to Gemini: {e}")
+            advice = None
+        timings["local"] = time.perf_counter() - t0
+        if advice is not None and advice["goal_proximity"] not in REACHED_PROXIMITY:
+            print(f"[LOCAL] Detector answered (confidence {advice['confidence']:.2f}).")
+            advice["source"] = "local"
+            _lock_tracker(tracker, frame_rgb, advice) # Path unknown: ends tracking rather than locking
+            return advice
+        if advice is not None:
+            print("[LOCAL] Goal looks close, confirming with Gemini.")
+
+    controller = opts["payload"]
+    t0 = time.perf_counter()
+    jpeg_img, payload = _encode_payload(frame_rgb, controller)
+    timings["encode"] = time.perf_counter() - t0
+    trace["prompt"] = nav_prompt_formatted
+    trace["payload"] = payload
+    print(f"[PAYLOAD] Sending {describe_payload(payload)}.")
+    if opts["streaming"]:
+        t0 = time.perf_counter()
+        advice_text, advice, early_correction = _ask_streaming(model, jpeg_img, nav_prompt_formatted, goal_object,
+                                                               opts, trace, early_dispatch, payload)
+        timings["gemini"] = time.perf_counter() - t0 # Parsing happens inside the stream
+        trace["advice_text"] = advice_text
+    else:
+        t0 = time.perf_counter()
+        advice_text = ask_gemini(model, jpeg_img, nav_prompt_formatted)
+        timings["gemini"] = time.perf_counter() - t0
+        trace["advice_text"] = advice_text
+        advice = None
+        if advice_text:
+            t0 = time.perf_counter()
+            advice = parse_navigation_advice(advice_text)
+            timings["parse"] = time.perf_counter() - t0
+        early_correction = False
+    if controller is not None:
+        controller.record(payload, timings["gemini"], parsed=advice is None or not advice.get("incomplete"))
+        if advice is not None:
+            controller.remap(advice, payload)
+    if advice is None:
+        return None
+    if advice_cache is not None:
+        advice_cache.store(signature, goal_object, advice)
+    advice["source"] = "gemini"
+    advice["early_correction"] = early_correction # Set after store: a cache hit has not turned yet
+    _lock_tracker(tracker, frame_rgb, advice)
+    return advice
+
+
+def _lock_tracker(tracker, frame_rgb, advice):
+    # Follow the goal an answer boxed in the following frames; any other answer ends tracking
+    if tracker is None:
+        return
+    if advice["goal_visible"] and tracker.start(frame_rgb, advice.get("goal_box"), advice):
+        print("[TRACK] Locked onto the goal.")
+    else:
+        tracker.stop()
+
+
+def _tier_stats(opts: dict, tiers: Counter) -> dict:
+    print(f"[TIER] Steps answered by: {dict(tiers) or 'none'}")
+    result = {"tiers": dict(tiers), "gemini_calls": tiers.get("gemini", 0) + tiers.get("gemini_failed", 0)}
+    if opts["advice_cache"] is not None:
+        cache_stats = opts["advice_cache"].stats()
+        print(f"[CACHE] Advice cache: {cache_stats['hits']} hits, {cache_stats['misses']} misses "
+              f"({cache_stats['hit_rate']:.0%}), {cache_stats['api_calls_saved']} Gemini calls saved.")
+        result["advice_cache"] = cache_stats
+    if opts["payload"] is not None:
+        payload_stats = opts["payload"].stats()
+        print(f"[PAYLOAD] {payload_stats['requests']} frames sent, {payload_stats['mean_bytes'] / 1024:.1f} KB "
+              f"on average ({payload_stats['min_bytes'] / 1024:.1f}-{payload_stats['max_bytes'] / 1024:.1f} KB), "
+              f"{payload_stats['roi_requests']} cropped to the goal.")
+        result["payload"] = payload_stats
+    if opts["tracker"] is not None:
+        tracker = opts["tracker"]
+        print(f"[TRACK] {tracker.tracked_steps} steps steered by tracking, goal lost {tracker.lost} times.")
+        result["tracked_steps"] = tracker.tracked_steps
+    if opts["memory"] is not None:
+        memory_stats = opts["memory"].stats()
+        print(f"[MEMORY] Recovery moves planned: {memory_stats['plans']}, "
+              f"{memory_stats['headings_checked']} headings checked from the current spot.")
+        result["memory"] = memory_stats
+    return result
+
+
+def _pursue_sequential(model, camera, goal_object: str, nav_prompt_formatted: str, opts: dict):
+    state = opts["state"] = _new_state()
+    started_at = time.monotonic()
+    steps_done = 0
+    tiers = Counter() # Which tier answered each step
+    max_steps = opts["max_steps"]
+
+    for step in range(max_steps):
+        steps_done = step + 1
+        print(f"\n🔄 Step {step + 1}/{max_steps} | Goal: {goal_object.upper()}")
+        trace = {"step": step, "timings": {}}
+        t0 = time.perf_counter()
+        pose = opts["memory"].pose() if opts["memory"] is not None else None
         frame_rgb = camera.capture_array(name="main")
+        trace["timings"]["capture"] = time.perf_counter() - t0
 
-        if frame_rgb is None or frame_rgb.size == 0: # Added robust check for empty frame
+        if frame_rgb is None or frame_rgb.size == 0:
             speak("I couldn't get an image from the camera for this step.")
             time.sleep(1)
             continue
 
-        b64_img = encode_frame_to_base64(frame_rgb)
-        advice_text = ask_gemini(model, b64_img, nav_prompt_formatted) # Used nav_prompt_formatted
+        advice = _get_advice(model, nav_prompt_formatted, goal_object, frame_rgb, opts, trace,
+                             early_dispatch=lambda early: _run_actions(early, opts["motors"]))
 
-        if not advice_text: # Handle empty advice text
-            speak("I could not get navigation advice for this view. I will try turning.")
-            execute_move(random.choice([left, right]), 0.5)
-            time.sleep(0.5)
+        if advice is None:
+            tiers["gemini_failed"] += 1
+            actions = _no_advice_actions(model, opts["memory"])
+            t0 = time.perf_counter()
+            _run_actions(actions, opts["motors"])
+            trace["timings"]["act"] = time.perf_counter() - t0
+            _observe_payload(opts, None, actions)
+            _finish_step(opts, trace, frame_rgb, None, actions)
+            time.sleep(OUTAGE_PAUSE if actions[-1][0] == "stop" else 0.5)
             continue
 
-        advice = parse_navigation_advice(advice_text) # Correctly parse advice
-
-        print(f"🧠 Gemini Advice:\n" # Added print for advice
-              f"  Goal Visible: {advice['goal_visible']}\n"
-              f"  Direction: {advice['goal_direction']}\n"
-              f"  Proximity: {advice['goal_proximity']}\n"
-              f"  Path: {advice['path_status']}\n"
-              f"  Obstacle: {advice['obstacle_info']}")
-
-        current_situation_summary = f"Goal is {'' if advice['goal_visible'] else 'not '}visible. "
-        if advice['goal_visible']:
-            current_situation_summary += f"It's {advice['goal_direction']} and {advice['goal_proximity']}. "
-        current_situation_summary += f"Path is {advice['path_status']}"
-        if "obstacle" in advice['path_status'].lower() and advice['obstacle_info'] not in ["none", ""]:
-            current_situation_summary += f" with {advice['obstacle_info']}."
-        speak(current_situation_summary)
-
-        action_taken_this_step = False # Added action_taken_this_step
-        can_declare_success_this_step = True # Added can_declare_success_this_step
-
-        proximity_durations = { # Added proximity_durations dictionary
-            "very close": 1.2,
-            "reachable": 1.6,
-            "near": 2.0,
-            "medium": 2.2,
-            "far": 2.4
-        }
-
-        if advice["goal_visible"]:
-            lost_goal_counter = 0
-
-            if correction_count < MAX_CORRECTIONS: # Implemented MAX_CORRECTIONS
-                if advice["goal_direction"] in ["slightly left", "far left"]:
-                    speak(f"Adjusting left toward {goal_object}.")
-                    execute_move(left, 0.15 if "slightly" in advice["goal_direction"] else 0.45)
-                    correction_count += 1
-                elif advice["goal_direction"] in ["slightly right", "far right"]:
-                    speak(f"Adjusting right toward {goal_object}.")
-                    execute_move(right, 0.15 if "slightly" in advice["goal_direction"] else 0.45)
-                    correction_count += 1
-
-            move_duration = proximity_durations.get(advice["goal_proximity"], 0.9) # Get duration from dict
-
-            if advice["path_status"] == "minor obstacle":
-                speak("Minor obstacle detected. Adjusting to avoid while staying aligned.")
-                execute_move(random.choice([left, right]), 0.15)
-                action_taken_this_step = True
-
-            elif advice["path_status"] in ["major obstacle", "blocked"]:
-                if advice["goal_proximity"] in REACHED_PROXIMITY:
-                    speak("Goal is close. Trying to push forward gently.")
-                    execute_move(forward, move_duration)
-                else:
-                    consecutive_blocked_counter += 1 # Increment counter
-                    speak("Path blocked. Reorienting.")
-                    execute_move(random.choice([left, right]), 0.6)
-                action_taken_this_step = True
-
-            elif advice["path_status"] == "clear":
-                speak("Path is clear. Moving toward the object.")
-                execute_move(forward, move_duration)
-                action_taken_this_step = True
-
-            if can_declare_success_this_step and advice["goal_proximity"] in REACHED_PROXIMITY:
-                speak(f"I have reached the {goal_object}! Pursuit successful.")
-                stop()
-                return True
+        tiers[advice["source"]] += 1
+        _print_advice(advice)
 
-        else:
-            lost_goal_counter += 1
-            speak(f"I don't see the {goal_object}.")
-            if lost_goal_counter >= LOST_GOAL_COUNT_THRESHOLD:
-                speak("Goal lost. Scanning.")
-                execute_move(random.choice([left, right]), 0.6)
-                lost_goal_counter = 0
-            elif advice["path_status"] in ["major obstacle", "blocked"]:
-                consecutive_blocked_counter += 1 # Increment counter
-                speak("Blocked. Turning.")
-                execute_move(random.choice([left, right]), 0.5)
-            elif advice["path_status"] == "minor obstacle":
-                speak("Minor obstacle ahead. Avoiding.")
-                execute_move(random.choice([left, right]), 0.35)
+        actions, reached = _plan_step(advice, goal_object, state, step, scan=opts["scan_headings"] > 1,
+                                      memory=opts["memory"], pose=pose)
+        t0 = time.perf_counter()
+        steer = None
+        if _can_steer(camera, opts["tracker"]):
+            steer = lambda seconds: _steered_drive(camera, opts["tracker"], opts["motors"], seconds)
+        _run_actions(actions, opts["motors"], scan=lambda: _scan_for_goal(model, camera, goal_object, opts, trace),
+                     steer=steer)
+        trace["timings"]["act"] = time.perf_counter() - t0
+        _observe_payload(opts, advice, actions)
+        _finish_step(opts, trace, frame_rgb, advice, actions)
+        if reached:
+            _report_performance("sequential", steps_done, started_at, opts, reached=True,
+                                **_tier_stats(opts, tiers))
+            return True
+
+        print("-" * 30)
+        time.sleep(opts["step_pause"])
+
+    _report_performance("sequential", steps_done, started_at, opts, reached=False, **_tier_stats(opts, tiers))
+    return False
+
+
+def _capture_frame(camera, epoch: int, settle: float, after=None, during=None, lead: float = 0.0, memory=None):
+    """
+    Runs on the capture thread. If `after` is a pending MotionHandle, waits for
+    the move to finish (plus `settle` seconds) so the frame reflects the new pose.
+    If `during` (a drive) is still running after that, waits until about `lead` motion
+    seconds of it are left, so the answer for the frame arrives as the drive ends.
+    With a BufferedCamera this picks the first ring frame captured after that point.
+    The frame is not encoded here: the payload settings can still change with the
+    current step's answer, so _get_advice encodes it when it is sent. "drive_left" is how
+    much of `during` was still to go when the frame was taken, "pose" the `memory` pose then.
+    """
+    t0 = time.perf_counter()
+    not_before = None
+    if after is not None:
+        after.wait()
+        not_before = time.monotonic() + settle
+    while during is not None and during.remaining() > lead and not during.wait(0.02):
+        pass
+    frame_rgb = _grab_frame(camera, not_before)
+    if frame_rgb is None or frame_rgb.size == 0:
+        return None
+    drive_left = during.remaining() if during is not None else 0.0
+    pose = memory.pose() if memory is not None else None
+    return {"epoch": epoch, "frame": frame_rgb, "during": during, "drive_left": drive_left, "pose": pose,
+            "signature": frame_signature(frame_rgb), "timings": {"capture": time.perf_counter() - t0}}
+
+
+def _split_step_moves(moves):
+    # (last move that changes what the camera sees, trailing drive after it or None) of a step's moves
+    if moves and moves[-1][0] in ("forward", "backward"):
+        turns = [handle for name, handle in moves if name not in ("forward", "backward")]
+        return (turns[-1] if turns else None), moves[-1][1]
+    return (moves[-1][1] if moves else None), None
+
+
+def _driven_since_frame(captured) -> float:
+    # Ends what is left of the drive the frame was taken during; returns the motion seconds driven after the frame
+    during = captured["during"]
+    if during is None or captured["drive_left"] <= 0:
+        return 0.0
+    during.cancel()
+    during.wait()
+    return max(0.0, during.elapsed - (during.duration - captured["drive_left"]))
+
+
+def _shorten_drive(actions, driven: float) -> list:
+    # Takes `driven` seconds off the first forward move: the robot already covered them after the frame
+    for index, action in enumerate(actions):
+        if action[0] == "move" and action[1] is forward and driven > 0:
+            rest = [("move", forward, action[2] - driven)] if action[2] - driven >= MIN_DRIVE else []
+            return actions[:index] + rest + actions[index + 1:]
+    return actions
+
+
+def _pursue_pipelined(model, camera, goal_object: str, nav_prompt_formatted: str, opts: dict):
+    """
+    Same decisions as the sequential loop, but perception overlaps motion. Moves are
+    queued on the motor executor without waiting (speech is already asynchronous), and
+    the next frame is taken on its own thread once the step's turns have finished and
+    settled. If the step ends in a drive, the frame is taken about one answer time
+    before the drive ends, so the request runs while the robot is still driving. The
+    answer then ends what is left of that drive and takes the distance driven since its
+    frame off its own forward move. Every frame carries the move epoch it was taken in;
+    an answer whose frame predates a move dispatched since (other than the answer's own
+    streamed correction) is discarded, and the step is retried on a fresh frame.
+    """
+    state = opts["state"] = _new_state()
+    started_at = time.monotonic()
+    steps_done = 0
+    move_epoch = 0 # Incremented each time a move is dispatched
+    last_motion = None
+    step_moves = [] # (name, handle) dispatched for the current step
+    stale_discarded = 0
+    overlapped = 0 # Frames taken, and so asked about, while a drive was still running
+    answer_time = 0.0 # Smoothed seconds from a frame to its answer
+    tiers = Counter()
+    max_steps = opts["max_steps"]
+    settle = opts["settle_time"]
+
+    motors = opts["motors"]
+    capture_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="nav-capture")
+
+    def dispatch(actions, trace=None):
+        nonlocal move_epoch, last_motion
+        for action in actions:
+            if action[0] in ("say", "status"):
+                _run_actions([action], motors)
+            elif action[0] == "move" and action[1] is forward and _can_steer(camera, opts["tracker"]):
+                # Steered on every buffered frame, so like a scan it has the motors to itself and runs inline
+                if last_motion is not None:
+                    last_motion.wait()
+                handle = _steered_drive(camera, opts["tracker"], motors, action[2])
+                if handle is not None:
+                    last_motion = handle
+                    step_moves.append((handle.name, handle))
+                move_epoch += 1
+            elif action[0] == "move":
+                # A step's first move replaces what is left of the previous step's drive
+                handle = motors.execute_move(action[1], action[2], wait=False, preempt=not step_moves)
+                if handle is not None:
+                    last_motion = handle
+                    step_moves.append((handle.name, handle))
+                    move_epoch += 1
+            elif action[0] == "scan": # Needs the camera and the motors to itself, so it runs inline
+                if last_motion is not None:
+                    last_motion.wait()
+                _scan_for_goal(model, camera, goal_object, opts, trace if trace is not None else {})
+                move_epoch += 1
+            elif action[0] == "stop":
+                if step_moves: # Like the sequential loop: this step's moves first, then stop
+                    step_moves[-1][1].wait()
+                motors.stop()
+
+    def next_frame(after=None):
+        after, drive = _split_step_moves(step_moves) if after is None else (after, None)
+        scale = motors.executor.time_scale
+        return capture_pool.submit(_capture_frame, camera, move_epoch, settle, after, during=drive,
+                                   lead=answer_time / scale if scale > 0 else 0.0, memory=opts["memory"])
+
+    def report(reached):
+        print(f"[PIPELINE] {overlapped} of {steps_done} frames taken during a drive, "
+              f"{stale_discarded} stale answers discarded.")
+        _report_performance("pipelined", steps_done, started_at, opts, reached=reached,
+                            stale_discarded=stale_discarded, overlapped=overlapped, **_tier_stats(opts, tiers))
+
+    try:
+        frame_future = next_frame()
+
+        for step in range(max_steps):
+            steps_done = step + 1
+            print(f"\n🔄 Step {step + 1}/{max_steps} | Goal: {goal_object.upper()} (pipelined)")
+            captured = frame_future.result()
+            step_moves = []
+
+            if captured is None:
+                speak("I couldn't get an image from the camera for this step.")
+                time.sleep(1)
+                frame_future = next_frame(last_motion)
+                continue
+
+            overlapped += captured["drive_left"] > 0
+            trace = {"step": step, "timings": dict(captured["timings"])}
+            t0 = time.perf_counter()
+            advice = _get_advice(model, nav_prompt_formatted, goal_object, captured["frame"], opts, trace,
+                                 signature=captured["signature"], early_dispatch=dispatch)
+            answered_in = time.perf_counter() - t0
+            answer_time = answered_in if not answer_time else \
+                ANSWER_TIME_ALPHA * answered_in + (1 - ANSWER_TIME_ALPHA) * answer_time
+
+            if advice is not None and captured["epoch"] != move_epoch - len(step_moves):
+                # Something else moved the robot while the request was in flight
+                stale_discarded += 1
+                metrics.increment("pipeline.stale_discarded")
+                print(f"[PIPELINE] Discarding advice for a frame from epoch {captured['epoch']} "
+                      f"(current {move_epoch}).")
+                frame_future = next_frame(last_motion)
+                continue
+
+            t0 = time.perf_counter()
+            driven = _driven_since_frame(captured)
+            if advice is None:
+                tiers["gemini_failed"] += 1
+                actions = _no_advice_actions(model, opts["memory"])
+                reached = False
+                dispatch(actions)
+                if actions[-1][0] == "stop":
+                    time.sleep(OUTAGE_PAUSE)
             else:
-                speak("Path clear but goal not visible. Exploring.")
-                execute_move(random.choice([left, right]), 0.5)
-            action_taken_this_step = True
+                tiers[advice["source"]] += 1
+                _print_advice(advice)
+                if opts["memory"] is not None and step_moves:
+                    step_moves[-1][1].wait() # The memory plans from the heading after the streamed correction
+                actions, reached = _plan_step(advice, goal_object, state, step, scan=opts["scan_headings"] > 1,
+                                              memory=opts["memory"], pose=captured["pose"])
+                if driven > 0:
+                    print(f"[PIPELINE] Drove {driven:.2f}s after this frame was taken; shortening the drive.")
+                    actions = _shorten_drive(actions, driven)
+                dispatch(actions, trace)
+            trace["timings"]["act"] = time.perf_counter() - t0 # Dispatch only; moves run on the motion thread
+            _observe_payload(opts, advice, actions)
+            _finish_step(opts, trace, captured["frame"], advice, actions)
+
+            if reached:
+                if last_motion is not None:
+                    last_motion.wait()
+                report(True)
+                return True
+
+            frame_future = next_frame()
+            print("-" * 30)
+
+        report(False)
+        return False
+    except BaseException:
+        motors.stop() # Don't leave queued moves driving after an error or Ctrl+C
+        raise
+    finally:
+        capture_pool.shutdown(wait=True)
+        if last_motion is not None:
+            last_motion.wait()
+
+
+def pursue_object(model, camera, goal_object: str, pipelined: bool = False, stats: dict = None,
+                  advice_cache=None, detector=None, recorder=None, max_steps: int = MAX_STEPS,
+                  step_pause: float = STEP_PAUSE, settle_time: float = PIPELINE_SETTLE_TIME,
+                  streaming: bool = False, scan_headings: int = SCAN_HEADINGS, scan_scale: float = SCAN_SCALE,
+                  motors=None, payload_controller=None, tracker=None, memory=None):
+    """
+    Drives the robot toward `goal_object` using Gemini navigation advice.
+    With `pipelined=True` speech and motion run without blocking the loop, and the next frame's
+    Gemini request overlaps the step's forward drive (see _pursue_pipelined).
+    With an `advice_cache` (scene_cache.AdviceCache) unchanged scenes skip the Gemini call,
+    and with a `detector` (local_detector.LocalDetector) confident local answers do too.
+    A `recorder` (session_recorder.SessionRecorder) receives every step's frame, advice and timings.
+    With `streaming=True` Gemini answers in schema-constrained JSON that is parsed as it streams,
+    and the correction turn starts as soon as the goal's direction is known.
+    With `scan_headings` > 1 a lost goal is searched for with one multi-view request
+    over that many headings, sent at `scan_scale` resolution (see _scan_for_goal); the
+    default 0 keeps the single-view search.
+    A `payload_controller` (payload_controller.PayloadController) sizes each frame sent to
+    Gemini by the measured latency and crops it to the goal once it has been placed.
+    A `tracker` (goal_tracker.GoalTracker) follows a goal boxed by an answer through the next
+    steps' frames and steers from it, so Gemini is only asked again when tracking fails or is due.
+    With a camera that has frame_after (camera.BufferedCamera) it also steers forward moves
+    from every frame captured while they run (see _steered_drive).
+    A `memory` (spatial_memory.SpatialMemory, attached to the same motors) records what each
+    answer saw at the robot's estimated pose and plans search and avoidance turns from it.
+    `motors` (robot_controller.Motors) defaults to the robot's; simulations pass their own.
+    If `stats` is a dict it is filled with steps, elapsed time and steps per second.
+    """
+    print(f"\n[INFO] Starting pursuit of: {goal_object.upper()}")
+    speak(f"Okay, I will look for the {goal_object}.")
+
+    prompt_template = GEMINI_NAVIGATION_JSON_PROMPT_TEMPLATE if streaming else GEMINI_NAVIGATION_PROMPT_TEMPLATE
+    nav_prompt_formatted = prompt_template.format(goal=goal_object)
+    if stats is None:
+        stats = {}
+    opts = {"stats": stats, "advice_cache": advice_cache, "detector": detector, "recorder": recorder,
+            "max_steps": max_steps, "step_pause": step_pause, "settle_time": settle_time,
+            "streaming": streaming, "scan_headings": scan_headings, "scan_scale": scan_scale,
+            "motors": motors if motors is not None else DEFAULT_MOTORS, "payload": payload_controller,
+            "tracker": tracker, "memory": memory}
+    if payload_controller is not None:
+        payload_controller.observe(None) # A new goal: send whole frames until it is placed
+    if tracker is not None:
+        tracker.stop()
+    if memory is not None:
+        memory.new_goal()
 
-        if not action_taken_this_step and step > 0: # Added this check
-            speak("Uncertain. Making a small turn.")
-            execute_move(random.choice([left, right]), 0.2)
+    if pipelined:
+        reached = _pursue_pipelined(model, camera, goal_object, nav_prompt_formatted, opts)
+    else:
+        reached = _pursue_sequential(model, camera, goal_object, nav_prompt_formatted, opts)
 
-        print("-" * 30) # Added print for separator
-        time.sleep(0.6)
+    if metrics.ENABLED:
+        metrics.print_step_summary()
+        if metrics.METRICS_JSONL:
+            metrics.export_jsonl(metrics.METRICS_JSONL, goal_object=goal_object, reached=reached,
+                                 pipelined=pipelined, streaming=streaming)
+        if metrics.METRICS_PROM:
+            metrics.export_prometheus(metrics.METRICS_PROM)
 
-    speak(f"Maximum steps reached. I could not definitively reach the {goal_object}.")
-    if ON_ROBOT: # Added ON_ROBOT check
-        stop()
-    return False
\ No newline at end of file
+    if not reached:
+        speak(f"Maximum steps reached. I could not definitively reach the {goal_object}.")
+        if ON_ROBOT:
+            opts["motors"].stop()
+    return reached
@@ -0,0 +1,154 @@
+"""
+Adaptive size for the frames sent to Gemini.
+
+While the goal is not in view the whole frame is sent, downscaled; how far depends on
+the measured Gemini round-trip (slower API, smaller frames). Once the last answer
+placed the goal, only a full-height band of the frame around it is sent, one level
+more detailed. The band always covers the middle of the frame, so the path ahead
+stays in view, and directions in the answer are mapped back to the full frame.
+Answers that cannot be parsed push the detail back up.
+"""
+import threading
+from collections import deque
+from gemini_utils import encode_frame
+
+# (scale, JPEG quality), smallest payload first
+PAYLOAD_LEVELS = [(0.35, 60), (0.5, 70), (0.75, 80), (1.0, 85)]
+START_LEVEL = 1
+LATENCY_MAX_LEVEL = 2 # A fast API alone does not raise the level beyond this; parse failures can
+SLOW_LATENCY = 2.5 # Smoothed Gemini seconds above which the payload shrinks
+FAST_LATENCY = 1.2 # ... and below which it grows again
+LATENCY_ALPHA = 0.3 # Weight of the newest round-trip in the smoothed latency
+HOLD_RESPONSES = 3 # Answers to wait after a change before the latency may change the level again
+PARSE_WINDOW = 10 # Recent answers considered for the parse failure rate
+MAX_PARSE_FAILURE_RATE = 0.2
+ROI_WIDTH = 0.6 # Fraction of the frame width sent once the goal has been placed
+
+# Where in the frame (0 = left edge, 1 = right edge) each answered direction points
+DIRECTION_X = {"far left": 0.1, "slightly left": 0.3, "center": 0.5, "slightly right": 0.7, "far right": 0.9}
+
+
+def direction_from_x(x: float) -> str:
+    # Same bins as local_detector's box-centre directions
+    offset = x - 0.5
+    if abs(offset) < 0.1:
+        return "center"
+    side = "left" if offset < 0 else "right"
+    return f"slightly {side}" if abs(offset) < 0.3 else f"far {side}"
+
+
+class PayloadController:
+    """
+    Picks scale, quality and crop for each navigation frame. Call encode() for the
+    frame, record() with the answer's latency once it was sent, remap() on the parsed
+    fields before acting on them, and observe() with the step's advice so the next
+    crop follows the goal. Safe to share between the capture thread and the control loop.
+    """
+
+    def __init__(self, level: int = START_LEVEL, roi_width: float = ROI_WIDTH):
+        self.level = level
+        self.roi_width = roi_width
+        self.latency = None # Smoothed Gemini round-trip, seconds
+        self._goal_x = None # Where the goal is expected in the next frame, or None to send it whole
+        self._parse_failures = deque(maxlen=PARSE_WINDOW)
+        self._hold = 0
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.roi_requests = 0
+        self.total_bytes = 0
+        self.min_bytes = None
+        self.max_bytes = 0
+
+    def _roi(self, goal_x):
+        if goal_x is None or self.roi_width >= 1.0:
+            return None
+        x0 = min(max(goal_x - self.roi_width / 2, 0.0), 1.0 - self.roi_width)
+        return x0, x0 + self.roi_width
+
+    def settings(self) -> dict:
+        with self._lock:
+            roi = self._roi(self._goal_x)
+            level = min(self.level + 1, len(PAYLOAD_LEVELS) - 1) if roi else self.level
+        scale, quality = PAYLOAD_LEVELS[level]
+        return {"level": level, "scale": scale, "quality": quality, "roi": roi}
+
+    def encode(self, frame):
+        """JPEG bytes for `frame` and the settings used (with "bytes"), cropped if the goal has been placed."""
+        settings = self.settings()
+        if settings["roi"] is not None:
+            width = frame.shape[1]
+            frame = frame[:, int(settings["roi"][0] * width):int(settings["roi"][1] * width)] # A view, no copy
+        jpeg = encode_frame(frame, quality=settings["quality"], scale=settings["scale"])
+        settings["bytes"] = len(jpeg)
+        return jpeg, settings
+
+    def remap(self, fields: dict, settings: dict) -> dict:
+        """Maps a goal direction and box answered for a cropped frame back to the full frame (in place)."""
+        roi = settings.get("roi") if settings else None
+        if roi is None:
+            return fields
+        x = DIRECTION_X.get(fields.get("goal_direction", ""))
+        if x is not None:
+            fields["goal_direction"] = direction_from_x(roi[0] + x * (roi[1] - roi[0]))
+        box = fields.get("goal_box")
+        if isinstance(box, tuple): # Still the raw string while a streamed answer is incomplete
+            fields["goal_box"] = (roi[0] + box[0] * (roi[1] - roi[0]), box[1],
+                                  roi[0] + box[2] * (roi[1] - roi[0]), box[3])
+        return fields
+
+    def record(self, settings: dict, latency: float, parsed: bool = True):
+        """Feeds one sent frame's settings, the answer's round-trip and whether it parsed; adjusts the level."""
+        with self._lock:
+            self.requests += 1
+            self.roi_requests += settings.get("roi") is not None
+            self.total_bytes += settings["bytes"]
+            self.min_bytes = settings["bytes"] if self.min_bytes is None else min(self.min_bytes, settings["bytes"])
+            self.max_bytes = max(self.max_bytes, settings["bytes"])
+            self.latency = latency if self.latency is None else \
+                LATENCY_ALPHA * latency + (1 - LATENCY_ALPHA) * self.latency
+            self._parse_failures.append(not parsed)
+            failure_rate = sum(self._parse_failures) / len(self._parse_failures)
+            self._hold = max(0, self._hold - 1)
+            if not parsed and failure_rate > MAX_PARSE_FAILURE_RATE and self.level < len(PAYLOAD_LEVELS) - 1:
+                self._change_level(+1, f"{failure_rate:.0%} of answers unparsable")
+            elif self._hold == 0 and self.latency > SLOW_LATENCY and self.level > 0:
+                self._change_level(-1, f"Gemini slow ({self.latency:.1f}s)")
+            elif self._hold == 0 and self.latency < FAST_LATENCY and self.level < LATENCY_MAX_LEVEL \
+                    and failure_rate <= MAX_PARSE_FAILURE_RATE:
+                self._change_level(+1, f"Gemini fast ({self.latency:.1f}s)")
+
+    def _change_level(self, delta: int, reason: str):
+        self.level += delta
+        self._hold = HOLD_RESPONSES
+        scale, quality = PAYLOAD_LEVELS[self.level]
+        print(f"[PAYLOAD] {reason}: now sending scale {scale}, quality {quality}.")
+
+    def observe(self, advice, turned: bool = False):
+        """
+        Where to crop next: around the goal if `advice` saw it, the whole frame otherwise.
+        After a turn toward the goal (`turned`) it is expected near the centre.
+        """
+        with self._lock:
+            if not advice or not advice.get("goal_visible"):
+                self._goal_x = None
+            elif turned:
+                self._goal_x = 0.5
+            else:
+                self._goal_x = DIRECTION_X.get(advice.get("goal_direction", ""))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"requests": self.requests, "roi_requests": self.roi_requests,
+                    "mean_bytes": self.total_bytes / self.requests if self.requests else 0.0,
+                    "min_bytes": self.min_bytes or 0, "max_bytes": self.max_bytes, "level": self.level,
+                    "latency_s": self.latency}
+
+
+def describe(settings: dict) -> str:
+    """One-line summary of a step's payload for the step log."""
+    text = f"{settings['bytes'] / 1024:.1f} KB"
+    if "scale" in settings:
+        text += f", scale {settings['scale']}, quality {settings['quality']}"
+    if settings.get("roi"):
+        text += f", crop {settings['roi'][0]:.2f}-{settings['roi'][1]:.2f}"
+    return text
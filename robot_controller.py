@@ -5,67 +5,259 @@ try:
 except ImportError:
     print("WARNING: picar_4wd not found. Using mock motor functions.")
     ON_ROBOT = False
+import os
+import threading
 import time
+from collections import deque
+import metrics
 
 POWER = 70
 DEFAULT_TURN_DURATION = 0.45
 DEFAULT_MOVE_DURATION = 0.5
+FULL_TURN_DURATION = 2.4 # Seconds of turning at POWER for a full 360 degrees; calibrate per robot and floor
+DRIVE_SPEED = 0.25 # Metres per second driving forward or backward at POWER; calibrate like FULL_TURN_DURATION
+MOCK_TIME_SCALE = float(os.getenv("ROBOGO_MOCK_TIME_SCALE", "1.0")) # Mock moves take duration * scale (0: instant)
 
-if ON_ROBOT: # Actual robot functions
-    def forward(duration=DEFAULT_MOVE_DURATION):
-        print(f"\U0001F697 Moving forward for {duration:.2f}s")
-        fc.forward(POWER)
-        time.sleep(duration)
-        fc.stop()
+def _mock_start_motors(name: str, duration: float):
+    print(f"[MOCK MOTOR] {'Move' if name in ('forward', 'backward') else 'Turn'} {name} for {duration}s")
 
-    def backward(duration=DEFAULT_MOVE_DURATION):
-        print(f"\u21A9\uFE0F Moving backward for {duration:.2f}s")
-        fc.backward(POWER)
-        time.sleep(duration)
-        fc.stop()
+def _mock_stop_motors():
+    pass
 
-    def left(duration=DEFAULT_TURN_DURATION):
-        print(f"\u21AA\uFE0F Turning left for {duration:.2f}s")
-        fc.turn_left(POWER)
-        time.sleep(duration)
-        fc.stop()
+if ON_ROBOT: # Actual robot motors
+    _DRIVE = {"forward": fc.forward, "backward": fc.backward, "left": fc.turn_left, "right": fc.turn_right}
+    _MOVE_ICONS = {"forward": "\U0001F697 Moving forward", "backward": "\u21A9\uFE0F Moving backward",
+                   "left": "\u21AA\uFE0F Turning left", "right": "\u21A9\uFE0F Turning right"}
 
-    def right(duration=DEFAULT_TURN_DURATION):
-        print(f"\u21A9\uFE0F Turning right for {duration:.2f}s") # Changed emoji to match original
-        fc.turn_right(POWER)
-        time.sleep(duration)
-        fc.stop()
+    def _start_motors(name: str, duration: float):
+        print(f"{_MOVE_ICONS[name]} for {duration:.2f}s")
+        _DRIVE[name](POWER)
 
-    def stop():
-        print("\u26D4 Stopping")
+    def _stop_motors():
         fc.stop()
 
-    def execute_move(move_function, duration: float):
-        if not callable(move_function):
+else: # Mock motors: print, and take the commanded time (scaled by MOCK_TIME_SCALE) like the real ones
+    _start_motors, _stop_motors = _mock_start_motors, _mock_stop_motors
+
+
+class MotionHandle:
+    """Returned by execute_move(). Lets a caller wait for the move to end, or cancel it."""
+
+    def __init__(self, executor, name: str, duration: float):
+        self.name = name
+        self.duration = duration
+        self.elapsed = 0.0 # Motion seconds actually driven (less than duration if preempted)
+        self.cancelled = False
+        self.started_at = None # time.monotonic() when the motors started
+        self._executor = executor
+        self._done = threading.Event()
+
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def remaining(self) -> float:
+        """Motion seconds still to go by the clock: the whole duration while queued, 0 once done."""
+        if self.done():
+            return 0.0
+        if self.started_at is None:
+            return self.duration
+        scale = self._executor.time_scale
+        return 0.0 if scale <= 0 else max(0.0, self.duration - (time.monotonic() - self.started_at) / scale)
+
+    def cancel(self):
+        self._executor.cancel(self)
+
+    def _finish(self, elapsed: float, cancelled: bool):
+        self.elapsed = elapsed
+        self.cancelled = cancelled
+        self._done.set()
+
+
+class MotorExecutor:
+    """
+    Single background thread that runs queued motor commands in order. A command drives
+    the motors for its duration unless it is cancelled or preempted, in which case the
+    motors stop at once; emergency_stop() also halts them from the calling thread.
+    Listeners get (name, motion_seconds) after every command, including partial ones,
+    before the command's handle reports done; the handle completes even if one raises.
+    """
+
+    def __init__(self, start_motors, stop_motors, time_scale: float = 1.0):
+        self._start_motors = start_motors
+        self._stop_motors = stop_motors
+        self.time_scale = time_scale
+        self._cond = threading.Condition()
+        self._queue = deque()
+        self._current = None
+        self._thread = None
+        self._listeners = []
+
+    def add_listener(self, callback):
+        self._listeners.append(callback)
+
+    def submit(self, name: str, duration: float, preempt: bool = False) -> MotionHandle:
+        handle = MotionHandle(self, name, duration)
+        with self._cond:
+            if preempt:
+                self._cancel_all_locked()
+            self._queue.append(handle)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="motor-executor", daemon=True)
+                self._thread.start()
+            self._cond.notify_all()
+        return handle
+
+    def cancel(self, handle: MotionHandle):
+        with self._cond:
+            if handle in self._queue:
+                self._queue.remove(handle)
+                handle._finish(0.0, cancelled=True)
+            elif handle is self._current:
+                handle.cancelled = True
+                self._cond.notify_all()
+
+    def _cancel_all_locked(self):
+        for handle in self._queue:
+            handle._finish(0.0, cancelled=True)
+        if self._queue or self._current is not None:
+            metrics.increment("motor.preempted")
+        self._queue.clear()
+        if self._current is not None:
+            self._current.cancelled = True
+        self._cond.notify_all()
+
+    def emergency_stop(self):
+        t0 = time.perf_counter()
+        with self._cond: # Under the lock, so the worker cannot start a queued move in between
+            self._cancel_all_locked()
+            self._stop_motors()
+        metrics.observe("motor.stop_latency", time.perf_counter() - t0)
+
+    def idle(self) -> bool:
+        with self._cond:
+            return self._current is None and not self._queue
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                handle = self._current = self._queue.popleft()
+                started_at = handle.started_at = time.monotonic()
+                try:
+                    self._start_motors(handle.name, handle.duration)
+                    deadline = started_at + handle.duration * self.time_scale
+                    while not handle.cancelled:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self._cond.wait(remaining)
+                except Exception as e:
+                    metrics.increment("motor.errors")
+                    print(f"\u274C Error while executing {handle.name}: {e}")
+                    handle.cancelled = True
+                finally:
+                    self._stop_motors()
+                    self._current = None
+                wall = time.monotonic() - started_at
+            if self.time_scale > 0:
+                elapsed = min(handle.duration, wall / self.time_scale)
+            else:
+                elapsed = 0.0 if handle.cancelled else handle.duration
+            metrics.observe(f"motor.{handle.name}", wall)
+            try:
+                for listener in self._listeners: # Before the handle completes, so waiters see the listeners' effects
+                    try:
+                        listener(handle.name, elapsed)
+                    except Exception as e: # A failing listener must not take the motor thread down with it
+                        metrics.increment("motor.errors")
+                        print(f"\u274C Motion listener failed after {handle.name}: {e}")
+            finally:
+                handle._finish(elapsed, handle.cancelled) # Waiters are released whatever the listeners did
+
+
+class Motors:
+    """
+    execute_move() and stop() bound to one MotorExecutor. The module-level functions use
+    DEFAULT_MOTORS (the robot, or the mock off the robot); create_mock_motors() gives a
+    simulated robot its own independent motors.
+    """
+
+    def __init__(self, executor: MotorExecutor, mock: bool):
+        self.executor = executor
+        self.mock = mock
+
+    def add_listener(self, callback):
+        """callback(name, motion_seconds) runs on the motor thread after every move."""
+        self.executor.add_listener(callback)
+
+    def stop(self):
+        # Emergency stop: drops queued moves and halts the motors immediately
+        print("[MOCK MOTOR] Stop motors" if self.mock else "\u26D4 Stopping")
+        self.executor.emergency_stop()
+
+    def execute_move(self, move_function, duration: float, wait: bool = True, preempt: bool = False):
+        """
+        Queues `move_function` (forward, backward, left or right) for `duration` seconds on the
+        motor thread and returns its MotionHandle, after the move ended if `wait` is set.
+        `preempt=True` cancels whatever is running or queued first.
+        """
+        name = getattr(move_function, "__name__", None)
+        if name not in ("forward", "backward", "left", "right"):
             print(f"\u26A0\uFE0F Invalid move function: {move_function}")
-            return
-        try:
-            print(f"\U0001F680 Executing move: {move_function.__name__} for {duration:.2f}s")
-            move_function(duration)
-        except Exception as e:
-            print(f"\u274C Error while executing {move_function.__name__}: {e}")
+            return None
+        print(f"[MOCK MOTOR] Executing: {name}({duration})" if self.mock
+              else f"\U0001F680 Executing move: {name} for {duration:.2f}s")
+        handle = self.executor.submit(name, duration, preempt=preempt)
+        if wait:
+            handle.wait()
+        return handle
+
+
+DEFAULT_MOTORS = Motors(MotorExecutor(_start_motors, _stop_motors, time_scale=1.0 if ON_ROBOT else MOCK_TIME_SCALE),
+                        mock=not ON_ROBOT)
+
+
+def create_mock_motors(time_scale: float = MOCK_TIME_SCALE) -> Motors:
+    """Independent mock motors with their own executor thread, e.g. one per simulated robot."""
+    return Motors(MotorExecutor(_mock_start_motors, _mock_stop_motors, time_scale=time_scale), mock=True)
+
+
+def set_mock_time_scale(scale: float):
+    """Speeds up (scale < 1) or skips (0) the simulated duration of mock moves. No effect on the robot."""
+    if not ON_ROBOT:
+        DEFAULT_MOTORS.executor.time_scale = scale
+
+
+def add_motion_listener(callback):
+    """callback(name, motion_seconds) runs on the motor thread after every move."""
+    DEFAULT_MOTORS.add_listener(callback)
+
+
+def _move(name: str, duration: float):
+    DEFAULT_MOTORS.executor.submit(name, duration).wait()
+
+
+# Blocking moves; they run on the motor thread, so stop() from another thread cuts them short
+def forward(duration=DEFAULT_MOVE_DURATION):
+    _move("forward", duration)
 
-else: # Mock functions when not ON_ROBOT
-    def forward(duration=DEFAULT_MOVE_DURATION):
-        print(f"[MOCK MOTOR] Move forward for {duration}s")
+def backward(duration=DEFAULT_MOVE_DURATION):
+    _move("backward", duration)
 
-    def backward(duration=DEFAULT_MOVE_DURATION):
-        print(f"[MOCK MOTOR] Move backward for {duration}s")
+def left(duration=DEFAULT_TURN_DURATION):
+    _move("left", duration)
 
-    def left(duration=DEFAULT_TURN_DURATION):
-        print(f"[MOCK MOTOR] Turn left for {duration}s")
+def right(duration=DEFAULT_TURN_DURATION):
+    _move("right", duration)
 
-    def right(duration=DEFAULT_TURN_DURATION):
-        print(f"[MOCK MOTOR] Turn right for {duration}s")
+def stop():
+    DEFAULT_MOTORS.stop()
 
-    def stop():
-        print("[MOCK MOTOR] Stop motors")
 
-    def execute_move(move_function, duration: float):
-        print(f"[MOCK MOTOR] Executing: {move_function.__name__}({duration})")
-        # time.sleep(duration) # Be careful with this in mock if main loop also sleeps
+def execute_move(move_function, duration: float, wait: bool = True, preempt: bool = False):
+    # See Motors.execute_move
+    return DEFAULT_MOTORS.execute_move(move_function, duration, wait=wait, preempt=preempt)
@@ -0,0 +1,77 @@
+import time
+from collections import OrderedDict
+import numpy as np
+import cv2
+
+THUMB_SIZE = (16, 12) # (width, height) of the grayscale thumbnail used for the difference check
+HASH_DISTANCE_THRESHOLD = 6 # Max differing bits (of 64) in the difference hash
+MEAN_DIFF_THRESHOLD = 6.0 # Max mean absolute thumbnail difference (0-255)
+ADVICE_TTL = 4.0 # Seconds a cached advice stays valid
+ADVICE_CACHE_SIZE = 16
+
+
+def frame_signature(frame):
+    """
+    Cheap perceptual signature of a BGR frame: a 64-bit difference hash plus a small
+    grayscale thumbnail. Costs one downscale of the frame, no copies at full size.
+    """
+    if frame.ndim == 3:
+        gray = cv2.cvtColor(cv2.resize(frame[:, :, :3], THUMB_SIZE, interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+    else:
+        gray = cv2.resize(frame, THUMB_SIZE, interpolation=cv2.INTER_AREA)
+    dhash_src = cv2.resize(gray, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (dhash_src[:, 1:] > dhash_src[:, :-1]).flatten()
+    dhash = int(np.packbits(bits).view(">u8")[0])
+    return dhash, gray.astype(np.int16)
+
+
+def signatures_match(a, b) -> bool:
+    if bin(a[0] ^ b[0]).count("1") > HASH_DISTANCE_THRESHOLD:
+        return False
+    return float(np.abs(a[1] - b[1]).mean()) <= MEAN_DIFF_THRESHOLD
+
+
+class AdviceCache:
+    """
+    Keeps recent (frame signature, goal) -> parsed navigation advice entries so an
+    effectively unchanged scene does not cost another Gemini call. Entries expire after
+    `ttl` seconds and the oldest is evicted beyond `max_entries`.
+    """
+
+    def __init__(self, ttl=ADVICE_TTL, max_entries=ADVICE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict() # key -> (signature, goal, advice, stored_at)
+        self._next_key = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _expire(self, now):
+        for key in [k for k, entry in self._entries.items() if now - entry[3] > self.ttl]:
+            del self._entries[key]
+
+    def lookup(self, signature, goal: str):
+        now = time.monotonic()
+        self._expire(now)
+        for key in reversed(self._entries): # Newest first
+            entry = self._entries[key]
+            if entry[1] == goal and signatures_match(signature, entry[0]):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return dict(entry[2])
+        self.misses += 1
+        return None
+
+    def store(self, signature, goal: str, advice: dict):
+        self._entries[self._next_key] = (signature, goal, dict(advice), time.monotonic())
+        self._next_key += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "api_calls_saved": self.hits,
+                "hit_rate": self.hits / lookups if lookups else 0.0, "entries": len(self._entries)}
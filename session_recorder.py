@@ -0,0 +1,265 @@
+"""
+Session recorder and offline replay for the navigation stack.
+
+Recording: pass a SessionRecorder to pursue_object (or run main.py with
+ROBOGO_RECORD=<dir>). Each step's frame goes into a raw, memory-mappable
+frames.u8 archive; prompt, raw Gemini text, parsed advice, chosen moves and
+per-stage timings go into steps.jsonl.
+
+Replay: feeds the recorded frames and Gemini responses back through
+pursue_object with a ReplayCamera and a ReplayModel (a local stand-in with
+generate_content), at full speed or with the original latencies:
+
+    python session_recorder.py sessions/2026-10-18_120000 --realtime
+"""
+import argparse
+import json
+import os
+import random
+import time
+from collections import defaultdict, deque
+import numpy as np
+
+FRAMES_FILE = "frames.u8"
+STEPS_FILE = "steps.jsonl"
+META_FILE = "meta.json"
+REPLAY_CHUNK_CHARS = 32 # Replayed answers are streamed in chunks of this size when stream=True
+
+
+def percentile(values, pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+class SessionRecorder:
+    """
+    Collects step traces from pursue_object. With a `directory` everything is written
+    to disk as it happens; with directory=None only the timings are kept in memory,
+    which is what the replay benchmark uses.
+    """
+
+    def __init__(self, directory=None, goal_object: str = ""):
+        self.directory = directory
+        self.steps = 0
+        self.stage_timings = defaultdict(list) # stage -> [seconds]
+        self._frames = None
+        self._steps = None
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._frames = open(os.path.join(directory, FRAMES_FILE), "ab")
+            self._steps = open(os.path.join(directory, STEPS_FILE), "a", encoding="utf-8")
+            self._write_meta({"goal_object": goal_object, "started_at": time.time()})
+            print(f"[RECORDER] Recording session to {directory}")
+
+    def _write_meta(self, meta: dict):
+        path = os.path.join(self.directory, META_FILE)
+        existing = {}
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                existing = json.load(f)
+        existing.update(meta)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(existing, f, indent=2)
+
+    def set_goal(self, goal_object: str):
+        if self.directory is not None:
+            self._write_meta({"goal_object": goal_object})
+
+    def _append_frame(self, frame):
+        frame = np.ascontiguousarray(frame)
+        offset = self._frames.tell()
+        self._frames.write(frame.tobytes())
+        return {"offset": offset, "shape": list(frame.shape), "dtype": frame.dtype.str}
+
+    def record_step(self, trace: dict, frame=None):
+        self.steps += 1
+        for stage, seconds in trace.get("timings", {}).items():
+            self.stage_timings[stage].append(seconds)
+        if self.directory is None:
+            return
+        record = {k: v for k, v in trace.items()}
+        record["wall_time"] = time.time()
+        if frame is not None:
+            record["frame"] = self._append_frame(frame)
+        self._steps.write(json.dumps(record, default=str) + "\n")
+        self._steps.flush()
+
+    def stage_summary(self) -> dict:
+        return {stage: {"count": len(values), "mean": sum(values) / len(values),
+                        "p50": percentile(values, 50), "p95": percentile(values, 95), "max": max(values)}
+                for stage, values in self.stage_timings.items() if values}
+
+    def close(self):
+        if self.directory is None:
+            return
+        self._frames.close()
+        self._steps.close()
+        self._write_meta({"steps": self.steps, "finished_at": time.time()})
+        print(f"[RECORDER] Session saved ({self.steps} steps).")
+
+
+def load_session(directory):
+    """
+    Returns (meta, steps). Steps that recorded a frame get a "frame_array" entry: a
+    read-only view into the memory-mapped archive, so nothing is loaded until used.
+    """
+    with open(os.path.join(directory, META_FILE), encoding="utf-8") as f:
+        meta = json.load(f)
+    with open(os.path.join(directory, STEPS_FILE), encoding="utf-8") as f:
+        steps = [json.loads(line) for line in f if line.strip()]
+    frames_path = os.path.join(directory, FRAMES_FILE)
+    archive = np.memmap(frames_path, dtype=np.uint8, mode="r") if os.path.getsize(frames_path) else None
+    for step in steps:
+        info = step.get("frame")
+        if info is None or archive is None:
+            continue
+        dtype = np.dtype(info["dtype"])
+        nbytes = int(np.prod(info["shape"])) * dtype.itemsize
+        step["frame_array"] = archive[info["offset"]:info["offset"] + nbytes].view(dtype).reshape(info["shape"])
+    return meta, steps
+
+
+class _ReplayResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+    def resolve(self):
+        pass
+
+    def __iter__(self):
+        # stream=True: the recorded text in fixed-size chunks, like a streamed Gemini response
+        for start in range(0, len(self.text), REPLAY_CHUNK_CHARS):
+            yield _ReplayResponse(self.text[start:start + REPLAY_CHUNK_CHARS])
+
+
+def advice_to_text(advice) -> str:
+    """Renders parsed advice back into the numbered format of GEMINI_NAVIGATION_PROMPT_TEMPLATE."""
+    if not advice:
+        return ""
+    from gemini_utils import format_goal_box
+    text = (f"1. GOAL VISIBLE: {'Yes' if advice.get('goal_visible') else 'No'}\n"
+            f"2. GOAL DIRECTION: {advice.get('goal_direction', 'not visible')}\n"
+            f"3. GOAL PROXIMITY: {advice.get('goal_proximity', 'not visible')}\n"
+            f"4. PATH STATUS: {advice.get('path_status', 'blocked')}\n"
+            f"5. OBSTACLE INFO: {advice.get('obstacle_info', 'none')}")
+    if advice.get("goal_box"):
+        text += f"\n6. GOAL BOX: {format_goal_box(advice['goal_box'])}"
+    return text
+
+
+class ReplayModel:
+    """
+    Stand-in for the Gemini GenerativeModel. Each generate_content call answers with
+    the next recorded step's raw Gemini text (or, for steps the cache or local detector
+    answered, the recorded advice rendered as text). With realtime=True it also waits
+    for the recorded round-trip time. Calls line up one-to-one with frames in the
+    sequential loop; in the pipelined loop a discarded stale answer shifts the pairing.
+    """
+
+    def __init__(self, steps, realtime: bool = False):
+        self.realtime = realtime
+        self.calls = 0
+        self._responses = deque()
+        for step in steps:
+            text = step.get("advice_text") or advice_to_text(step.get("advice"))
+            self._responses.append((text, step.get("timings", {}).get("gemini", 0.0)))
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        self.calls += 1
+        if not self._responses:
+            return _ReplayResponse("") # Ran past the recording; behave like an empty answer
+        text, latency = self._responses.popleft()
+        if self.realtime:
+            time.sleep(latency)
+        return _ReplayResponse(text or "")
+
+
+class ReplayCamera:
+    """
+    Serves recorded frames in order; the last frame repeats once they run out.
+    With `capture_times` each call also waits for the recorded capture duration.
+    """
+
+    def __init__(self, frames, capture_times=None):
+        self._frames = frames
+        self._capture_times = capture_times
+        self._index = 0
+        self.exhausted = False
+
+    def capture_array(self, name="main"):
+        if not self._frames:
+            return None
+        index = min(self._index, len(self._frames) - 1)
+        if self._capture_times:
+            time.sleep(self._capture_times[index])
+        frame = self._frames[index]
+        self._index += 1
+        self.exhausted = self._index >= len(self._frames)
+        return frame
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+def replay_session(directory, realtime: bool = False, pipelined: bool = False, seed: int = 0,
+                   streaming: bool = False) -> dict:
+    """
+    Replays a recorded session through pursue_object with mock hardware and reports
+    throughput and per-stage latency. Deterministic for a given seed.
+    """
+    from navigation import pursue_object, STEP_PAUSE, PIPELINE_SETTLE_TIME
+    from gemini_client import GeminiClient, REQUESTS_PER_MINUTE
+    from robot_controller import ON_ROBOT, set_mock_time_scale
+    if ON_ROBOT:
+        print("WARNING: Replaying on the robot will drive the real motors.")
+    set_mock_time_scale(1.0 if realtime else 0.0) # Mock moves take their real duration only in realtime mode
+
+    meta, steps = load_session(directory)
+    nav_steps = [step for step in steps if step.get("kind", "navigation") == "navigation" and "frame_array" in step]
+    frames = [step["frame_array"] for step in nav_steps]
+    random.seed(seed) # _plan_step picks random turn directions
+    model = ReplayModel(nav_steps, realtime=realtime)
+    camera = ReplayCamera(frames, [step["timings"].get("capture", 0.0) for step in nav_steps] if realtime else None)
+    recorder = SessionRecorder(None)
+    stats = {}
+    # Own client so the live quota does not throttle a full-speed replay
+    client = GeminiClient(model, requests_per_minute=REQUESTS_PER_MINUTE if realtime else 1e6)
+    pursue_object(client, camera, meta.get("goal_object", "object"), pipelined=pipelined, stats=stats,
+                  recorder=recorder, max_steps=max(1, len(frames)), streaming=streaming, scan_headings=0,
+                  step_pause=STEP_PAUSE if realtime else 0.0,
+                  settle_time=PIPELINE_SETTLE_TIME if realtime else 0.0)
+    report = {"recorded_steps": len(steps), "replayed_steps": stats.get("steps", 0),
+              "elapsed_s": stats.get("elapsed_s", 0.0), "steps_per_second": stats.get("steps_per_second", 0.0),
+              "model_calls": model.calls, "stages": recorder.stage_summary()}
+    return report
+
+
+def print_report(report: dict):
+    print(f"\n[REPLAY] {report['replayed_steps']} steps in {report['elapsed_s']:.2f}s "
+          f"({report['steps_per_second']:.2f} steps/s), {report['model_calls']} model calls")
+    print(f"{'stage':<10}{'count':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'max ms':>10}")
+    for stage, s in sorted(report["stages"].items()):
+        print(f"{stage:<10}{s['count']:>7}{s['mean'] * 1000:>10.2f}{s['p50'] * 1000:>10.2f}"
+              f"{s['p95'] * 1000:>10.2f}{s['max'] * 1000:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded navigation session offline.")
+    parser.add_argument("session", help="Directory written by SessionRecorder")
+    parser.add_argument("--realtime", action="store_true", help="Reproduce recorded Gemini latencies and pauses")
+    parser.add_argument("--pipelined", action="store_true", help="Replay through the pipelined loop")
+    parser.add_argument("--streaming", action="store_true", help="Replay answers as streamed responses")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    print_report(replay_session(args.session, realtime=args.realtime, pipelined=args.pipelined, seed=args.seed,
+                                streaming=args.streaming))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+"""
+Dead-reckoned pose and spatial memory for searching, in place of random turns.
+
+SpatialMemory follows the robot's heading and position from the moves the motor
+executor actually ran (turn rate from FULL_TURN_DURATION, speed from DRIVE_SPEED).
+Every parsed answer is recorded against that pose: which headings have been looked at
+from the current viewpoint, which were blocked, which floor cells are occupied or were
+driven over, and where the goal was last seen. plan() then picks the recovery move:
+back toward the goal's last bearing while that is recent, otherwise the nearest
+heading not yet looked at from here, and once every heading has been checked, a drive
+to a new viewpoint along the clearest heading. An obstacle between the robot and the
+goal is driven around rather than only turned away from. The robot only drives along a
+heading an answer has reported clear from here; otherwise it turns, and drives on the
+next step once the answer for the new heading says the path is clear.
+"""
+import math
+import threading
+from camera import CAMERA_FOV
+from goal_tracker import PROXIMITY_DISTANCES
+from payload_controller import DIRECTION_X
+from robot_controller import forward, left, right, FULL_TURN_DURATION, DRIVE_SPEED
+
+HEADING_BINS = 12 # 30 degree sectors
+TURN_RATE = 360.0 / FULL_TURN_DURATION # Degrees per second turning in place
+CELL_SIZE = 0.25 # Metres per occupancy cell
+VIEWPOINT_RADIUS = 0.5 # Moving further than this starts a fresh set of checked headings
+BLOCKED_AHEAD = 0.35 # Metres ahead of the robot marked occupied when the path is blocked
+GOAL_MEMORY = 8 # Observations for which the goal's last bearing is trusted
+MIN_TURN = 0.1 # Seconds; shorter planned turns are rounded up
+EXPLORE_MOVE = 1.2 # Seconds driven to a new viewpoint once every heading here has been checked
+DETOUR_MOVE = 1.2 # Seconds driven past an obstacle between the robot and the goal
+SCAN_POSITIONS = {"left": "slightly left", "center": "center", "right": "slightly right"}
+
+
+def _wrap(degrees: float) -> float:
+    return (degrees + 180.0) % 360.0 - 180.0
+
+
+class SpatialMemory:
+    """
+    Pose estimate plus what has been seen where. Attach it to the motors once
+    (attach(motors)); call new_goal() when a pursuit starts, observe() for each parsed
+    answer and plan() for a recovery move. Headings are degrees counter-clockwise from
+    the robot's heading when the memory was created.
+    """
+
+    def __init__(self):
+        self.x = 0.0
+        self.y = 0.0
+        self.heading = 0.0
+        self._lock = threading.Lock()
+        self._viewpoint = (0.0, 0.0)
+        self._checked = [None] * HEADING_BINS # Observation number the sector was last seen at, from this viewpoint
+        self._blocked = [False] * HEADING_BINS
+        self._clear = [None] * HEADING_BINS # Observation number the path along the sector was last seen clear at
+        self._occupied = set() # Cells seen blocked
+        self._visited = set() # Cells the robot has been in
+        self._observations = 0
+        self._seen_heading = 0.0 # Heading of the latest observation
+        self.goal_bearing = None
+        self.goal_position = None
+        self._goal_seen_at = None
+        self._pending_drive = None # (sector, seconds, observation) turned to but not yet seen clear
+        self.plans = {"goal": 0, "unseen": 0, "explore": 0, "revisit": 0, "detour": 0, "confirmed_drive": 0}
+
+    def attach(self, motors):
+        """Updates the pose after every move `motors` (robot_controller.Motors) executes."""
+        motors.add_listener(self.apply_motion)
+        return self
+
+    def apply_motion(self, name: str, seconds: float):
+        with self._lock:
+            if name in ("left", "right"):
+                self.heading = (self.heading + (TURN_RATE if name == "left" else -TURN_RATE) * seconds) % 360
+                return
+            distance = DRIVE_SPEED * seconds * (1 if name == "forward" else -1)
+            self.x += distance * math.cos(math.radians(self.heading))
+            self.y += distance * math.sin(math.radians(self.heading))
+            self._visited.add(self._cell(self.x, self.y))
+            if math.dist((self.x, self.y), self._viewpoint) > VIEWPOINT_RADIUS:
+                self._new_viewpoint()
+
+    def _new_viewpoint(self):
+        self._viewpoint = (self.x, self.y)
+        self._checked = [None] * HEADING_BINS
+        self._blocked = [False] * HEADING_BINS
+        self._clear = [None] * HEADING_BINS
+
+    def new_goal(self):
+        """Forgets the previous goal and the headings checked for it; keeps the pose and the map."""
+        with self._lock:
+            self._new_viewpoint()
+            self.goal_bearing = None
+            self.goal_position = None
+            self._goal_seen_at = None
+
+    @staticmethod
+    def _cell(x: float, y: float):
+        return int(math.floor(x / CELL_SIZE)), int(math.floor(y / CELL_SIZE))
+
+    @staticmethod
+    def _bin(heading: float) -> int:
+        return int((heading % 360) / (360 / HEADING_BINS)) % HEADING_BINS
+
+    @staticmethod
+    def _bin_heading(index: int) -> float:
+        return (index + 0.5) * 360 / HEADING_BINS
+
+    def pose(self):
+        """(heading, (x, y)) now; taken when a frame is captured and handed back to observe()."""
+        with self._lock:
+            return self.heading, (self.x, self.y)
+
+    def observe(self, advice, heading: float = None, position=None):
+        """
+        Records one answer for the view at `heading` from `position` (the current estimate
+        by default): the sectors it covered, whether the path ahead was blocked and where
+        the goal was.
+        """
+        with self._lock:
+            heading = self.heading if heading is None else heading
+            x, y = (self.x, self.y) if position is None else position
+            self._observations += 1
+            self._seen_heading = heading
+            sector = 360 / HEADING_BINS
+            for offset in range(-int(CAMERA_FOV / 2 // sector), int(CAMERA_FOV / 2 // sector) + 1):
+                self._checked[self._bin(heading + offset * sector)] = self._observations
+            path_status = advice.get("path_status", "")
+            ahead = self._bin(heading)
+            if path_status in ("major obstacle", "blocked"):
+                self._blocked[ahead] = True
+                self._occupied.add(self._cell(x + BLOCKED_AHEAD * math.cos(math.radians(heading)),
+                                              y + BLOCKED_AHEAD * math.sin(math.radians(heading))))
+            elif path_status == "clear":
+                self._clear[ahead] = self._observations
+            x = DIRECTION_X.get(advice.get("goal_direction", ""))
+            if advice.get("goal_visible") and x is not None:
+                self.goal_bearing = (heading + (0.5 - x) * CAMERA_FOV) % 360
+                self._goal_seen_at = self._observations
+                distance = dict(PROXIMITY_DISTANCES).get(advice.get("goal_proximity"))
+                self.goal_position = None if distance is None else (
+                    x + distance * math.cos(math.radians(self.goal_bearing)),
+                    y + distance * math.sin(math.radians(self.goal_bearing)))
+
+    def observe_scan_view(self, heading: float, position: str = None, proximity: str = None):
+        """A multi-view scan frame taken at `heading`; `position` is where the goal was in it, if it was."""
+        if position is None:
+            self.observe({"goal_visible": False}, heading)
+        else:
+            self.observe({"goal_visible": True, "goal_direction": SCAN_POSITIONS.get(position, "center"),
+                          "goal_proximity": proximity}, heading)
+
+    def goal_recent(self) -> bool:
+        """Whether the goal was seen recently enough to turn back to it rather than search."""
+        with self._lock:
+            return self._goal_seen_at is not None and self._observations - self._goal_seen_at <= GOAL_MEMORY
+
+    def unchecked_headings(self) -> int:
+        """Sectors not yet looked at from the current spot; a scan from here is only worth it while > 0."""
+        with self._lock:
+            return sum(1 for checked in self._checked if checked is None)
+
+    @staticmethod
+    def _queued_turn(queued) -> float:
+        # Net degrees turned by the ("move", ...) actions already planned this step
+        return sum((TURN_RATE if action[1] is left else -TURN_RATE) * action[2]
+                   for action in queued if action[0] == "move" and action[1] in (left, right))
+
+    def _turn_to(self, target: float, heading: float):
+        delta = _wrap(target - heading)
+        return ("move", left if delta > 0 else right, max(MIN_TURN, abs(delta) / TURN_RATE))
+
+    def _goal_bearing_now(self):
+        # Bearing of the remembered goal from the current position, or None if it is stale
+        if self._goal_seen_at is None or self._observations - self._goal_seen_at > GOAL_MEMORY:
+            return None
+        if self.goal_position is not None and math.dist((self.x, self.y), self.goal_position) > 0.1:
+            return math.degrees(math.atan2(self.goal_position[1] - self.y, self.goal_position[0] - self.x))
+        return self.goal_bearing
+
+    def _toward_goal(self, heading: float):
+        # Turn back toward where the goal was last seen, unless that is stale or already in view
+        bearing = self._goal_bearing_now()
+        if bearing is None:
+            return None
+        if abs(_wrap(bearing - heading)) < CAMERA_FOV / 4:
+            self._goal_seen_at = None # Facing it and still not seeing it: occluded or moved, so search instead
+            return None
+        return self._turn_to(bearing, heading)
+
+    def _ahead_score(self, index: int) -> int:
+        # Occupied or already visited cells along the sector's heading, for choosing where to drive
+        heading = math.radians(self._bin_heading(index))
+        cells = {self._cell(self.x + d * math.cos(heading), self.y + d * math.sin(heading)) for d in (0.3, 0.6, 0.9)}
+        return 3 * len(cells & self._occupied) + len(cells & self._visited)
+
+    def _just_seen_clear(self, index: int, heading: float) -> bool:
+        # The latest answer was for this sector and reported the path clear
+        return self._bin(heading) == index and self._clear[index] == self._observations
+
+    def _drive_along(self, target: int, seconds: float, heading: float) -> list:
+        # Only drive where the latest answer saw the path clear; otherwise turn, look, and drive next step
+        if self._just_seen_clear(target, heading):
+            return [("move", forward, seconds)]
+        self._pending_drive = (target, seconds, self._observations)
+        return [self._turn_to(self._bin_heading(target), heading)]
+
+    def plan(self, reason: str, duration: float, queued=()) -> list:
+        """
+        Move actions to recover when the goal is not in view or the path is in the way.
+        `reason` is "search" (goal not visible), "blocked" (turn away from the path ahead),
+        "detour" (drive around what blocks the way to a visible goal) or "sidestep" (a small
+        turn of `duration` seconds, to the more promising side). Turns in `queued`, the
+        actions already planned before these, are counted in the heading planned from.
+        """
+        with self._lock:
+            heading = (self.heading + self._queued_turn(queued)) % 360
+            pending, self._pending_drive = self._pending_drive, None
+            if pending is not None and reason == "search" and self._observations == pending[2] + 1 \
+                    and self._just_seen_clear(pending[0], heading):
+                self.plans["confirmed_drive"] += 1 # The answer for the heading turned to says it is clear
+                return [("move", forward, pending[1])]
+            bearing = self._goal_bearing_now()
+            if reason in ("search", "blocked") and self._blocked[self._bin(heading)] and bearing is not None \
+                    and abs(_wrap(bearing - heading)) < CAMERA_FOV / 2:
+                reason = "detour" # Whatever is ahead hides the goal: go around it, not away from it
+            if reason == "search":
+                turn = self._toward_goal(heading)
+                if turn is not None:
+                    self.plans["goal"] += 1
+                    return [turn]
+            current = self._bin(heading)
+            # Anything but "search" turns away from what the latest answer saw ahead
+            candidates = [i for i in range(HEADING_BINS) if not self._blocked[i] and (
+                reason == "search" or abs(_wrap(self._bin_heading(i) - self._seen_heading)) > CAMERA_FOV / 2)]
+            unseen = [i for i in candidates if self._checked[i] is None]
+            if reason == "detour":
+                # The least turn off the blocked heading whose way ahead is free, then past the obstacle
+                target = min(candidates or range(HEADING_BINS), key=lambda i: (
+                    self._ahead_score(i) >= 3, abs(_wrap(self._bin_heading(i) - heading))))
+                self.plans["detour"] += 1
+                return self._drive_along(target, DETOUR_MOVE, heading)
+            if unseen:
+                target = min(unseen, key=lambda i: abs(_wrap(self._bin_heading(i) - heading)))
+                kind = "unseen"
+            elif reason == "search":
+                # Everything around has been looked at from here: drive somewhere new
+                target = min(candidates or range(HEADING_BINS),
+                             key=lambda i: (self._clear[i] is None, self._ahead_score(i), i != current))
+                self.plans["explore"] += 1
+                return self._drive_along(target, EXPLORE_MOVE, heading)
+            else:
+                target = min(candidates or [i for i in range(HEADING_BINS) if i != current],
+                             key=lambda i: self._checked[i] or 0) # Least recently seen
+                kind = "revisit"
+            self.plans[kind] += 1
+            turn = self._turn_to(self._bin_heading(target), heading)
+            if reason == "sidestep":
+                return [("move", turn[1], duration)]
+            return [turn]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"heading": self.heading, "position": (self.x, self.y),
+                    "headings_checked": sum(1 for c in self._checked if c is not None),
+                    "occupied_cells": len(self._occupied), "visited_cells": len(self._visited),
+                    "plans": dict(self.plans)}
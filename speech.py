@@ -1,14 +1,322 @@
-from gtts import gTTS
+from collections import OrderedDict
+import hashlib
+import heapq
+import io
+import itertools
+import os
 import subprocess
+import threading
+import time
+import metrics
 
-def speak(text: str):
+PRIORITY_URGENT = 0 # Stops, errors: jump ahead and cut off whatever is playing
+PRIORITY_NORMAL = 1
+PRIORITY_STATUS = 2 # Situation updates: first to be dropped when the queue is full
+SPEECH_QUEUE_SIZE = 8
+PLAYBACK_TIMEOUT = 10
+TTS_LANG = 'en'
+SPEECH_ENABLED = os.getenv("ROBOGO_SPEECH", "1") == "1" # 0: speak() is a silent no-op (headless simulations)
+TTS_CACHE_DIR = os.getenv("ROBOGO_TTS_CACHE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "tts_cache"))
+TTS_CACHE_MAX_BYTES = 20 * 1024 * 1024 # On-disk limit, least recently used phrases are evicted first
+TTS_MEMORY_ITEMS = 64 # Phrases kept decoded in memory for instant playback
+
+
+class PhraseCache:
+    """
+    Synthesized speech keyed by text. Keeps recently used MP3s in memory and all of
+    them on disk (up to max_bytes, LRU by file mtime) so repeated phrases never hit
+    the gTTS network API again, even across runs.
+    """
+
+    def __init__(self, cache_dir=TTS_CACHE_DIR, max_bytes=TTS_CACHE_MAX_BYTES, memory_items=TTS_MEMORY_ITEMS):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _path(self, text: str) -> str:
+        key = hashlib.sha1(f"{TTS_LANG}:{text}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{key}.mp3")
+
+    def _remember(self, text: str, audio: bytes):
+        with self._lock:
+            self._memory[text] = audio
+            self._memory.move_to_end(text)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, text: str):
+        with self._lock:
+            audio = self._memory.get(text)
+            if audio is not None:
+                self._memory.move_to_end(text)
+                self.memory_hits += 1
+                return audio
+        path = self._path(text)
+        try:
+            with open(path, "rb") as f:
+                audio = f.read()
+            os.utime(path) # Mark as recently used for LRU eviction
+        except OSError:
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        self._remember(text, audio)
+        return audio
+
+    def put(self, text: str, audio: bytes):
+        self._remember(text, audio)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            path = self._path(text)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, path) # Atomic, so concurrent readers never see a partial file
+            self._evict()
+        except OSError as e:
+            print(f"[SPEECH] Could not write phrase cache: {e}")
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".mp3"):
+                stat = os.stat(os.path.join(self.cache_dir, name))
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+                total -= size
+            except OSError:
+                pass
+
+    def synthesize(self, text: str) -> bytes:
+        audio = self.get(text)
+        if audio is not None:
+            return audio
+        with self._lock:
+            self.misses += 1
+        metrics.increment("speech.cache_misses")
+        buffer = io.BytesIO()
+        from gtts import gTTS # Deferred: only needed on a cache miss, and slow to import
+        with metrics.timed("speech.synthesize"):
+            gTTS(text=text, lang=TTS_LANG).write_to_fp(buffer)
+        audio = buffer.getvalue()
+        self.put(text, audio)
+        return audio
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits,
+                    "misses": self.misses, "memory_items": len(self._memory)}
+
+
+class SpeechHandle:
+    """Returned by speak(). Lets a caller wait until the message was played (or dropped)."""
+
+    def __init__(self, text: str):
+        self.text = text
+        self.played = False
+        self.dropped = False
+        self._done = threading.Event()
+
+    def wait(self, timeout=None) -> bool:
+        return self._done.wait(timeout)
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def _finish(self, played=False, dropped=False):
+        self.played = played
+        self.dropped = dropped
+        self._done.set()
+
+
+class _SpeechWorker:
+    """Single background thread that plays queued messages in priority order."""
+
+    def __init__(self, cache: PhraseCache, maxsize=SPEECH_QUEUE_SIZE):
+        self._cache = cache
+        self._maxsize = maxsize
+        self._cond = threading.Condition()
+        self._heap = [] # Entries: (priority, seq, coalesce_key, handle)
+        self._seq = itertools.count()
+        self._thread = None
+        self._current_proc = None
+        self._current_priority = None
+        self._preempted = False # Set when an urgent message cut off the current one
+        self._busy = False
+
+    def submit(self, text: str, priority: int, coalesce_key) -> SpeechHandle:
+        handle = SpeechHandle(text)
+        with self._cond:
+            if coalesce_key is not None: # A newer status message replaces the pending one
+                kept = []
+                for entry in self._heap:
+                    if entry[2] == coalesce_key:
+                        print(f"[SPEECH] Dropping outdated message: {entry[3].text}")
+                        metrics.increment("speech.coalesced")
+                        entry[3]._finish(dropped=True)
+                    else:
+                        kept.append(entry)
+                heapq.heapify(kept)
+                self._heap = kept
+
+            if len(self._heap) >= self._maxsize:
+                # Evict the least important, oldest message; drop the new one if it is even less important
+                victim = max(self._heap, key=lambda e: (e[0], -e[1]))
+                if victim[0] >= priority:
+                    self._heap.remove(victim)
+                    heapq.heapify(self._heap)
+                    print(f"[SPEECH] Queue full, dropping: {victim[3].text}")
+                    metrics.increment("speech.dropped")
+                    victim[3]._finish(dropped=True)
+                else:
+                    print(f"[SPEECH] Queue full, dropping: {text}")
+                    metrics.increment("speech.dropped")
+                    handle._finish(dropped=True)
+                    return handle
+
+            heapq.heappush(self._heap, (priority, next(self._seq), coalesce_key, handle))
+
+            if priority == PRIORITY_URGENT and self._current_priority is not None \
+                    and self._current_priority > PRIORITY_URGENT:
+                self._preempted = True # Still synthesizing: _synthesize_and_play will not start playback
+                if self._current_proc is not None:
+                    try:
+                        self._current_proc.terminate() # Cut off the less important message
+                    except Exception:
+                        pass
+
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="speech-worker", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return handle
+
+    def flush(self, timeout=None) -> bool:
+        """Waits until the queue is empty and nothing is playing."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._heap and not self._busy, timeout)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._heap)
+                priority, _, _, handle = heapq.heappop(self._heap)
+                self._busy = True
+                self._current_priority = priority
+                self._preempted = False
+            played = False
+            try:
+                played = self._synthesize_and_play(handle.text)
+            finally:
+                with self._cond:
+                    preempted = self._preempted
+                    self._busy = False
+                    self._current_proc = None
+                    self._current_priority = None
+                    self._preempted = False
+                    self._cond.notify_all()
+                handle._finish(played=played and not preempted, dropped=preempted)
+
+    def _synthesize_and_play(self, text: str) -> bool:
+        """Returns True if the message played to the end."""
+        try:
+            audio = self._cache.synthesize(text)
+            with self._cond:
+                if self._preempted: # An urgent message arrived while this one was being synthesized
+                    print(f"[SPEECH] Skipping, an urgent message is waiting: {text}")
+                    metrics.increment("speech.preempted")
+                    return False
+                # Stream the MP3 to mpg123 on stdin instead of rewriting a shared temp file
+                proc = subprocess.Popen(["mpg123", "-q", "-"], stdin=subprocess.PIPE,
+                                        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+                self._current_proc = proc
+            try:
+                # Use a timeout for mpg123 to prevent it from hanging
+                with metrics.timed("speech.playback"):
+                    proc.communicate(input=audio, timeout=PLAYBACK_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                metrics.increment("speech.playback_timeouts")
+                proc.kill()
+                proc.wait()
+                return False
+            except BrokenPipeError:
+                proc.wait() # Playback was cut off by an urgent message
+                return False
+            return proc.returncode == 0
+        except FileNotFoundError:
+            print("WARNING: mpg123 not found. Cannot play speech.")
+        except Exception as e:
+            print(f"Speech synthesis/playback error: {e}")
+        return False
+
+
+_cache = PhraseCache()
+_worker = _SpeechWorker(_cache)
+
+
+def speak(text: str, priority: int = PRIORITY_NORMAL, coalesce_key=None, wait: bool = False) -> SpeechHandle:
+    """
+    Queues `text` for the background speech worker and returns immediately.
+    Messages sharing a `coalesce_key` replace each other while still pending.
+    Pass wait=True (or call handle.wait()) to block until it has been played.
+    """
+    if not SPEECH_ENABLED:
+        handle = SpeechHandle(text)
+        handle._finish(dropped=True)
+        return handle
     print(f"[Robot says]: {text}")
-    try:
-        tts = gTTS(text=text, lang='en')
-        tts.save("output.mp3")
-        # Use a timeout for mpg123 to prevent it from hanging
-        subprocess.run(["mpg123", "-q", "output.mp3"], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
-    except FileNotFoundError: # Added specific error handling
-        print("WARNING: mpg123 not found. Cannot play speech.")
-    except Exception as e:
-        print(f"Speech synthesis/playback error: {e}") # Changed print statement
\ No newline at end of file
+    handle = _worker.submit(text, priority, coalesce_key)
+    if wait:
+        handle.wait(PLAYBACK_TIMEOUT * 2)
+    return handle
+
+
+def set_speech_enabled(on: bool):
+    global SPEECH_ENABLED
+    SPEECH_ENABLED = on
+
+
+def flush_speech(timeout=None) -> bool:
+    """Blocks until every queued message has been played. Returns False on timeout."""
+    return _worker.flush(timeout)
+
+
+def warm_up_speech(phrases, background: bool = True):
+    """
+    Pre-renders `phrases` into the phrase cache so they later play without a gTTS
+    round-trip. Runs on a daemon thread by default and returns it.
+    """
+    def render():
+        started_at = time.monotonic()
+        rendered = 0
+        for text in dict.fromkeys(phrases): # Deduplicate, keep order
+            if _cache.get(text) is not None:
+                continue
+            try:
+                _cache.synthesize(text)
+                rendered += 1
+            except Exception as e:
+                print(f"[SPEECH] Warm-up stopped, synthesis failed: {e}")
+                break
+        print(f"[SPEECH] Phrase bank ready: {rendered} newly rendered in {time.monotonic() - started_at:.2f}s.")
+
+    if not background:
+        render()
+        return None
+    thread = threading.Thread(target=render, name="speech-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def speech_cache_stats() -> dict:
+    return _cache.stats()
@@ -0,0 +1,50 @@
+"""GeminiClient: what counts against the circuit breaker, and closing while calls are in flight."""
+import threading
+import time
+import gemini_utils
+from gemini_client import GeminiClient, FakeGenerativeModel
+
+
+def _client(model, **kwargs):
+    return GeminiClient(model, requests_per_minute=6000, max_retries=1, **kwargs)
+
+
+def test_slow_service_counts_against_the_breaker():
+    client = _client(FakeGenerativeModel(latency=0.3), deadline=0.1)
+    assert client.generate(["ping"], {}) == ""
+    assert client.breaker._consecutive == 1
+
+
+def test_time_lost_waiting_for_a_worker_does_not():
+    client = _client(FakeGenerativeModel(latency=0.5), deadline=0.1, workers=1)
+    client.generate(["ping"], {}) # Abandoned at its deadline, still holding the only worker
+    consecutive = client.breaker._consecutive
+    assert client.generate(["ping"], {}) == ""
+    assert client.breaker._consecutive == consecutive # Never reached the service
+
+
+def test_close_waits_for_calls_in_flight():
+    model = FakeGenerativeModel(latency=0.2)
+    client = _client(model)
+    answers = []
+    caller = threading.Thread(target=lambda: answers.append(client.generate(["ping"], {})))
+    caller.start()
+    time.sleep(0.05)
+    client.close()
+    assert answers == ["OK"] # close() returned only after the call did
+    assert client.bind(model).generate(["ping"], {}) == "" and model.calls == 1
+    caller.join()
+
+
+def test_get_client_lets_the_replaced_client_finish(monkeypatch):
+    monkeypatch.setattr(gemini_utils, "_client", None)
+    old_model = FakeGenerativeModel(latency=0.2)
+    old = gemini_utils.get_client(old_model)
+    answers = []
+    caller = threading.Thread(target=lambda: answers.append(old.generate(["ping"], {})))
+    caller.start()
+    time.sleep(0.05)
+    new = gemini_utils.get_client(FakeGenerativeModel(latency=0.0))
+    assert new is not old and new.generate(["ping"], {}) == "OK"
+    caller.join()
+    assert answers == ["OK"]
@@ -0,0 +1,24 @@
+"""LocalDetector.advise on stubbed detections: it never vouches for the path."""
+import numpy as np
+from local_detector import LocalDetector, MIN_GOAL_CONFIDENCE
+
+FRAME = np.zeros((240, 320, 3), dtype=np.uint8)
+
+
+def _detector(detections):
+    detector = object.__new__(LocalDetector) # Skips loading a backend
+    detector.min_confidence = MIN_GOAL_CONFIDENCE
+    detector.detect = lambda frame: detections
+    return detector
+
+
+def test_goal_found_with_nothing_in_the_way_leaves_the_path_unknown():
+    advice = _detector([("sports ball", 0.9, (140.0, 100.0, 180.0, 140.0))]).advise(FRAME, "red ball")
+    assert advice["goal_visible"] and advice["goal_direction"] == "center"
+    assert advice["path_status"] == "unknown"
+
+
+def test_unsure_or_obstructed_goal_escalates():
+    assert _detector([("sports ball", 0.3, (140.0, 100.0, 180.0, 140.0))]).advise(FRAME, "ball") is None
+    assert _detector([("sports ball", 0.9, (140.0, 100.0, 180.0, 140.0)),
+                      ("chair", 0.8, (120.0, 150.0, 200.0, 240.0))]).advise(FRAME, "ball") is None
@@ -0,0 +1,66 @@
+"""MotorExecutor on the mock backend: ordering, cancel, preempt, emergency stop and listeners."""
+import time
+from robot_controller import create_mock_motors, forward, left, right
+
+WAIT = 2.0 # Generous bound for handle.wait(), so a hang fails the test instead of blocking it
+
+
+def test_moves_run_in_order_for_their_duration():
+    motors = create_mock_motors(time_scale=1.0)
+    ran = []
+    motors.add_listener(lambda name, seconds: ran.append((name, seconds)))
+    started_at = time.monotonic()
+    first = motors.execute_move(forward, 0.05, wait=False)
+    second = motors.execute_move(left, 0.05, wait=False)
+    assert second.wait(WAIT) and first.done()
+    assert time.monotonic() - started_at >= 0.1
+    assert [name for name, _ in ran] == ["forward", "left"]
+    assert not first.cancelled and first.elapsed == 0.05
+
+
+def test_cancel_queued_and_running_moves():
+    motors = create_mock_motors(time_scale=1.0)
+    running = motors.execute_move(forward, 1.0, wait=False)
+    queued = motors.execute_move(left, 1.0, wait=False)
+    queued.cancel()
+    assert queued.done() and queued.cancelled and queued.elapsed == 0.0
+    time.sleep(0.05)
+    running.cancel()
+    assert running.wait(WAIT)
+    assert running.cancelled and 0.0 < running.elapsed < 0.5
+
+
+def test_preempt_replaces_running_and_queued_moves():
+    motors = create_mock_motors(time_scale=1.0)
+    running = motors.execute_move(forward, 1.0, wait=False)
+    queued = motors.execute_move(left, 1.0, wait=False)
+    time.sleep(0.05)
+    urgent = motors.execute_move(right, 0.05, wait=False, preempt=True)
+    assert urgent.wait(WAIT) and not urgent.cancelled
+    assert running.cancelled and running.elapsed < 0.5
+    assert queued.cancelled and queued.elapsed == 0.0
+
+
+def test_emergency_stop_halts_within_milliseconds():
+    motors = create_mock_motors(time_scale=1.0)
+    running = motors.execute_move(forward, 2.0, wait=False)
+    queued = motors.execute_move(forward, 2.0, wait=False)
+    time.sleep(0.05)
+    stopped_at = time.monotonic()
+    motors.stop()
+    assert running.wait(WAIT)
+    assert time.monotonic() - stopped_at < 0.05
+    assert running.cancelled and queued.cancelled
+    assert motors.executor.idle()
+
+
+def test_failing_listener_does_not_stop_the_executor():
+    motors = create_mock_motors(time_scale=0)
+    motors.add_listener(lambda name, seconds: 1 / 0)
+    seen = []
+    motors.add_listener(lambda name, seconds: seen.append(name))
+    first = motors.execute_move(forward, 0.1, wait=False)
+    assert first.wait(WAIT) and first.elapsed == 0.1
+    second = motors.execute_move(left, 0.1, wait=False)
+    assert second.wait(WAIT)
+    assert seen == ["forward", "left"]
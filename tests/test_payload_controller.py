@@ -0,0 +1,51 @@
+"""PayloadController: crop bands around the goal and mapping answers for a crop back to the full frame."""
+import numpy as np
+from pytest import approx
+from payload_controller import PayloadController, PAYLOAD_LEVELS, START_LEVEL
+
+
+def test_whole_frame_until_the_goal_is_placed():
+    controller = PayloadController()
+    assert controller.settings()["roi"] is None
+    controller.observe({"goal_visible": True, "goal_direction": "slightly right"})
+    settings = controller.settings()
+    assert settings["roi"] == approx((0.4, 1.0)) # Pushed inside the frame, and still covering its middle
+    assert settings["level"] == START_LEVEL + 1
+    controller.observe({"goal_visible": False})
+    assert controller.settings()["roi"] is None
+
+
+def test_band_follows_the_goal_and_recentres_after_a_turn():
+    controller = PayloadController()
+    controller.observe({"goal_visible": True, "goal_direction": "far left"})
+    assert controller.settings()["roi"] == (0.0, 0.6)
+    controller.observe({"goal_visible": True, "goal_direction": "far left"}, turned=True)
+    assert controller.settings()["roi"] == approx((0.2, 0.8))
+
+
+def test_remap_maps_crop_directions_and_boxes_to_the_full_frame():
+    controller = PayloadController()
+    settings = {"roi": (0.4, 1.0)}
+    fields = controller.remap({"goal_direction": "center", "goal_box": (0.0, 0.2, 0.5, 0.6)}, settings)
+    assert fields["goal_direction"] == "slightly right" # 0.5 across the band is 0.7 across the frame
+    assert fields["goal_box"] == approx((0.4, 0.2, 0.7, 0.6))
+    assert controller.remap({"goal_direction": "far left"}, settings)["goal_direction"] == "center"
+    assert controller.remap({"goal_direction": "far left"}, {"roi": (0.0, 0.6)})["goal_direction"] == "far left"
+
+
+def test_remap_leaves_whole_frames_and_unfinished_fields_alone():
+    controller = PayloadController()
+    assert controller.remap({"goal_direction": "far right"}, {"roi": None}) == {"goal_direction": "far right"}
+    assert controller.remap({"goal_direction": "not visible"}, {"roi": (0.4, 1.0)}) == \
+        {"goal_direction": "not visible"}
+    streamed = {"goal_direction": "center", "goal_box": "100, 200"} # Box still arriving as text
+    assert controller.remap(streamed, {"roi": (0.4, 1.0)})["goal_box"] == "100, 200"
+
+
+def test_encode_sends_only_the_band():
+    controller = PayloadController()
+    controller.observe({"goal_visible": True, "goal_direction": "slightly right"})
+    jpeg, settings = controller.encode(np.zeros((240, 320, 3), dtype=np.uint8))
+    assert jpeg[:2] == b"\xff\xd8" and settings["bytes"] == len(jpeg)
+    assert settings["scale"] == PAYLOAD_LEVELS[START_LEVEL + 1][0]
+    assert controller.stats()["requests"] == 0 # Counted by record(), once the frame was actually sent
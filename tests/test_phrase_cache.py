@@ -0,0 +1,54 @@
+"""PhraseCache: memory and disk hits, and least-recently-used eviction on both tiers."""
+import os
+from speech import PhraseCache
+
+AUDIO = b"\xff" * 100 # Stand-in MP3 bytes
+
+
+def _age(cache, text, seconds_ago):
+    # Backdates a phrase's file, as if it was last used that long ago
+    path = cache._path(text)
+    stamp = os.stat(path).st_mtime - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_phrases_survive_a_new_cache_on_the_same_directory(tmp_path):
+    PhraseCache(cache_dir=str(tmp_path)).put("hello", AUDIO)
+    cache = PhraseCache(cache_dir=str(tmp_path))
+    assert cache.synthesize("hello") == AUDIO # Served from disk, gTTS is never imported
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["misses"] == 0
+    assert cache.get("hello") == AUDIO
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_disk_evicts_least_recently_used_beyond_max_bytes(tmp_path):
+    cache = PhraseCache(cache_dir=str(tmp_path), max_bytes=2 * len(AUDIO))
+    cache.put("a", AUDIO)
+    _age(cache, "a", 30)
+    cache.put("b", AUDIO)
+    _age(cache, "b", 20)
+    cache.put("c", AUDIO)
+    assert not os.path.exists(cache._path("a"))
+    assert os.path.exists(cache._path("b")) and os.path.exists(cache._path("c"))
+
+
+def test_reading_a_phrase_from_disk_marks_it_recently_used(tmp_path):
+    cache = PhraseCache(cache_dir=str(tmp_path), max_bytes=2 * len(AUDIO), memory_items=0)
+    cache.put("a", AUDIO)
+    _age(cache, "a", 30)
+    cache.put("b", AUDIO)
+    _age(cache, "b", 20)
+    assert cache.get("a") == AUDIO # Now the most recently used
+    cache.put("c", AUDIO)
+    assert os.path.exists(cache._path("a")) and not os.path.exists(cache._path("b"))
+
+
+def test_memory_keeps_only_the_most_recent_phrases(tmp_path):
+    cache = PhraseCache(cache_dir=str(tmp_path), memory_items=2)
+    cache.put("a", AUDIO)
+    cache.put("b", AUDIO)
+    cache.get("a")
+    cache.put("c", AUDIO) # "b" is the least recently used in memory
+    assert cache.stats()["memory_items"] == 2
+    cache.get("b")
+    assert cache.stats()["disk_hits"] == 1 and cache.stats()["memory_hits"] == 1
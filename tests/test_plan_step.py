@@ -0,0 +1,26 @@
+"""_plan_step without a spatial memory: when a lost goal is scanned for."""
+from navigation import _plan_step, _new_state
+
+LOST = {"goal_visible": False, "goal_direction": "not visible", "goal_proximity": "not visible",
+        "path_status": "clear", "obstacle_info": "none"}
+SEEN = {"goal_visible": True, "goal_direction": "center", "goal_proximity": "far",
+        "path_status": "clear", "obstacle_info": "none"}
+
+
+def _scans(state, answers, scan=True):
+    return [any(action[0] == "scan" for action in _plan_step(advice, "ball", state, step + 1, scan=scan)[0])
+            for step, advice in enumerate(answers)]
+
+
+def test_no_scan_unless_asked():
+    assert _scans(_new_state(), [LOST] * 4, scan=False) == [False] * 4
+
+
+def test_no_rescan_from_the_same_spot():
+    state = _new_state()
+    assert _scans(state, [LOST] * 6) == [True] + [False] * 5 # Search turns only; the scan already saw this spot
+
+
+def test_rescan_after_driving_somewhere_new():
+    state = _new_state()
+    assert _scans(state, [LOST, SEEN, LOST]) == [True, False, True]
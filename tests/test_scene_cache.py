@@ -0,0 +1,57 @@
+"""AdviceCache: hits for an unchanged scene, misses for a changed one or another goal, expiry and eviction."""
+import numpy as np
+import scene_cache
+from scene_cache import AdviceCache, frame_signature
+
+ADVICE = {"goal_visible": True, "goal_direction": "center", "goal_proximity": "near", "path_status": "clear"}
+
+
+def _frame(shift=0, noise=0):
+    # A horizontal gradient with a dark block; `shift` moves the block, `noise` adds a little sensor noise
+    frame = np.tile(np.linspace(0, 255, 320, dtype=np.uint8)[None, :, None], (240, 1, 3))
+    frame[80:160, 100 + shift:160 + shift] = 20
+    if noise:
+        rng = np.random.default_rng(0)
+        frame = np.clip(frame.astype(np.int16) + rng.integers(-noise, noise + 1, frame.shape), 0, 255)
+    return frame.astype(np.uint8)
+
+
+def test_unchanged_scene_reuses_advice_as_a_copy():
+    cache = AdviceCache()
+    cache.store(frame_signature(_frame()), "red ball", ADVICE)
+    advice = cache.lookup(frame_signature(_frame(noise=3)), "red ball")
+    assert advice == ADVICE
+    advice["goal_direction"] = "far left" # Callers annotate advice; the cached entry must not change
+    assert cache.lookup(frame_signature(_frame()), "red ball") == ADVICE
+    assert cache.stats()["hits"] == 2 and cache.stats()["api_calls_saved"] == 2
+
+
+def test_changed_scene_or_other_goal_misses():
+    cache = AdviceCache()
+    cache.store(frame_signature(_frame()), "red ball", ADVICE)
+    assert cache.lookup(frame_signature(_frame(shift=120)), "red ball") is None
+    assert cache.lookup(frame_signature(_frame()), "blue cup") is None
+    assert cache.stats()["misses"] == 2 and cache.stats()["hit_rate"] == 0.0
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(scene_cache.time, "monotonic", lambda: now[0])
+    cache = AdviceCache(ttl=4.0)
+    cache.store(frame_signature(_frame()), "red ball", ADVICE)
+    now[0] += 3.9
+    assert cache.lookup(frame_signature(_frame()), "red ball") is not None
+    now[0] += 0.2
+    assert cache.lookup(frame_signature(_frame()), "red ball") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_clear_and_size_limit_drop_entries():
+    cache = AdviceCache(max_entries=2)
+    for shift in (0, 60, 120):
+        cache.store(frame_signature(_frame(shift=shift)), "red ball", dict(ADVICE, obstacle_info=str(shift)))
+    assert cache.stats()["entries"] == 2
+    assert cache.lookup(frame_signature(_frame(shift=0)), "red ball") is None # The oldest was evicted
+    assert cache.lookup(frame_signature(_frame(shift=120)), "red ball")["obstacle_info"] == "120"
+    cache.clear()
+    assert cache.lookup(frame_signature(_frame(shift=120)), "red ball") is None
@@ -0,0 +1,101 @@
+"""SpatialMemory: checked headings, recovery plans, and plans after turns already queued in the step."""
+from navigation import _plan_step, _new_state
+from robot_controller import forward, left, right, DRIVE_SPEED, FULL_TURN_DURATION
+from spatial_memory import SpatialMemory, TURN_RATE, HEADING_BINS, EXPLORE_MOVE, _wrap
+
+BLOCKED_GOAL = {"goal_visible": True, "goal_direction": "far left", "goal_proximity": "medium",
+                "path_status": "major obstacle", "obstacle_info": "box"}
+
+
+def _run(memory, actions):
+    # Applies the planned moves to the pose as the motor listener would
+    for action in actions:
+        if action[0] == "move":
+            memory.apply_motion(action[1].__name__, action[2])
+
+
+def test_detour_after_a_correction_turn_plans_from_the_corrected_heading():
+    memory = SpatialMemory()
+    actions, reached = _plan_step(BLOCKED_GOAL, "ball", _new_state(), step=1, memory=memory)
+    moves = [action for action in actions if action[0] == "move"]
+    assert not reached and moves[0][1] is left and moves[0][2] == 0.45 # The far-left correction, 67.5 degrees
+    assert len(moves) == 2
+    # Same detour as when planned once the correction has already turned the robot
+    turned_first = SpatialMemory()
+    heading, position = turned_first.pose()
+    turned_first.apply_motion("left", 0.45)
+    turned_first.observe(BLOCKED_GOAL, heading, position)
+    assert moves[1] == turned_first.plan("detour", 0.6)[0]
+    _run(memory, moves)
+    assert abs(_wrap(memory.heading)) > 30 # Away from the obstacle...
+    assert abs(_wrap(memory.heading - TURN_RATE * 0.45)) <= 30 # ...by the least turn, not 45 degrees past it
+
+
+def test_plan_counts_queued_turns():
+    memory = SpatialMemory()
+    memory.observe({"goal_visible": False, "path_status": "clear"})
+    turned = memory.plan("search", 0.5, queued=[("say", "x"), ("move", left, 0.3), ("move", right, 0.1)])
+    fresh = SpatialMemory()
+    fresh.apply_motion("left", 0.2)
+    fresh.observe({"goal_visible": False, "path_status": "clear"}, heading=0.0)
+    assert turned == fresh.plan("search", 0.5)
+
+
+def test_observe_records_the_pose_the_frame_was_taken_at():
+    memory = SpatialMemory()
+    heading, position = memory.pose()
+    memory.apply_motion("left", 0.6) # A streamed correction finished before the answer was recorded
+    memory.observe({"goal_visible": True, "goal_direction": "center", "goal_proximity": "far",
+                    "path_status": "clear"}, heading, position)
+    assert memory.goal_bearing == heading
+
+
+CLEAR_VIEW = {"goal_visible": False, "path_status": "clear"}
+
+
+def test_observing_checks_the_headings_in_view_until_the_robot_moves_away():
+    memory = SpatialMemory()
+    assert memory.unchecked_headings() == HEADING_BINS
+    memory.observe(CLEAR_VIEW)
+    seen = HEADING_BINS - memory.unchecked_headings()
+    assert 0 < seen < HEADING_BINS
+    memory.apply_motion("left", 0.8) # Turning in place keeps the viewpoint
+    memory.observe(CLEAR_VIEW)
+    assert HEADING_BINS - memory.unchecked_headings() > seen
+    memory.apply_motion("forward", 1.0 / DRIVE_SPEED) # A metre away: a fresh set of headings
+    assert memory.unchecked_headings() == HEADING_BINS
+
+
+def test_search_turns_back_to_a_recently_seen_goal():
+    memory = SpatialMemory()
+    memory.observe({"goal_visible": True, "goal_direction": "far left", "goal_proximity": "far",
+                    "path_status": "clear"})
+    memory.apply_motion("right", 0.6) # The goal drops out of view
+    memory.observe(CLEAR_VIEW)
+    assert memory.goal_recent()
+    [(kind, move, seconds)] = memory.plan("search", 0.5)
+    assert kind == "move" and move is left and seconds > 0.6
+
+
+def test_search_turns_to_the_nearest_unchecked_heading():
+    memory = SpatialMemory()
+    memory.observe(CLEAR_VIEW)
+    [(_, move, seconds)] = memory.plan("search", 0.5)
+    assert move in (left, right) and memory.plans["unseen"] == 1
+    assert seconds * TURN_RATE < 90 # The nearest one, just past the edge of the view
+    memory.apply_motion(move.__name__, seconds)
+    before = memory.unchecked_headings()
+    memory.observe(CLEAR_VIEW)
+    assert memory.unchecked_headings() < before
+
+
+def test_every_heading_checked_drives_only_where_the_latest_answer_saw_clear():
+    memory = SpatialMemory()
+    for _ in range(HEADING_BINS):
+        memory.observe({"goal_visible": False, "path_status": "blocked"})
+        memory.apply_motion("left", FULL_TURN_DURATION / HEADING_BINS)
+    memory.observe(CLEAR_VIEW) # Back at the start, now seen clear
+    assert memory.unchecked_headings() == 0
+    first = memory.plan("search", 0.5)
+    assert first == [("move", forward, EXPLORE_MOVE)]
+    assert memory.plans["explore"] == 1
@@ -0,0 +1,75 @@
+"""_SpeechWorker: priority order, coalescing, queue-full eviction and urgent preemption, without audio."""
+import threading
+from speech import _SpeechWorker, PRIORITY_URGENT, PRIORITY_NORMAL, PRIORITY_STATUS
+
+WAIT = 2.0 # Generous bound for waits, so a hang fails the test instead of blocking it
+
+
+class _Player:
+    """Stands in for _synthesize_and_play: records each message and holds them until released."""
+
+    def __init__(self):
+        self.played = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, text: str) -> bool:
+        self.played.append(text)
+        self.started.set()
+        self.release.wait(WAIT)
+        return True
+
+
+def _busy_worker(maxsize=8):
+    # A worker already playing "busy", so later messages wait in its queue
+    worker = _SpeechWorker(cache=None, maxsize=maxsize)
+    player = worker._synthesize_and_play = _Player()
+    busy = worker.submit("busy", PRIORITY_NORMAL, None)
+    assert player.started.wait(WAIT)
+    return worker, player, busy
+
+
+def test_queued_messages_play_by_priority_then_age():
+    worker, player, busy = _busy_worker()
+    status = worker.submit("status", PRIORITY_STATUS, None)
+    first = worker.submit("first", PRIORITY_NORMAL, None)
+    second = worker.submit("second", PRIORITY_NORMAL, None)
+    player.release.set()
+    assert worker.flush(WAIT)
+    assert player.played == ["busy", "first", "second", "status"]
+    assert all(handle.played for handle in (busy, status, first, second))
+
+
+def test_newer_status_replaces_pending_one_with_the_same_key():
+    worker, player, _ = _busy_worker()
+    old = worker.submit("old", PRIORITY_STATUS, "situation")
+    other = worker.submit("other", PRIORITY_STATUS, "retry")
+    new = worker.submit("new", PRIORITY_STATUS, "situation")
+    assert old.done() and old.dropped and not old.played
+    player.release.set()
+    assert worker.flush(WAIT)
+    assert player.played == ["busy", "other", "new"]
+    assert new.played and other.played
+
+
+def test_full_queue_drops_the_least_important_message():
+    worker, player, _ = _busy_worker(maxsize=2)
+    oldest = worker.submit("oldest", PRIORITY_NORMAL, None)
+    newest = worker.submit("newest", PRIORITY_NORMAL, None)
+    status = worker.submit("status", PRIORITY_STATUS, None) # Less important than everything queued
+    assert status.dropped
+    urgent = worker.submit("urgent", PRIORITY_URGENT, None) # Evicts the oldest of the least important
+    assert oldest.dropped and not newest.done()
+    player.release.set()
+    assert worker.flush(WAIT)
+    assert player.played == ["busy", "urgent", "newest"]
+    assert urgent.played and newest.played
+
+
+def test_urgent_message_cuts_off_the_one_playing():
+    worker, player, busy = _busy_worker()
+    urgent = worker.submit("urgent", PRIORITY_URGENT, None)
+    player.release.set()
+    assert urgent.wait(WAIT) and urgent.played
+    assert busy.done() and busy.dropped and not busy.played
+    assert player.played == ["busy", "urgent"]
@@ -0,0 +1,68 @@
+"""_steered_drive: a forward move re-aimed or cut short from the tracker's view of buffered frames."""
+import time
+import numpy as np
+from navigation import _steered_drive
+from robot_controller import create_mock_motors
+
+FRAME = np.zeros((24, 32, 3), dtype=np.uint8)
+
+
+class _Ref:
+    def __init__(self, timestamp):
+        self.array = FRAME
+        self.timestamp = timestamp
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        pass
+
+
+class _Camera:
+    """A frame every 10 ms, like BufferedCamera.frame_after."""
+
+    def frame_after(self, t, timeout=1.0):
+        time.sleep(max(0.0, t - time.monotonic()) + 0.01)
+        return _Ref(time.monotonic())
+
+
+class _Tracker:
+    """Replays scripted views; None means the goal was lost."""
+
+    def __init__(self, views):
+        self.views = list(views)
+
+    def follow(self, frame):
+        view = self.views.pop(0) if len(self.views) > 1 else self.views[0]
+        return None if view is None else {"goal_direction": view, "goal_proximity": "medium"}
+
+
+def _motors():
+    motors = create_mock_motors(time_scale=0.2) # A 1 s drive takes 0.2 s
+    ran = []
+    motors.add_listener(lambda name, seconds: ran.append((name, seconds)))
+    return motors, ran
+
+
+def test_centred_goal_drives_the_whole_move():
+    motors, ran = _motors()
+    handle = _steered_drive(_Camera(), _Tracker(["center"]), motors, 1.0)
+    assert handle.done() and not handle.cancelled
+    assert ran == [("forward", 1.0)]
+
+
+def test_drifting_goal_turns_then_resumes_the_rest_of_the_drive():
+    motors, ran = _motors()
+    _steered_drive(_Camera(), _Tracker(["center", "center", "slightly left", "center"]), motors, 1.0)
+    names = [name for name, _ in ran]
+    assert names == ["forward", "left", "forward"]
+    assert ran[1][1] == 0.15
+    assert abs(ran[0][1] + ran[2][1] - 1.0) < 0.1 # The drive's length is kept across the turn
+
+
+def test_lost_goal_cuts_the_drive_short():
+    motors, ran = _motors()
+    handle = _steered_drive(_Camera(), _Tracker(["center", None]), motors, 1.0)
+    assert handle.cancelled
+    assert [name for name, _ in ran] == ["forward"] and ran[0][1] < 0.5
@@ -0,0 +1,61 @@
+"""NavigationStreamParser and parse_goal_box on chunked JSON and numbered free-text answers."""
+import json
+from gemini_utils import NavigationStreamParser, decision_ready, parse_goal_box, format_goal_box
+
+JSON_ANSWER = json.dumps({"goal_visible": True, "goal_direction": "Slightly Left", "goal_proximity": "Near",
+                          "path_status": "Clear", "obstacle_info": "None", "goal_box": [100, 200, 300, 400]})
+TEXT_ANSWER = ("1. GOAL VISIBLE: No\n2. GOAL DIRECTION: Not Visible\n3. GOAL PROXIMITY: Not Visible\n"
+               "4. PATH STATUS: Minor Obstacle\n5. OBSTACLE INFO: Chair leg\n6. GOAL BOX: None")
+
+
+def _feed(parser, text, size):
+    # Feeds `text` in chunks of `size` characters; returns the fields known after each chunk
+    return [dict(parser.fields) for start in range(0, len(text), size) if parser.feed(text[start:start + size])]
+
+
+def test_json_fields_complete_in_order_and_decide_early():
+    parser = NavigationStreamParser()
+    seen = _feed(parser, JSON_ANSWER, 7)
+    assert list(seen[-1]) == ["goal_visible", "goal_direction", "goal_proximity", "path_status",
+                              "obstacle_info", "goal_box"]
+    first_decision = next(i for i, fields in enumerate(seen) if decision_ready(fields))
+    assert "path_status" not in seen[first_decision] # Visible goal: the direction alone decides
+    assert seen[first_decision]["goal_direction"] == "slightly left"
+
+
+def test_a_split_string_value_is_not_reported_until_it_is_complete():
+    parser = NavigationStreamParser()
+    assert parser.feed('{"goal_visible": true, "goal_direction": "Far L') == {"goal_visible": True}
+    assert parser.feed('eft", ') == {"goal_direction": "far left"}
+
+
+def test_finish_fills_defaults_and_parses_the_box():
+    parser = NavigationStreamParser()
+    _feed(parser, JSON_ANSWER, 5)
+    advice = parser.finish()
+    assert advice["goal_visible"] is True and advice["path_status"] == "clear"
+    assert advice["goal_box"] == (0.2, 0.1, 0.4, 0.3)
+
+    parser = NavigationStreamParser()
+    parser.feed('{"goal_visible": false, "path_status": "Blocked"') # The stream broke off here
+    advice = parser.finish()
+    assert advice["goal_visible"] is False and advice["path_status"] == "blocked"
+    assert advice["goal_direction"] == "not visible" and advice["goal_box"] is None
+
+
+def test_numbered_free_text_is_parsed_line_by_line():
+    parser = NavigationStreamParser()
+    seen = _feed(parser, TEXT_ANSWER, 11)
+    assert seen[0] == {"goal_visible": False}
+    advice = parser.finish() # The last line has no newline; finish() flushes it
+    assert advice["path_status"] == "minor obstacle" and advice["obstacle_info"] == "chair leg"
+    assert advice["goal_box"] is None
+
+
+def test_parse_goal_box_rejects_unusable_boxes():
+    assert parse_goal_box("[100, 200, 300, 400]") == (0.2, 0.1, 0.4, 0.3)
+    assert parse_goal_box("[0, 0, 1200, 1000]") == (0.0, 0.0, 1.0, 1.0) # Clamped to the frame
+    assert parse_goal_box("none") is None
+    assert parse_goal_box("[300, 200, 100, 400]") is None # ymax above ymin
+    assert parse_goal_box("[1, 2, 3]") is None
+    assert parse_goal_box(format_goal_box((0.25, 0.5, 0.75, 1.0))) == (0.25, 0.5, 0.75, 1.0)
@@ -0,0 +1,368 @@
+"""
+Closed-loop 2D world for testing navigation end to end without hardware or network.
+
+A World holds the robot's pose in a square room, a red ball as the goal and some
+cylindrical obstacles. Attached to mock motors (robot_controller.create_mock_motors)
+it moves the robot by every executed forward/backward/left/right command, and a
+MockCamera created with world=... renders the robot's first-person view from that
+pose. The Oracle answers the navigation and scan prompts as a stand-in for Gemini: it
+finds the goal by its colour in the image it was sent (so crops and downscaling are
+answered correctly) and takes proximity and path status from the world's ground truth.
+
+    python world_sim.py --episodes 10 --pipelined --scan-headings 6
+
+Reports steps to the goal, wall time, API calls and collisions per episode, and the
+mean steps and API calls per successful pursuit.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import random
+import threading
+import numpy as np
+import cv2
+import speech
+from camera import MockCamera, CAMERA_FOV
+from gemini_utils import format_goal_box
+from goal_tracker import GoalTracker
+from gemini_client import GeminiClient, FakeGenerativeModel
+from navigation import pursue_object, MAX_STEPS, STEP_PAUSE, PIPELINE_SETTLE_TIME
+from payload_controller import PayloadController, direction_from_x
+from robot_controller import create_mock_motors, FULL_TURN_DURATION, DRIVE_SPEED
+from session_recorder import advice_to_text
+from spatial_memory import SpatialMemory
+
+ROOM_SIZE = 5.0 # Metres, square room
+TURN_RATE = 360.0 / FULL_TURN_DURATION # Degrees per second turning in place
+ROBOT_RADIUS = 0.125 # The robot is 25cm wide
+MOVE_STEP = 0.02 # Metres between collision checks while driving
+CAMERA_HEIGHT = 0.1 # Metres above the floor
+WALL_HEIGHT = 1.0
+OBSTACLE_HEIGHT = 0.4
+GOAL_RADIUS = 0.1
+GOAL_OBJECT = "red ball"
+
+# BGR colours; the goal's red is used by nothing else, so the oracle can find it in any frame
+GOAL_COLOR = (30, 30, 220)
+WALL_COLOR = (170, 175, 180)
+CEILING_COLOR = (225, 225, 225)
+FLOOR_COLOR = (70, 95, 120)
+OBSTACLE_COLORS = [(150, 90, 40), (60, 140, 60), (110, 110, 110), (40, 160, 190)]
+
+SUCCESS_GAP = 0.35 # Metres between robot and goal surfaces that count as reached
+PROXIMITY_BANDS = [(0.35, "very close"), (0.6, "reachable"), (1.2, "near"), (2.2, "medium")] # Max gap -> answer
+MAJOR_OBSTACLE_GAP = 0.3 # Obstacle this close in the robot's path: "major obstacle" ("blocked" for a wall)
+MINOR_OBSTACLE_GAP = 0.8
+MIN_GOAL_PIXELS = 4 # Fewer goal-coloured pixels than this and the oracle does not see the goal
+
+
+class World:
+    """
+    Robot pose (x, y in metres; heading in degrees, counter-clockwise, 0 along +x), the
+    goal and the obstacles (x, y, radius). Driving stops at the first contact with a
+    wall, an obstacle or the goal; each contact counts as a bump. With `motion_noise` each
+    move turns or drives that fraction more or less than commanded (Gaussian), so dead
+    reckoning drifts as on a real floor. Thread-safe: moves arrive on the motor thread
+    while frames render on the capture thread.
+    """
+
+    def __init__(self, robot, goal, obstacles=(), size: float = ROOM_SIZE, motion_noise: float = 0.0, seed: int = 0):
+        self.x, self.y, self.heading = robot
+        self.goal = goal
+        self.obstacles = list(obstacles)
+        self.size = size
+        self.motion_noise = motion_noise
+        self._rng = random.Random(seed)
+        self.bumps = 0
+        self.distance_driven = 0.0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def random(cls, seed: int, obstacles: int = 3, size: float = ROOM_SIZE, motion_noise: float = 0.0):
+        """A random room: the goal at least 1.5 m from the robot, obstacles clear of both."""
+        rng = random.Random(seed)
+        margin = 0.4
+
+        def spot():
+            return rng.uniform(margin, size - margin), rng.uniform(margin, size - margin)
+
+        robot = spot()
+        goal = spot()
+        while math.dist(robot, goal) < 1.5:
+            goal = spot()
+        placed = []
+        while len(placed) < obstacles:
+            x, y = spot()
+            radius = rng.uniform(0.1, 0.25)
+            clear = math.dist((x, y), robot) > radius + ROBOT_RADIUS + 0.3 and \
+                math.dist((x, y), goal) > radius + GOAL_RADIUS + 0.3 and \
+                all(math.dist((x, y), (ox, oy)) > radius + r + 0.1 for ox, oy, r in placed)
+            if clear:
+                placed.append((x, y, radius))
+        return cls((robot[0], robot[1], rng.uniform(0, 360)), goal, placed, size, motion_noise, seed)
+
+    def attach(self, motors):
+        """Moves the robot by every command `motors` (robot_controller.Motors) executes."""
+        motors.add_listener(self.apply_motion)
+        return motors
+
+    def apply_motion(self, name: str, seconds: float):
+        with self._lock:
+            if self.motion_noise:
+                seconds *= max(0.0, self._rng.gauss(1.0, self.motion_noise))
+            if name in ("left", "right"):
+                self.heading = (self.heading + (1 if name == "left" else -1) * TURN_RATE * seconds) % 360
+                return
+            sign = 1 if name == "forward" else -1
+            dx = sign * math.cos(math.radians(self.heading))
+            dy = sign * math.sin(math.radians(self.heading))
+            remaining = DRIVE_SPEED * seconds
+            while remaining > 1e-9:
+                step = min(MOVE_STEP, remaining)
+                if self._collides(self.x + dx * step, self.y + dy * step):
+                    self.bumps += 1
+                    return
+                self.x += dx * step
+                self.y += dy * step
+                self.distance_driven += step
+                remaining -= step
+
+    def _collides(self, x: float, y: float) -> bool:
+        if not (ROBOT_RADIUS <= x <= self.size - ROBOT_RADIUS and ROBOT_RADIUS <= y <= self.size - ROBOT_RADIUS):
+            return True
+        if math.dist((x, y), self.goal) < ROBOT_RADIUS + GOAL_RADIUS:
+            return True
+        return any(math.dist((x, y), (ox, oy)) < ROBOT_RADIUS + r for ox, oy, r in self.obstacles)
+
+    def pose(self):
+        with self._lock:
+            return self.x, self.y, self.heading
+
+    @staticmethod
+    def _relative(pose, x: float, y: float):
+        # (ahead, left) metres of a point in the robot's frame
+        dx, dy = x - pose[0], y - pose[1]
+        cos_h, sin_h = math.cos(math.radians(pose[2])), math.sin(math.radians(pose[2]))
+        return dx * cos_h + dy * sin_h, -dx * sin_h + dy * cos_h
+
+    def goal_gap(self) -> float:
+        """Metres between the robot's and the goal's surfaces."""
+        x, y, _ = self.pose()
+        return math.dist((x, y), self.goal) - ROBOT_RADIUS - GOAL_RADIUS
+
+    def reached(self) -> bool:
+        return self.goal_gap() <= SUCCESS_GAP
+
+    def goal_proximity(self) -> str:
+        gap = self.goal_gap()
+        for max_gap, proximity in PROXIMITY_BANDS:
+            if gap <= max_gap:
+                return proximity
+        return "far"
+
+    def _wall_distance(self, x: float, y: float, angle: float) -> float:
+        # Distance along a ray from (x, y) at `angle` degrees to the room walls
+        dx, dy = math.cos(math.radians(angle)), math.sin(math.radians(angle))
+        hits = [(bound - x) / dx for bound in (0.0, self.size) if abs(dx) > 1e-9 and (bound - x) / dx > 0] + \
+               [(bound - y) / dy for bound in (0.0, self.size) if abs(dy) > 1e-9 and (bound - y) / dy > 0]
+        return min(hits) if hits else float("inf")
+
+    def path_status(self):
+        """(path_status, obstacle_info) for the robot's 25cm wide path straight ahead."""
+        pose = self.pose()
+        nearest, info = float("inf"), "none"
+        for ox, oy, r in self.obstacles:
+            ahead, lateral = self._relative(pose, ox, oy)
+            if ahead > 0 and abs(lateral) < ROBOT_RADIUS + r:
+                gap = ahead - r - ROBOT_RADIUS
+                if gap < nearest:
+                    nearest, info = gap, f"post {gap:.1f}m ahead"
+        wall_gap = self._wall_distance(pose[0], pose[1], pose[2]) - ROBOT_RADIUS
+        if wall_gap < MAJOR_OBSTACLE_GAP and wall_gap < nearest:
+            return "blocked", "wall"
+        if nearest < MAJOR_OBSTACLE_GAP:
+            return "major obstacle", info
+        if nearest < MINOR_OBSTACLE_GAP:
+            return "minor obstacle", info
+        return "clear", "none"
+
+    def render(self, frame):
+        """Draws the robot's first-person view into `frame` (BGR, any size) and returns it."""
+        pose = self.pose()
+        height, width = frame.shape[:2]
+        focal = (width / 2) / math.tan(math.radians(CAMERA_FOV / 2))
+        horizon = height / 2
+        frame[:int(horizon)] = CEILING_COLOR
+        frame[int(horizon):] = FLOOR_COLOR
+
+        # Walls, one ray per column; distances are perpendicular to the view so walls stay straight
+        offsets = np.degrees(np.arctan((width / 2 - np.arange(width) - 0.5) / focal))
+        distances = np.array([self._wall_distance(pose[0], pose[1], pose[2] + offset) for offset in offsets])
+        distances = np.maximum(distances * np.cos(np.radians(offsets)), 0.05)
+        top = horizon - focal * (WALL_HEIGHT - CAMERA_HEIGHT) / distances
+        bottom = horizon + focal * CAMERA_HEIGHT / distances
+        rows = np.arange(height)[:, None]
+        wall = (rows >= top) & (rows <= bottom)
+        shade = np.clip(1.2 - distances / (2 * self.size), 0.4, 1.0) # Further walls are darker
+        frame[wall] = (np.array(WALL_COLOR) * np.broadcast_to(shade, wall.shape)[wall][:, None]).astype(np.uint8)
+
+        # Obstacles and the goal, far to near so nearer ones cover further ones
+        things = [(ox, oy, r, OBSTACLE_COLORS[i % len(OBSTACLE_COLORS)], False)
+                  for i, (ox, oy, r) in enumerate(self.obstacles)]
+        things.append((self.goal[0], self.goal[1], GOAL_RADIUS, GOAL_COLOR, True))
+        things.sort(key=lambda t: -math.dist(pose[:2], t[:2]))
+        for x, y, radius, color, is_goal in things:
+            ahead, lateral = self._relative(pose, x, y)
+            if ahead < 0.05:
+                continue
+            center_x = width / 2 - focal * lateral / ahead
+            half_width = focal * radius / ahead
+            if center_x + half_width < 0 or center_x - half_width >= width:
+                continue
+            if is_goal:
+                center_y = horizon + focal * (CAMERA_HEIGHT - radius) / ahead
+                cv2.circle(frame, (_pixel(center_x), _pixel(center_y)), max(1, _pixel(half_width)), color, -1)
+            else:
+                cv2.rectangle(frame, (_pixel(center_x - half_width), _pixel(horizon - focal * (OBSTACLE_HEIGHT -
+                              CAMERA_HEIGHT) / ahead)), (_pixel(center_x + half_width),
+                              _pixel(horizon + focal * CAMERA_HEIGHT / ahead)), color, -1)
+        return frame
+
+
+def _pixel(value: float) -> int:
+    return int(round(min(max(value, -10000), 10000))) # cv2 wants ints in a sane range
+
+
+class Oracle:
+    """
+    respond(contents) for gemini_client.FakeGenerativeModel: answers navigation prompts
+    (numbered text, or JSON when the prompt asks for it) and multi-view scan prompts
+    about a World, the way a perfect vision model would.
+    """
+
+    def __init__(self, world: World):
+        self.world = world
+
+    @staticmethod
+    def find_goal(image):
+        """
+        (x, pixels, box) of the goal's colour in a JPEG: its centre 0-1 across the image, its
+        size and its (x0, y0, x1, y1) box as fractions; None if too little of it shows.
+        """
+        frame = cv2.imdecode(np.frombuffer(image, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if frame is None:
+            return None
+        blue, green, red = (frame[:, :, i].astype(np.int16) for i in range(3))
+        rows, columns = np.nonzero((red > 150) & (green < 90) & (blue < 90))
+        if len(columns) < MIN_GOAL_PIXELS:
+            return None
+        height, width = frame.shape[:2]
+        box = (columns.min() / width, rows.min() / height, (columns.max() + 1) / width, (rows.max() + 1) / height)
+        return (columns.mean() + 0.5) / width, len(columns), box
+
+    def __call__(self, contents) -> str:
+        prompt = str(contents[0])
+        images = [part["data"] for part in contents if isinstance(part, dict)]
+        if "GOAL VIEW" in prompt:
+            return self._scan_answer(images)
+        found = self.find_goal(images[0]) if images else None
+        path_status, obstacle_info = self.world.path_status()
+        advice = {"goal_visible": found is not None,
+                  "goal_direction": direction_from_x(found[0]) if found else "not visible",
+                  "goal_proximity": self.world.goal_proximity() if found else "not visible",
+                  "path_status": path_status, "obstacle_info": obstacle_info,
+                  "goal_box": found[2] if found else None}
+        if "JSON" in prompt:
+            return json.dumps(dict(advice, goal_box=json.loads(format_goal_box(found[2])) if found else []))
+        return advice_to_text(advice)
+
+    def _scan_answer(self, images) -> str:
+        views = [(self.find_goal(image), index) for index, image in enumerate(images)]
+        views = [(found, index) for found, index in views if found is not None]
+        if not views:
+            return "1. GOAL VIEW: None\n2. POSITION IN VIEW: None\n3. GOAL PROXIMITY: None"
+        (x, _, _), index = max(views, key=lambda view: view[0][1]) # The view showing the most of it
+        position = "left" if x < 0.4 else "right" if x > 0.6 else "center"
+        return (f"1. GOAL VIEW: {index + 1}\n2. POSITION IN VIEW: {position.title()}\n"
+                f"3. GOAL PROXIMITY: {self.world.goal_proximity().title()}")
+
+
+def run_episode(index: int, args) -> dict:
+    world = World.random(args.seed + index, obstacles=args.obstacles, motion_noise=args.motion_noise)
+    random.seed(args.seed + index) # _plan_step picks random turn directions without a memory
+    model = FakeGenerativeModel(respond=Oracle(world), latency=args.latency, seed=args.seed + index)
+    client = GeminiClient(model, requests_per_minute=1e6) # Own client: no quota in the simulation
+    motors = world.attach(create_mock_motors(time_scale=args.time_scale))
+    memory = SpatialMemory().attach(motors) if args.memory else None
+    stats = {}
+    with MockCamera(args.width, args.height, name=f"world-{index}", world=world) as camera:
+        claimed = pursue_object(client, camera, GOAL_OBJECT, pipelined=args.pipelined, stats=stats,
+                                max_steps=args.max_steps, step_pause=STEP_PAUSE * args.time_scale,
+                                settle_time=PIPELINE_SETTLE_TIME * args.time_scale, streaming=args.streaming,
+                                scan_headings=args.scan_headings, motors=motors,
+                                payload_controller=PayloadController() if args.adaptive_payload else None,
+                                tracker=GoalTracker(args.track_refresh) if args.track_refresh > 0 else None,
+                                memory=memory)
+    return {"episode": index, "reached": world.reached(), "claimed": claimed, "final_gap_m": world.goal_gap(),
+            "steps": stats.get("steps", 0), "elapsed_s": stats.get("elapsed_s", 0.0), "api_calls": model.calls,
+            "bumps": world.bumps, "driven_m": world.distance_driven}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run pursuits in a simulated room and report how they went.")
+    parser.add_argument("--episodes", type=int, default=5)
+    parser.add_argument("--obstacles", type=int, default=3)
+    parser.add_argument("--max-steps", type=int, default=MAX_STEPS)
+    parser.add_argument("--latency", type=float, default=0.0, help="Oracle answer latency, seconds")
+    parser.add_argument("--time-scale", type=float, default=0.0, help="Mock motor and pause time scale")
+    parser.add_argument("--width", type=int, default=320)
+    parser.add_argument("--height", type=int, default=240)
+    parser.add_argument("--scan-headings", type=int, default=0)
+    parser.add_argument("--pipelined", action="store_true")
+    parser.add_argument("--streaming", action="store_true")
+    parser.add_argument("--adaptive-payload", action="store_true")
+    parser.add_argument("--track-refresh", type=int, default=0,
+                        help="Track the goal between answers, asking Gemini again after this many steps (0: off)")
+    parser.add_argument("--memory", action="store_true", help="Plan search turns with a SpatialMemory")
+    parser.add_argument("--motion-noise", type=float, default=0.0,
+                        help="Relative error of each executed move (Gaussian), to exercise dead reckoning")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--snapshot", default="", help="Write the first episode's starting view to this image file")
+    parser.add_argument("--verbose", action="store_true", help="Show the navigation loop's output")
+    parser.add_argument("--jsonl", default="", help="Append one JSON row per episode to this file")
+    args = parser.parse_args()
+
+    speech.set_speech_enabled(False)
+    if args.snapshot:
+        frame = World.random(args.seed, obstacles=args.obstacles).render(
+            np.zeros((args.height, args.width, 3), dtype=np.uint8))
+        cv2.imwrite(args.snapshot, frame)
+
+    print(f"{'episode':>8}{'reached':>9}{'claimed':>9}{'gap m':>8}{'steps':>7}{'wall s':>8}{'calls':>7}{'bumps':>7}")
+    rows = []
+    for index in range(args.episodes):
+        with open(os.devnull, "w") as devnull, \
+                contextlib.redirect_stdout(devnull) if not args.verbose else contextlib.nullcontext():
+            row = run_episode(index, args)
+        rows.append(row)
+        print(f"{index:>8}{str(row['reached']):>9}{str(row['claimed']):>9}{row['final_gap_m']:>8.2f}"
+              f"{row['steps']:>7}{row['elapsed_s']:>8.2f}{row['api_calls']:>7}{row['bumps']:>7}")
+        if args.jsonl:
+            with open(args.jsonl, "a", encoding="utf-8") as f:
+                f.write(json.dumps(row) + "\n")
+
+    reached = [row for row in rows if row["reached"]]
+    print(f"\n[SIM] Reached the goal in {len(reached)}/{len(rows)} episodes; "
+          f"{sum(row['steps'] for row in rows) / len(rows):.1f} steps, "
+          f"{sum(row['api_calls'] for row in rows) / len(rows):.1f} API calls, "
+          f"{sum(row['elapsed_s'] for row in rows) / len(rows):.2f}s and "
+          f"{sum(row['bumps'] for row in rows) / len(rows):.1f} bumps per episode on average.")
+    if reached:
+        print(f"[SIM] Per successful pursuit: {sum(row['steps'] for row in reached) / len(reached):.1f} steps, "
+              f"{sum(row['api_calls'] for row in reached) / len(reached):.1f} API calls.")
+
+
+if __name__ == "__main__":
+    main()